@@ -0,0 +1,1021 @@
+"""
+성능 벤치마크 - 검색 속도/처리량/메모리 측정 및 부하 테스트
+"~0.05초 응답" 같은 수치를 실제로 측정해서 릴리스 간 성능 저하를 잡기 위함
+
+핵심 기능:
+    1. 합성 지식 베이스 생성 (data/data.xlsx 기반, 1천 ~ 100만 행)
+    2. 검색 벤치마크 (retrieval)
+       - 시작 시간 (모델 로딩 + 임베딩 생성)
+       - 임베딩 처리량 (문장/초)
+       - 질문당 지연시간 백분위 (_find_similar_qa, generate_answer)
+       - 메모리 사용량 (RSS)
+    3. HTTP 부하 테스트 (load)
+       - /api/chat, /api/unanswered 동시 요청
+       - 처리량 (req/s), 지연시간 백분위, 오류 수
+    4. 인코더 백엔드 비교 (backends)
+       - torch / torch-int8 / onnx / onnx-int8
+       - 단일 질문 지연시간, 배치 처리량, 메모리, 기준 대비 parity
+    5. 길이별 배치 인코딩 비교 (bucketing)
+       - 길이가 섞인 문장 집합에서 고정 batch_size vs 토큰 예산 배치
+       - 처리량, 패딩 효율
+    6. 워커/스레드 구성 비교 (threads)
+       - 프로세스 수 × 스레드 수 조합별 동시 부하 처리량, 지연시간
+       - 코어 고정(--pin) 여부 비교
+    7. 차원 축소 투영 평가 (projection)
+       - 목표 차원별 원래 차원 검색과의 top-1/top-5 일치율
+       - 임베딩 메모리 절감량, 질문당 유사도 계산 지연시간
+    8. 페이지 로딩 부하 테스트 (pageload)
+       - 브라우저처럼 페이지 + 페이지가 참조하는 /assets/ 자원 요청
+       - cold (캐시 없음) / warm (ETag 재검증 → 304, 지문 자원은 브라우저 캐시) 비교
+       - 페이지 로딩/초, 요청/초, 전송 바이트, JSON 응답 압축률
+    9. 결과를 JSON으로 저장 (릴리스 간 비교용)
+
+실행 방법:
+    python benchmark.py retrieval --sizes 1000,10000 --queries 200
+    python benchmark.py load --url http://localhost:8000 --concurrency 16 --requests 2000
+    python benchmark.py backends --backends torch,torch-int8,onnx,onnx-int8
+    python benchmark.py bucketing --texts 5000 --token_budget 8192
+    python benchmark.py threads --configs 2x0,2x4,4x2 --duration 20 --pin
+    python benchmark.py projection --size 10000 --dims 128,256
+    python benchmark.py pageload --url http://localhost:8000 --concurrency 32 --loads 2000
+
+출력:
+    - benchmarks/<이름>_<날짜시간>.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import logging
+import platform
+import tempfile
+from datetime import datetime
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 합성 질문 변형용 문구
+QUERY_PREFIXES = ['', '', '혹시 ', '궁금한데 ', '급해요 ', '질문: ']
+QUERY_SUFFIXES = ['', '', ' 알려주세요', ' 어떻게 해요?', ' 방법', ' 문의드립니다']
+# 지식 베이스에 없을 법한 질문 (미답변 경로 측정용)
+OFF_TOPIC_QUERIES = [
+    '오늘 점심 메뉴 뭐야', '주차장 위치', '야구 경기 결과', '날씨 어때',
+    '회식 장소 추천', '주식 시세', '영화 추천해줘', '택배 도착 시간'
+]
+
+
+# ----------------------------------------------------------------------
+# 공통 유틸
+# ----------------------------------------------------------------------
+def rss_mb() -> float:
+    """
+    현재 프로세스 메모리 사용량 (RSS, MB)
+
+    Note:
+        - psutil이 있으면 현재 RSS, 없으면 resource의 최대 RSS 사용
+        - 둘 다 없으면 (Windows + psutil 미설치) -1
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # macOS는 바이트, Linux는 KB 단위
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    except ImportError:
+        return -1.0
+
+
+def latency_summary(latencies: List[float]) -> dict:
+    """
+    지연시간 목록 → 통계 (ms 단위)
+
+    Returns:
+        dict: {"count", "mean_ms", "p50_ms", "p90_ms", "p95_ms", "p99_ms", "max_ms"}
+    """
+    if not latencies:
+        return {'count': 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        'count': len(values),
+        'mean_ms': round(float(values.mean()), 3),
+        'p50_ms': round(float(np.percentile(values, 50)), 3),
+        'p90_ms': round(float(np.percentile(values, 90)), 3),
+        'p95_ms': round(float(np.percentile(values, 95)), 3),
+        'p99_ms': round(float(np.percentile(values, 99)), 3),
+        'max_ms': round(float(values.max()), 3),
+    }
+
+
+def environment_info() -> dict:
+    """결과 비교용 실행 환경 정보"""
+    info = {
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+    }
+    try:
+        from config import EMBEDDING_CONFIG
+        info['model_name'] = EMBEDDING_CONFIG['model_name']
+        info['device'] = EMBEDDING_CONFIG['device']
+    except ImportError:
+        pass
+    return info
+
+
+def write_result(name: str, result: dict, output_dir: str = 'benchmarks') -> str:
+    """결과를 JSON 파일로 저장하고 경로 반환"""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    logger.info(f"벤치마크 결과 저장: {path}")
+    return path
+
+
+# ----------------------------------------------------------------------
+# 합성 데이터
+# ----------------------------------------------------------------------
+def load_seed_qa(excel_path: str = './data/data.xlsx') -> List[Tuple[str, str]]:
+    """원본 엑셀에서 (질문, 답변) 목록 읽기"""
+    df = pd.read_excel(excel_path)
+    return [(str(q).strip(), str(a).strip()) for q, a in zip(df['질문'], df['답변'])]
+
+
+def generate_synthetic_kb(seed_qa: List[Tuple[str, str]], size: int, output_path: str,
+                          rng: random.Random) -> str:
+    """
+    원본 Q&A를 변형해서 size행짜리 지식 베이스 엑셀 생성
+
+    Args:
+        seed_qa: 원본 (질문, 답변) 목록
+        size: 생성할 행 수
+        output_path: 저장할 엑셀 경로
+        rng: 난수 생성기 (재현 가능하도록 시드 고정)
+
+    Note:
+        - openpyxl write-only 모드로 한 행씩 기록 (100만 행도 메모리 일정)
+        - 질문마다 번호를 붙여 서로 다른 임베딩이 나오도록 함
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet()
+    ws.append(['질문', '답변'])
+    for i in range(size):
+        q, a = seed_qa[i % len(seed_qa)]
+        question = f"{rng.choice(QUERY_PREFIXES)}{q}{rng.choice(QUERY_SUFFIXES)} #{i}"
+        ws.append([question, a])
+    wb.save(output_path)
+    return output_path
+
+
+def generate_queries(seed_qa: List[Tuple[str, str]], count: int, rng: random.Random,
+                     off_topic_ratio: float = 0.2) -> List[str]:
+    """
+    벤치마크용 질문 목록 생성
+
+    Args:
+        seed_qa: 원본 (질문, 답변) 목록
+        count: 질문 수
+        rng: 난수 생성기
+        off_topic_ratio: 지식 베이스에 없는 질문 비율 (미답변 경로 측정)
+
+    Note:
+        - 대소문자 변형(lower)도 섞어서 정규화 경로까지 측정
+    """
+    queries = []
+    for _ in range(count):
+        if rng.random() < off_topic_ratio:
+            queries.append(rng.choice(OFF_TOPIC_QUERIES))
+            continue
+        q, _ = rng.choice(seed_qa)
+        if rng.random() < 0.3:
+            q = q.lower()
+        queries.append(f"{rng.choice(QUERY_PREFIXES)}{q}{rng.choice(QUERY_SUFFIXES)}")
+    return queries
+
+
+# ----------------------------------------------------------------------
+# 검색 벤치마크
+# ----------------------------------------------------------------------
+def time_calls(func, inputs) -> List[float]:
+    """inputs 각각에 대해 func 호출 시간(초) 측정"""
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_retrieval(chatbot, queries: List[str], warmup: int = 5) -> dict:
+    """
+    이미 만들어진 챗봇으로 질문당 지연시간 측정
+
+    Returns:
+        dict: {"find_similar_qa": {...}, "generate_answer": {...}}
+    """
+    # 질문 임베딩 캐시 끄기 (같은 질문이 반복돼도 매번 인코딩 비용까지 측정)
+    chatbot._query_cache_size = 0
+    chatbot._query_cache.clear()
+
+    # 워밍업 (첫 호출의 지연 로딩 제외)
+    for q in queries[:warmup]:
+        chatbot._find_similar_qa(q)
+
+    return {
+        'find_similar_qa': latency_summary(time_calls(chatbot._find_similar_qa, queries)),
+        'generate_answer': latency_summary(time_calls(chatbot.generate_answer, queries)),
+    }
+
+
+def bench_embedding_throughput(chatbot, texts: List[str], sample_size: int = 2000) -> dict:
+    """
+    임베딩 처리량 측정 (문장/초)
+
+    Note:
+        - 전체 재임베딩은 오래 걸리므로 최대 sample_size개만 측정
+    """
+    from config import EMBEDDING_CONFIG
+
+    sample = [chatbot._normalize_text(t) for t in texts[:sample_size]]
+    start = time.perf_counter()
+    chatbot.embedding_model.encode(
+        sample,
+        convert_to_numpy=True,
+        normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings'],
+        batch_size=EMBEDDING_CONFIG['batch_size'],
+        show_progress_bar=False
+    )
+    elapsed = time.perf_counter() - start
+    return {
+        'texts': len(sample),
+        'seconds': round(elapsed, 3),
+        'texts_per_sec': round(len(sample) / elapsed, 1) if elapsed > 0 else None,
+    }
+
+
+def run_retrieval(args) -> dict:
+    """
+    지식 베이스 크기별 검색 벤치마크
+
+    Process:
+        1. 크기별 합성 엑셀 생성
+        2. 챗봇 초기화 시간 측정 (모델 로딩 + 임베딩 생성)
+        3. 임베딩 처리량 측정
+        4. 질문당 지연시간 측정
+        5. 메모리 사용량 기록
+
+    Note:
+        - 임베딩 캐시는 임시 폴더 사용 (운영 캐시 ./index/knowledge_base를 합성 데이터로 덮어쓰지 않음)
+        - 성능 저하 모드는 끔 (측정 중 싼 답변 경로로 빠지면 지연시간이 왜곡됨)
+    """
+    from rag_chatbot_v2 import SemanticRAGChatbot
+    from load_monitor import LoadMonitor
+
+    rng = random.Random(args.seed)
+    seed_qa = load_seed_qa(args.excel_path)
+    queries = generate_queries(seed_qa, args.queries, rng)
+
+    result = {'benchmark': 'retrieval', 'environment': environment_info(), 'runs': []}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in args.sizes:
+            logger.info(f"지식 베이스 {size}행 벤치마크 시작")
+            kb_path = generate_synthetic_kb(seed_qa, size, os.path.join(tmp_dir, f'kb_{size}.xlsx'), rng)
+
+            rss_before = rss_mb()
+            start = time.perf_counter()
+            chatbot = SemanticRAGChatbot(kb_path, enable_logging=False,
+                                         embedding_cache_dir=os.path.join(tmp_dir, f'cache_{size}'))
+            startup = time.perf_counter() - start
+            chatbot.load_monitor = LoadMonitor(enabled=False)
+            rss_after = rss_mb()
+
+            questions = [q for q, _ in chatbot.knowledge_base]
+            run = {
+                'kb_size': size,
+                'startup_sec': round(startup, 3),
+                'embedding_throughput': bench_embedding_throughput(chatbot, questions),
+                'latency': bench_retrieval(chatbot, queries),
+                'rss_mb': round(rss_mb(), 1),
+                'rss_delta_mb': round(rss_after - rss_before, 1),
+            }
+            result['runs'].append(run)
+            logger.info(f"{size}행: 시작 {run['startup_sec']}초, "
+                        f"generate_answer p95 {run['latency']['generate_answer'].get('p95_ms')}ms")
+
+            del chatbot
+    return result
+
+
+# ----------------------------------------------------------------------
+# HTTP 부하 테스트
+# ----------------------------------------------------------------------
+def _http_request(url: str, payload: dict = None, timeout: float = 30.0) -> Tuple[float, int]:
+    """
+    HTTP 요청 1회 → (지연시간 초, 상태코드)
+
+    Note:
+        - 표준 라이브러리(urllib)만 사용 (추가 설치 불필요)
+        - 연결 오류는 상태코드 0으로 반환
+    """
+    import urllib.request
+    import urllib.error
+
+    data = None
+    headers = {}
+    if payload is not None:
+        data = json.dumps(payload).encode('utf-8')
+        headers['Content-Type'] = 'application/json'
+    req = urllib.request.Request(url, data=data, headers=headers)
+
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            resp.read()
+            status = resp.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except Exception:
+        status = 0
+    return time.perf_counter() - start, status
+
+
+def run_load(args) -> dict:
+    """
+    로컬 서버에 동시 요청을 보내 처리량/지연시간 측정
+
+    Process:
+        1. 질문 목록 생성 (data.xlsx 기반)
+        2. concurrency개 스레드로 총 requests개 요청 전송
+           - unanswered_ratio 비율로 /api/unanswered 섞기
+        3. 엔드포인트별 지연시간 백분위, 처리량, 오류 수 집계
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = random.Random(args.seed)
+    seed_qa = load_seed_qa(args.excel_path)
+    queries = generate_queries(seed_qa, args.requests, rng)
+    base_url = args.url.rstrip('/')
+
+    # 요청 목록 미리 생성 (스레드에서 난수 사용 안 함)
+    jobs = []
+    for q in queries:
+        if rng.random() < args.unanswered_ratio:
+            jobs.append(('unanswered', f"{base_url}/api/unanswered", None))
+        else:
+            jobs.append(('chat', f"{base_url}/api/chat", {'question': q}))
+
+    def _run(job):
+        kind, url, payload = job
+        latency, status = _http_request(url, payload, timeout=args.timeout)
+        return kind, latency, status
+
+    logger.info(f"부하 테스트 시작: {len(jobs)}개 요청, 동시 {args.concurrency}개")
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        outcomes = list(pool.map(_run, jobs))
+    elapsed = time.perf_counter() - start
+
+    endpoints = {}
+    for kind in ('chat', 'unanswered'):
+        rows = [(lat, status) for k, lat, status in outcomes if k == kind]
+        ok = [lat for lat, status in rows if status == 200]
+        endpoints[kind] = {
+            'requests': len(rows),
+            'errors': len(rows) - len(ok),
+            'latency': latency_summary(ok),
+        }
+
+    return {
+        'benchmark': 'load',
+        'environment': environment_info(),
+        'url': base_url,
+        'concurrency': args.concurrency,
+        'total_requests': len(jobs),
+        'duration_sec': round(elapsed, 3),
+        'requests_per_sec': round(len(jobs) / elapsed, 1) if elapsed > 0 else None,
+        'endpoints': endpoints,
+    }
+
+
+def _http_get(url: str, headers: dict = None, timeout: float = 30.0) -> Tuple[float, int, dict, bytes]:
+    """
+    GET 요청 1회 → (지연시간 초, 상태코드, 응답 헤더, 본문)
+
+    Note:
+        - 본문은 압축된 그대로 반환 (전송 바이트 측정용, 압축 해제 안 함)
+        - 304는 urllib에서 HTTPError로 오므로 정상 응답으로 처리
+    """
+    import urllib.request
+    import urllib.error
+
+    req = urllib.request.Request(url, headers=headers or {})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as resp:
+            body = resp.read()
+            status, resp_headers = resp.status, dict(resp.headers)
+    except urllib.error.HTTPError as e:
+        body = e.read()
+        status, resp_headers = e.code, dict(e.headers)
+    except Exception:
+        body, status, resp_headers = b'', 0, {}
+    return time.perf_counter() - start, status, resp_headers, body
+
+
+def _page_load(base_url: str, path: str, warm: bool, cache: dict, timeout: float) -> dict:
+    """
+    브라우저 페이지 로딩 1회 흉내
+
+    Process:
+        1. 페이지 요청 (warm이면 If-None-Match로 재검증)
+        2. 페이지의 /assets/ 자원 요청 (warm이면 생략 - 지문 자원은 immutable 캐시)
+    """
+    import re
+
+    headers = {'Accept-Encoding': 'gzip'}
+    if warm and path in cache:
+        headers['If-None-Match'] = cache[path]['etag']
+
+    start = time.perf_counter()
+    latency, status, resp_headers, body = _http_get(base_url + path, headers, timeout)
+    statuses = [status]
+    transferred = len(body)
+
+    if status == 304:
+        page = cache[path]['body']
+    else:
+        page = body
+        if resp_headers.get('Content-Encoding') == 'gzip':
+            import gzip
+            page = gzip.decompress(body)
+    assets = sorted(set(re.findall(rb'/assets/[^"\'\s)]+', page)))
+
+    if not warm:
+        for asset in assets:
+            _, asset_status, _, asset_body = _http_get(base_url + asset.decode('utf-8'), headers, timeout)
+            statuses.append(asset_status)
+            transferred += len(asset_body)
+
+    return {
+        'latency': time.perf_counter() - start,
+        'statuses': statuses,
+        'bytes': transferred,
+    }
+
+
+def run_pageload(args) -> dict:
+    """
+    페이지 로딩 부하 테스트 (아침 출근 시간처럼 많은 사용자가 동시에 페이지를 여는 상황)
+
+    Process:
+        1. 페이지별 ETag/본문 1회 수집 (warm 모드용 브라우저 캐시)
+        2. cold / warm 각각 concurrency개 스레드로 총 loads번 페이지 로딩
+        3. 페이지 로딩/초, 요청/초, 상태코드 분포, 전송 바이트, 지연시간 백분위
+        4. JSON 응답(/api/unanswered) 압축 전/후 크기 비교
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    base_url = args.url.rstrip('/')
+    paths = args.paths
+
+    # warm 요청과 같은 Accept-Encoding으로 수집 (ETag가 압축 방식별로 다름)
+    cache = {}
+    for path in paths:
+        _, status, resp_headers, body = _http_get(base_url + path, {'Accept-Encoding': 'gzip'}, args.timeout)
+        if status != 200:
+            raise RuntimeError(f"페이지 요청 실패: {path} ({status})")
+        if resp_headers.get('Content-Encoding') == 'gzip':
+            import gzip
+            body = gzip.decompress(body)
+        cache[path] = {'etag': resp_headers.get('ETag', ''), 'body': body}
+
+    jobs = [paths[i % len(paths)] for i in range(args.loads)]
+    modes = {}
+    for mode in ('cold', 'warm'):
+        warm = mode == 'warm'
+
+        def _run(path):
+            return _page_load(base_url, path, warm, cache, args.timeout)
+
+        logger.info(f"페이지 로딩 테스트 ({mode}): {len(jobs)}회, 동시 {args.concurrency}개")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            outcomes = list(pool.map(_run, jobs))
+        elapsed = time.perf_counter() - start
+
+        statuses = {}
+        for outcome in outcomes:
+            for status in outcome['statuses']:
+                statuses[str(status)] = statuses.get(str(status), 0) + 1
+        total_requests = sum(statuses.values())
+        ok = [o['latency'] for o in outcomes if all(s in (200, 304) for s in o['statuses'])]
+        modes[mode] = {
+            'page_loads': len(outcomes),
+            'requests': total_requests,
+            'errors': len(outcomes) - len(ok),
+            'statuses': statuses,
+            'duration_sec': round(elapsed, 3),
+            'page_loads_per_sec': round(len(outcomes) / elapsed, 1) if elapsed > 0 else None,
+            'requests_per_sec': round(total_requests / elapsed, 1) if elapsed > 0 else None,
+            'bytes_per_load': round(sum(o['bytes'] for o in outcomes) / len(outcomes), 1),
+            'latency': latency_summary(ok),
+        }
+
+    # JSON 응답 압축률
+    url = f"{base_url}/api/unanswered"
+    _, _, _, plain = _http_get(url, {'Accept-Encoding': 'identity'}, args.timeout)
+    _, _, resp_headers, encoded = _http_get(url, {'Accept-Encoding': 'gzip, br'}, args.timeout)
+    compression = {
+        'endpoint': '/api/unanswered',
+        'content_encoding': resp_headers.get('Content-Encoding'),
+        'plain_bytes': len(plain),
+        'encoded_bytes': len(encoded),
+    }
+
+    return {
+        'benchmark': 'pageload',
+        'environment': environment_info(),
+        'url': base_url,
+        'paths': paths,
+        'concurrency': args.concurrency,
+        'modes': modes,
+        'json_compression': compression,
+    }
+
+
+# ----------------------------------------------------------------------
+# 인코더 백엔드 비교
+# ----------------------------------------------------------------------
+def _bench_backend_worker(backend: str, texts: List[str], queries: List[str], repeat: int) -> dict:
+    """
+    백엔드 하나 측정 (별도 프로세스에서 실행 → 메모리 측정이 서로 섞이지 않음)
+
+    Returns:
+        dict: 로딩 시간, 단일 질문 지연시간, 배치 처리량, RSS, 임베딩(parity용)
+    """
+    from config import EMBEDDING_CONFIG
+    from encoder_backends import load_encoder
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    encoder = load_encoder(backend)
+    load_sec = time.perf_counter() - start
+
+    # 워밍업
+    encoder.encode(queries[:5], convert_to_numpy=True, normalize_embeddings=True)
+
+    single = time_calls(
+        lambda q: encoder.encode(q, convert_to_numpy=True, normalize_embeddings=True), queries)
+
+    batch_texts = texts * repeat
+    start = time.perf_counter()
+    encoder.encode(batch_texts, convert_to_numpy=True, normalize_embeddings=True,
+                   batch_size=EMBEDDING_CONFIG['batch_size'], show_progress_bar=False)
+    batch_sec = time.perf_counter() - start
+
+    embeddings = encoder.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return {
+        'backend': backend,
+        'load_sec': round(load_sec, 3),
+        'single_query': latency_summary(single),
+        'batch_throughput': {
+            'texts': len(batch_texts),
+            'seconds': round(batch_sec, 3),
+            'texts_per_sec': round(len(batch_texts) / batch_sec, 1) if batch_sec > 0 else None,
+        },
+        'rss_mb': round(rss_mb(), 1),
+        'rss_delta_mb': round(rss_mb() - rss_before, 1),
+        'embeddings': np.asarray(embeddings, dtype=np.float32).tolist(),
+    }
+
+
+def run_backends(args) -> dict:
+    """
+    인코더 백엔드별 성능 + parity 비교 (기존 Q&A 질문 사용)
+
+    Process:
+        1. 백엔드마다 새 프로세스(spawn)에서 로딩/지연시간/처리량/RSS 측정
+        2. 첫 번째 백엔드(보통 torch)를 기준으로 임베딩 parity 비교
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from encoder_backends import compare_embeddings
+
+    rng = random.Random(args.seed)
+    seed_qa = load_seed_qa(args.excel_path)
+    texts = [q for q, _ in seed_qa]
+    queries = generate_queries(seed_qa, args.queries, rng)
+
+    runs = []
+    for backend in args.backends:
+        logger.info(f"인코더 백엔드 측정: {backend}")
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            runs.append(pool.submit(_bench_backend_worker, backend, texts, queries, args.repeat).result())
+
+    reference = np.asarray(runs[0]['embeddings'], dtype=np.float32)
+    for run in runs:
+        run['parity'] = compare_embeddings(reference, np.asarray(run.pop('embeddings'), dtype=np.float32),
+                                           tolerance=args.tolerance)
+        run['parity']['reference'] = runs[0]['backend']
+
+    return {'benchmark': 'backends', 'environment': environment_info(), 'runs': runs}
+
+
+# ----------------------------------------------------------------------
+# 길이별 배치 인코딩 비교
+# ----------------------------------------------------------------------
+def generate_mixed_texts(seed_qa: List[Tuple[str, str]], count: int, rng: random.Random) -> List[str]:
+    """
+    길이가 섞인 문장 집합 (짧은 질문 + 답변 + 여러 답변을 이어 붙인 긴 청크)
+
+    Note:
+        - 실제 지식 베이스 + 문서 청크가 섞인 상황을 흉내냄
+    """
+    texts = []
+    for _ in range(count):
+        kind = rng.random()
+        if kind < 0.6:
+            texts.append(rng.choice(seed_qa)[0])
+        elif kind < 0.9:
+            texts.append(rng.choice(seed_qa)[1])
+        else:
+            texts.append(' '.join(rng.choice(seed_qa)[1] for _ in range(rng.randint(3, 8))))
+    return texts
+
+
+def run_bucketing(args) -> dict:
+    """
+    고정 batch_size 인코딩 vs 길이별 배치(encode_scheduler) 인코딩 비교
+
+    Process:
+        1. 길이가 섞인 문장 집합 생성 (입력 순서는 무작위)
+        2. 두 방식의 패딩 효율 계산 (실제 토큰 / 패딩 포함 토큰)
+        3. 두 방식의 처리량 측정 + 결과 임베딩 일치 확인
+    """
+    from config import EMBEDDING_CONFIG
+    from encoder_backends import load_encoder
+    from encode_scheduler import token_lengths, plan_batches, fixed_batches, padding_stats, encode_bucketed
+
+    rng = random.Random(args.seed)
+    texts = generate_mixed_texts(load_seed_qa(args.excel_path), args.texts, rng)
+    encoder = load_encoder()
+    batch_size = EMBEDDING_CONFIG['batch_size']
+
+    lengths = token_lengths(encoder, texts)
+    fixed_plan = padding_stats(lengths, fixed_batches(lengths, batch_size))
+    bucketed_plan = padding_stats(lengths, plan_batches(lengths, args.token_budget, args.max_batch_size))
+
+    # 워밍업
+    encoder.encode(texts[:batch_size], convert_to_numpy=True, normalize_embeddings=True, batch_size=batch_size)
+
+    start = time.perf_counter()
+    fixed = np.concatenate([
+        encoder.encode(texts[i:i + batch_size], convert_to_numpy=True, normalize_embeddings=True,
+                       batch_size=batch_size, show_progress_bar=False)
+        for i in range(0, len(texts), batch_size)
+    ])
+    fixed_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    bucketed = encode_bucketed(encoder, texts, token_budget=args.token_budget,
+                               max_batch_size=args.max_batch_size, normalize_embeddings=True)
+    bucketed_sec = time.perf_counter() - start
+
+    cosine = (fixed * bucketed).sum(axis=1)
+    return {
+        'benchmark': 'bucketing',
+        'environment': environment_info(),
+        'texts': len(texts),
+        'token_length': {
+            'min': int(lengths.min()), 'mean': round(float(lengths.mean()), 1), 'max': int(lengths.max()),
+        },
+        'fixed': {
+            'batch_size': batch_size,
+            **fixed_plan,
+            'seconds': round(fixed_sec, 3),
+            'texts_per_sec': round(len(texts) / fixed_sec, 1),
+        },
+        'bucketed': {
+            'token_budget': args.token_budget,
+            'max_batch_size': args.max_batch_size,
+            **bucketed_plan,
+            'seconds': round(bucketed_sec, 3),
+            'texts_per_sec': round(len(texts) / bucketed_sec, 1),
+        },
+        'speedup': round(fixed_sec / bucketed_sec, 3) if bucketed_sec > 0 else None,
+        'min_cosine_vs_fixed': round(float(cosine.min()), 6),
+    }
+
+
+# ----------------------------------------------------------------------
+# 워커/스레드 구성 비교
+# ----------------------------------------------------------------------
+def _threads_worker(workers: int, index: int, threads: int, pin: bool, queries: List[str],
+                    duration: float, barrier, results):
+    """
+    워커 프로세스 1개 (gunicorn sync 워커처럼 요청을 하나씩 처리)
+
+    Note:
+        - threads=0이면 라이브러리 기본값 그대로 (조정 전 상태 재현)
+        - 모든 워커가 모델 로딩을 마친 뒤 동시에 시작 (barrier)
+    """
+    import inference_runtime
+    if threads:
+        inference_runtime.configure_process(workers=workers, worker_index=index, threads=threads, pin=pin)
+    from encoder_backends import load_encoder
+
+    encoder = load_encoder()
+    encoder.encode(queries[:5], convert_to_numpy=True, normalize_embeddings=True)
+    barrier.wait()
+
+    latencies = []
+    deadline = time.perf_counter() + duration
+    i = 0
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        encoder.encode(queries[i % len(queries)], convert_to_numpy=True, normalize_embeddings=True)
+        latencies.append(time.perf_counter() - start)
+        i += 1
+    results.put(latencies)
+
+
+def run_threads(args) -> dict:
+    """
+    프로세스 수 × 스레드 수 조합별로 동시 부하 측정
+
+    Process:
+        1. 조합마다 워커 프로세스 P개 생성 (spawn, 각자 모델 로딩)
+        2. 각 워커가 스레드 T개로 구성 (T=0: 기본값 = 과다 구독 재현)
+        3. 모두 준비되면 duration초 동안 동시에 질문 인코딩
+        4. 전체 처리량 + 지연시간 백분위 집계
+    """
+    import multiprocessing
+
+    rng = random.Random(args.seed)
+    queries = generate_queries(load_seed_qa(args.excel_path), 500, rng)
+    ctx = multiprocessing.get_context('spawn')
+
+    runs = []
+    for config in args.configs:
+        workers, threads = (int(x) for x in config.split('x'))
+        logger.info(f"구성 측정: 워커 {workers}개 × 스레드 {threads or '기본값'}개 (코어 고정: {args.pin})")
+        barrier = ctx.Barrier(workers)
+        results = ctx.Queue()
+        procs = [ctx.Process(target=_threads_worker,
+                             args=(workers, i, threads, args.pin, queries, args.duration, barrier, results))
+                 for i in range(workers)]
+        for p in procs:
+            p.start()
+        latencies = [lat for _ in procs for lat in results.get()]
+        for p in procs:
+            p.join()
+
+        runs.append({
+            'config': config,
+            'workers': workers,
+            'threads_per_worker': threads or 'default',
+            'pinned': bool(args.pin and threads),
+            'requests': len(latencies),
+            'requests_per_sec': round(len(latencies) / args.duration, 1),
+            'latency': latency_summary(latencies),
+        })
+
+    return {'benchmark': 'threads', 'environment': environment_info(), 'duration_sec': args.duration, 'runs': runs}
+
+
+# ----------------------------------------------------------------------
+# 차원 축소 투영 평가
+# ----------------------------------------------------------------------
+# SemanticRAGChatbot._compose_answer 판단 기준 (답변만 표시 / 추가 추천 / 답변 없음)
+ANSWER_THRESHOLD = 0.8
+SUGGEST_THRESHOLD = 0.6
+NO_ANSWER_THRESHOLD = 0.4
+
+
+def threshold_decisions(matrix: np.ndarray, query: np.ndarray, k: int) -> Tuple[bool, frozenset, bool]:
+    """
+    임계값 판단 재현 → (답변만 표시, 추가 추천 행 번호, 답변 없음)
+
+    Note:
+        - 추가 추천: 2~k위 중 SUGGEST_THRESHOLD 이상
+    """
+    top = rank_top_k(matrix, query, k)
+    scores = matrix[top] @ query
+    suggested = frozenset(top[1:][scores[1:] >= SUGGEST_THRESHOLD].tolist())
+    return bool(scores[0] >= ANSWER_THRESHOLD), suggested, bool(scores[0] < NO_ANSWER_THRESHOLD)
+
+
+def rank_top_k(matrix: np.ndarray, query: np.ndarray, k: int) -> np.ndarray:
+    """유사도 상위 k개 행 번호 (내림차순, _rank_qa와 같은 방식)"""
+    scores = matrix @ query
+    k = min(k, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top], kind='stable')]
+
+
+def run_projection(args) -> dict:
+    """
+    목표 차원별로 투영 검색을 원래 차원 검색과 비교
+
+    Process:
+        1. 합성 지식 베이스 질문 + 벤치마크 질문 임베딩 (원래 차원)
+        2. 원래 차원 top-5 검색 결과를 기준으로 저장
+        3. 차원마다 투영 학습 → 지식 베이스/질문 투영 → top-5 검색
+        4. top-1 일치율, top-5 겹침 비율, 메모리, 질문당 유사도 계산 시간 비교
+        5. 임계값 판단 일치율 (답변만 표시 0.8 / 추가 추천 0.6 / 답변 없음 0.4)
+
+    Note:
+        - 지연시간은 유사도 계산 + 상위 k개 선택만 측정 (질문 인코딩 제외)
+        - top-k 일치율은 지식 베이스에 있는 질문(off-topic 제외) 기준
+        - 임계값 판단 일치율은 off-topic 질문도 포함 (답변 없음 판단 확인)
+    """
+    from config import EMBEDDING_CONFIG
+    from encoder_backends import load_encoder
+    from encode_scheduler import encode_bucketed, encoder_settings
+    from embedding_projection import fit_projection, normalize_rows
+
+    rng = random.Random(args.seed)
+    seed_qa = load_seed_qa(args.excel_path)
+    kb_texts = [f"{rng.choice(QUERY_PREFIXES)}{seed_qa[i % len(seed_qa)][0]}{rng.choice(QUERY_SUFFIXES)} #{i}"
+                for i in range(args.size)]
+    queries = generate_queries(seed_qa, args.queries, rng, off_topic_ratio=0.0)
+
+    encoder = load_encoder()
+    token_budget, max_batch_size = encoder_settings()
+    kb = normalize_rows(encode_bucketed(encoder, kb_texts, token_budget, max_batch_size, source='benchmark'))
+    query_vectors = normalize_rows(encode_bucketed(encoder, queries, token_budget, max_batch_size, source='benchmark'))
+    off_topic_vectors = normalize_rows(encode_bucketed(encoder, OFF_TOPIC_QUERIES, token_budget, max_batch_size, source='benchmark'))
+    decision_vectors = np.vstack([query_vectors, off_topic_vectors])
+
+    top_k = args.top_k
+    baseline = [rank_top_k(kb, q, top_k) for q in query_vectors]
+    baseline_decisions = [threshold_decisions(kb, q, top_k) for q in decision_vectors]
+    full_latency = latency_summary(time_calls(lambda q: rank_top_k(kb, q, top_k), query_vectors))
+
+    runs = []
+    for dim in args.dims:
+        start = time.perf_counter()
+        projection = fit_projection(kb, dim)
+        fit_sec = time.perf_counter() - start
+        projected_kb = projection.transform(kb)
+        projected_queries = projection.transform(query_vectors)
+
+        top1 = top_overlap = 0
+        for base, q in zip(baseline, projected_queries):
+            result = rank_top_k(projected_kb, q, top_k)
+            top1 += int(result[0] == base[0])
+            top_overlap += len(set(result.tolist()) & set(base.tolist())) / len(base)
+
+        agree = [0, 0, 0]  # 답변만 표시 / 추가 추천 / 답변 없음
+        for base, q in zip(baseline_decisions, projection.transform(decision_vectors)):
+            for i, same in enumerate(a == b for a, b in zip(base, threshold_decisions(projected_kb, q, top_k))):
+                agree[i] += int(same)
+
+        runs.append({
+            'dim': projection.dim,
+            'energy': round(projection.energy, 4),
+            'fit_sec': round(fit_sec, 3),
+            'top1_agreement': round(top1 / len(queries), 4),
+            f'top{top_k}_agreement': round(top_overlap / len(queries), 4),
+            'answer_agreement': round(agree[0] / len(decision_vectors), 4),
+            'suggest_agreement': round(agree[1] / len(decision_vectors), 4),
+            'no_answer_agreement': round(agree[2] / len(decision_vectors), 4),
+            'embedding_mb': round(projected_kb.nbytes / 1e6, 2),
+            'memory_saved_mb': round((kb.nbytes - projected_kb.nbytes) / 1e6, 2),
+            'latency': latency_summary(time_calls(lambda q: rank_top_k(projected_kb, q, top_k), projected_queries)),
+        })
+        logger.info(f"{projection.dim}차원: top-1 일치 {runs[-1]['top1_agreement']}, "
+                    f"top-{top_k} 일치 {runs[-1][f'top{top_k}_agreement']}, "
+                    f"답변/추천/답변 없음 판단 일치 {runs[-1]['answer_agreement']}/"
+                    f"{runs[-1]['suggest_agreement']}/{runs[-1]['no_answer_agreement']}")
+
+    return {
+        'benchmark': 'projection',
+        'environment': environment_info(),
+        'model': EMBEDDING_CONFIG['model_name'],
+        'kb_size': args.size,
+        'queries': len(queries),
+        'full': {
+            'dim': kb.shape[1],
+            'embedding_mb': round(kb.nbytes / 1e6, 2),
+            'latency': full_latency,
+        },
+        'runs': runs,
+    }
+
+
+def main():
+    """메인 실행 함수"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='챗봇 성능 벤치마크')
+    parser.add_argument('--excel_path', type=str, default='./data/data.xlsx',
+                       help='원본 질문-답변 엑셀 파일 경로')
+    parser.add_argument('--output_dir', type=str, default='benchmarks',
+                       help='결과 JSON 저장 폴더')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='난수 시드 (재현용)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    retrieval = subparsers.add_parser('retrieval', help='지식 베이스 크기별 검색 벤치마크')
+    retrieval.add_argument('--sizes', type=lambda s: [int(x) for x in s.split(',')], default=[1000, 10000],
+                          help='지식 베이스 크기 목록 (예: 1000,10000,100000,1000000)')
+    retrieval.add_argument('--queries', type=int, default=200,
+                          help='측정할 질문 수')
+
+    load = subparsers.add_parser('load', help='HTTP 부하 테스트 (서버 실행 중이어야 함)')
+    load.add_argument('--url', type=str, default='http://localhost:8000',
+                     help='서버 주소')
+    load.add_argument('--concurrency', type=int, default=16,
+                     help='동시 요청 수')
+    load.add_argument('--requests', type=int, default=1000,
+                     help='총 요청 수')
+    load.add_argument('--unanswered_ratio', type=float, default=0.1,
+                     help='/api/unanswered 요청 비율')
+    load.add_argument('--timeout', type=float, default=30.0,
+                     help='요청 타임아웃 (초)')
+
+    backends = subparsers.add_parser('backends', help='인코더 백엔드 비교 (지연시간/처리량/RSS/parity)')
+    backends.add_argument('--backends', type=lambda s: s.split(','), default=['torch', 'torch-int8', 'onnx', 'onnx-int8'],
+                         help='비교할 백엔드 목록 (첫 번째가 parity 기준)')
+    backends.add_argument('--queries', type=int, default=200,
+                         help='단일 질문 지연시간 측정 횟수')
+    backends.add_argument('--repeat', type=int, default=20,
+                         help='배치 처리량 측정 시 Q&A 질문 반복 횟수')
+    backends.add_argument('--tolerance', type=float, default=0.01,
+                         help='parity 허용 오차 (1 - 최소 코사인 유사도)')
+
+    bucketing = subparsers.add_parser('bucketing', help='고정 배치 vs 길이별 배치 인코딩 비교')
+    bucketing.add_argument('--texts', type=int, default=5000,
+                          help='문장 수 (짧은 질문/답변/긴 청크 혼합)')
+    bucketing.add_argument('--token_budget', type=int, default=8192,
+                          help='배치당 최대 토큰 수')
+    bucketing.add_argument('--max_batch_size', type=int, default=512,
+                          help='배치당 최대 문장 수')
+
+    threads = subparsers.add_parser('threads', help='워커 수 × 스레드 수 구성별 동시 부하 비교')
+    threads.add_argument('--configs', type=lambda s: s.split(','), default=['2x0', '2x4', '4x2'],
+                        help='"워커수x스레드수" 목록 (스레드 0 = 라이브러리 기본값)')
+    threads.add_argument('--duration', type=float, default=20.0,
+                        help='구성별 측정 시간 (초)')
+    threads.add_argument('--pin', action='store_true',
+                        help='워커마다 겹치지 않는 코어에 고정')
+
+    projection = subparsers.add_parser('projection', help='차원 축소 투영 평가 (일치율/메모리/지연시간)')
+    projection.add_argument('--size', type=int, default=10000,
+                           help='합성 지식 베이스 행 수')
+    projection.add_argument('--dims', type=lambda s: [int(x) for x in s.split(',')], default=[128, 256],
+                           help='목표 차원 목록')
+    projection.add_argument('--queries', type=int, default=500,
+                           help='비교할 질문 수')
+    projection.add_argument('--top_k', type=int, default=5,
+                           help='일치율을 비교할 상위 결과 수')
+
+    pageload = subparsers.add_parser('pageload', help='페이지 로딩 부하 테스트 (서버 실행 중이어야 함)')
+    pageload.add_argument('--url', type=str, default='http://localhost:8000',
+                         help='서버 주소')
+    pageload.add_argument('--paths', type=lambda s: s.split(','), default=['/', '/logs'],
+                         help='로딩할 페이지 경로 목록')
+    pageload.add_argument('--concurrency', type=int, default=32,
+                         help='동시 페이지 로딩 수')
+    pageload.add_argument('--loads', type=int, default=2000,
+                         help='모드(cold/warm)별 총 페이지 로딩 수')
+    pageload.add_argument('--timeout', type=float, default=30.0,
+                         help='요청 타임아웃 (초)')
+
+    args = parser.parse_args()
+
+    if args.command == 'retrieval':
+        result = run_retrieval(args)
+    elif args.command == 'backends':
+        result = run_backends(args)
+    elif args.command == 'bucketing':
+        result = run_bucketing(args)
+    elif args.command == 'threads':
+        result = run_threads(args)
+    elif args.command == 'projection':
+        result = run_projection(args)
+    elif args.command == 'pageload':
+        result = run_pageload(args)
+    else:
+        result = run_load(args)
+
+    path = write_result(args.command, result, args.output_dir)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    print(f"\n결과 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -46,9 +46,14 @@ mkdir -p logs
 # 7. Gunicorn 설정 파일 생성
 echo "7단계: Gunicorn 설정 파일 생성 중..."
 cat > gunicorn.conf.py << 'EOF'
+import inference_runtime
+
 bind = "0.0.0.0:8000"
 workers = 2
-worker_class = "sync"
+# gthread: 워커마다 요청 스레드 threads개 → 같은 워커에 동시에 들어온 같은 질문은 한 번만 계산 (single_flight)
+# 추론 스레드는 코어 수 ÷ (workers × threads)로 줄여서 동시 인코딩이 코어 수를 넘지 않게 함
+worker_class = "gthread"
+threads = 4
 worker_connections = 1000
 timeout = 30
 keepalive = 2
@@ -60,6 +65,22 @@ pidfile = "/home/ktr/ktrGPT/gunicorn.pid"
 accesslog = "/home/ktr/ktrGPT/logs/access.log"
 errorlog = "/home/ktr/ktrGPT/logs/error.log"
 loglevel = "info"
+
+# 추론 스레드 구성: 코어 수 ÷ (워커 수 × 요청 스레드 수) (preload 전에 마스터에서 먼저 설정)
+inference_runtime.configure_process(workers=workers, request_threads=threads)
+
+# 워커 번호 (0 ~ workers-1): 마스터가 빈 번호를 배정하고 워커가 종료되면 반납
+worker_slots = inference_runtime.WorkerSlots(workers)
+
+def pre_fork(server, worker):
+    worker.slot = worker_slots.acquire()
+
+def post_fork(server, worker):
+    # 워커마다 겹치지 않는 코어 집합 (KTRGPT_PIN_CORES=1 이면 고정)
+    inference_runtime.configure_process(workers=workers, worker_index=worker.slot, request_threads=threads)
+
+def child_exit(server, worker):
+    worker_slots.release(worker.slot)
 EOF
 
 # 8. systemd 서비스 파일 생성
@@ -0,0 +1,606 @@
+"""
+문서 인덱서 - 긴 매뉴얼/절차 문서를 청크로 나눠 검색 가능하게 만들기
+질문/답변 엑셀로 손으로 옮기지 않아도 문서 원문에서 답을 찾을 수 있음
+
+핵심 기능:
+    1. 대용량 문서 스트리밍 읽기 (txt, md, html)
+    2. 겹치는(overlap) 청크로 분할
+    3. 큰 배치로 임베딩 생성 (메모리 사용량 고정)
+    4. 청크 ↔ 원문 위치(offset) 저장 → 답변에 출처 표시
+    5. 증분 인덱싱 (변경된 문서만 다시 임베딩)
+
+작동 방식:
+    1. 문서 폴더 스캔 → manifest.json과 비교 (크기/수정시간/해시)
+       - 임베딩 모델/백엔드가 manifest와 다르면 전체 다시 인덱싱 (다른 임베딩 공간)
+    2. 변경된 문서만 청크 분할 + 임베딩 → 세그먼트 파일에 바로 기록
+    3. 삭제된 문서는 세그먼트 파일 제거
+    4. 검색 시 세그먼트를 memmap으로 열어 유사도 계산
+
+동시 실행:
+    - 세그먼트 ID = 문서 경로 + 내용 해시 → 내용이 바뀌면 새 이름 (검색 중인 서버가 연 파일을 덮어쓰지 않음)
+    - 세그먼트는 임시 파일에 쓴 뒤 os.replace로 교체 (덜 쓴 파일이 보이지 않음)
+    - update()는 index_dir/.lock 파일 잠금 (gunicorn 워커 여러 개가 동시에 인덱싱해도 차례로 진행)
+    - 서버는 처음 연 세그먼트 파일을 계속 사용 → 인덱서가 지운 뒤에도 검색 결과와 출처가 어긋나지 않음
+
+파일 (index_dir 아래):
+    - manifest.json            (모델/백엔드, 문서별 해시, 청크 수, 세그먼트 ID)
+    - segments/<id>.f32        (임베딩, float32 원시 배열)
+    - segments/<id>.jsonl      (청크 메타데이터: 시작/끝 위치, 텍스트)
+    - segments/<id>.idx        (jsonl 각 줄의 바이트 위치, uint64)
+    - .lock                    (update() 잠금 파일)
+
+실행 방법:
+    python document_ingest.py --docs ./docs --index ./index/documents
+"""
+import os
+import json
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from html.parser import HTMLParser
+from typing import Iterator, List, Tuple
+import numpy as np
+from encode_scheduler import encode_bucketed, DEFAULT_TOKEN_BUDGET
+
+try:
+    import fcntl
+except ImportError:  # Windows (개발용): 잠금 없이 동작
+    fcntl = None
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 지원하는 문서 확장자
+SUPPORTED_EXTENSIONS = {'.txt', '.md', '.markdown', '.html', '.htm'}
+
+# 기본 청크 설정
+DEFAULT_CHUNK_SIZE = 500        # 청크 길이 (문자 수)
+DEFAULT_CHUNK_OVERLAP = 100     # 앞 청크와 겹치는 길이 (문자 수)
+DEFAULT_EMBED_BATCH_SIZE = 256  # 한 번에 임베딩할 청크 수
+DEFAULT_READ_SIZE = 1 << 20     # 파일 읽기 단위 (1M 문자)
+
+
+class _HTMLTextExtractor(HTMLParser):
+    """
+    HTML에서 본문 텍스트만 추출 (스트리밍)
+
+    Note:
+        - feed()를 여러 번 호출해도 태그가 경계에 걸쳐 있으면 알아서 처리
+        - script/style 내용은 제외
+        - 블록 태그(p, div, li ...)는 줄바꿈으로 변환
+    """
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'section', 'article'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._parts = []
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in ('script', 'style'):
+            self._skip_depth += 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in ('script', 'style') and self._skip_depth:
+            self._skip_depth -= 1
+        elif tag in self.BLOCK_TAGS:
+            self._parts.append('\n')
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._parts.append(data)
+
+    def pop_text(self) -> str:
+        """지금까지 추출된 텍스트를 꺼내고 버퍼 비우기"""
+        text = ''.join(self._parts)
+        self._parts = []
+        return text
+
+
+def iter_document_text(path: str, read_size: int = DEFAULT_READ_SIZE) -> Iterator[str]:
+    """
+    문서를 조금씩 읽어 텍스트 블록 단위로 반환 (전체를 메모리에 올리지 않음)
+
+    Args:
+        path: 문서 경로
+        read_size: 한 번에 읽을 문자 수
+
+    Yields:
+        str: 텍스트 블록 (HTML은 태그 제거된 본문)
+
+    Note:
+        - txt/md: 파일 원문 그대로 → offset = UTF-8로 읽은 파일 내용의 문자 위치 (바이트 위치 아님)
+        - html: 태그 제거 후 텍스트 → offset = 추출된 텍스트 내 문자 위치
+        - 줄바꿈 변환 없이 읽음 (newline='') → CRLF 문서도 offset이 원문과 어긋나지 않음
+    """
+    ext = os.path.splitext(path)[1].lower()
+    is_html = ext in ('.html', '.htm')
+    parser = _HTMLTextExtractor() if is_html else None
+
+    with open(path, 'r', encoding='utf-8', errors='replace', newline='') as f:
+        while True:
+            block = f.read(read_size)
+            if not block:
+                break
+            if parser is not None:
+                parser.feed(block)
+                block = parser.pop_text()
+            if block:
+                yield block
+
+    if parser is not None:
+        parser.close()
+        tail = parser.pop_text()
+        if tail:
+            yield tail
+
+
+def iter_chunks(blocks: Iterator[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                overlap: int = DEFAULT_CHUNK_OVERLAP) -> Iterator[Tuple[int, int, str]]:
+    """
+    텍스트 블록 스트림을 겹치는 청크로 분할
+
+    Args:
+        blocks: 텍스트 블록 이터레이터 (iter_document_text 결과)
+        chunk_size: 청크 최대 길이 (문자 수)
+        overlap: 다음 청크가 앞 청크와 겹치는 길이 (chunk_size의 절반 미만)
+
+    Yields:
+        Tuple[시작 위치, 끝 위치, 청크 텍스트]
+
+    Process:
+        1. 버퍼에 chunk_size 이상 모이면 청크 하나 잘라내기
+        2. 끝부분은 가능하면 줄바꿈/공백에서 자르기 (문장 중간 분할 방지)
+        3. 다음 청크는 (끝 - overlap) 위치부터 시작
+
+    Example:
+        chunk_size=500, overlap=100
+        → (0, 500), (400, 900), (800, 1300), ...
+    """
+    # 청크 끝은 뒤쪽 절반 안에서 잘리므로, overlap이 절반 이상이면 한 글자씩만 전진할 수 있음
+    if overlap >= chunk_size // 2:
+        raise ValueError("overlap은 chunk_size의 절반보다 작아야 합니다.")
+
+    buffer = ''
+    buffer_start = 0  # 버퍼 첫 문자의 문서 내 위치
+
+    def _cut(buf: str) -> int:
+        # 뒤쪽 절반 안에서 줄바꿈 → 공백 순으로 자를 위치 찾기
+        window = buf[:chunk_size]
+        for sep in ('\n', ' '):
+            pos = window.rfind(sep, chunk_size // 2)
+            if pos > 0:
+                return pos + 1
+        return chunk_size
+
+    for block in blocks:
+        buffer += block
+        while len(buffer) >= chunk_size:
+            end = _cut(buffer)
+            text = buffer[:end].strip()
+            if text:
+                yield buffer_start, buffer_start + end, text
+            step = max(end - overlap, 1)
+            buffer = buffer[step:]
+            buffer_start += step
+
+    # 남은 꼬리 부분 (이미 앞 청크에 완전히 포함된 경우는 제외)
+    text = buffer.strip()
+    if text and (buffer_start == 0 or len(buffer) > overlap):
+        yield buffer_start, buffer_start + len(buffer), text
+
+
+def file_sha256(path: str, read_size: int = DEFAULT_READ_SIZE) -> str:
+    """파일 해시 계산 (스트리밍)"""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(read_size)
+            if not data:
+                break
+            h.update(data)
+    return h.hexdigest()
+
+
+class DocumentIndex:
+    """
+    문서 청크 인덱스 (증분 업데이트 + memmap 검색)
+
+    Attributes:
+        index_dir: 인덱스 저장 폴더
+        manifest: 문서 경로 → {sha256, size, mtime, segment, n_chunks}
+        dim: 임베딩 차원
+        model_key: 임베딩 모델/백엔드 식별자 (예: "<model_name>|<backend>")
+    """
+
+    def __init__(self, index_dir: str, encoder=None, model_key: str = None,
+                 normalize_embeddings: bool = True,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, chunk_overlap: int = DEFAULT_CHUNK_OVERLAP,
+                 embed_batch_size: int = DEFAULT_EMBED_BATCH_SIZE,
+                 token_budget: int = DEFAULT_TOKEN_BUDGET):
+        """
+        문서 인덱스 초기화
+
+        Args:
+            index_dir: 인덱스 저장 폴더 (없으면 생성)
+            encoder: 임베딩 모델 (SentenceTransformer 호환 encode() 필요)
+                     검색만 할 때는 None 가능
+            model_key: 임베딩 모델/백엔드 식별자
+                       manifest에 저장된 값과 다르면 기존 인덱스를 비우고 다시 만듦
+                       (None이면 확인하지 않음)
+            normalize_embeddings: 임베딩 정규화 여부 (코사인 유사도용)
+            chunk_size: 청크 길이 (문자 수)
+            chunk_overlap: 청크 겹침 길이 (chunk_size의 절반 미만)
+            embed_batch_size: 한 번에 모아서 임베딩할 청크 수 (메모리 사용량 상한)
+            token_budget: 인코딩 배치당 최대 토큰 수 (encode_scheduler)
+        """
+        if chunk_overlap >= chunk_size // 2:
+            raise ValueError("chunk_overlap은 chunk_size의 절반보다 작아야 합니다.")
+
+        self.index_dir = index_dir
+        self.lock_path = os.path.join(index_dir, '.lock')
+        self.segment_dir = os.path.join(index_dir, 'segments')
+        self.manifest_path = os.path.join(index_dir, 'manifest.json')
+        self.encoder = encoder
+        self.model_key = model_key
+        self.normalize_embeddings = normalize_embeddings
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.embed_batch_size = embed_batch_size
+        self.token_budget = token_budget
+
+        os.makedirs(self.segment_dir, exist_ok=True)
+        # 검색용 세그먼트 캐시 (세그먼트 ID → (임베딩 memmap, 청크 위치 memmap, jsonl 파일))
+        self._segments = {}
+        self._read_lock = threading.Lock()
+        self._reload_manifest()
+
+    @contextmanager
+    def _locked(self):
+        """index_dir 파일 잠금 (다른 프로세스의 update()가 끝날 때까지 대기)"""
+        with open(self.lock_path, 'a') as lock_f:
+            if fcntl is not None:
+                fcntl.flock(lock_f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+    # ------------------------------------------------------------------
+    # manifest 관리
+    # ------------------------------------------------------------------
+    def _reload_manifest(self):
+        """
+        디스크의 manifest 다시 읽기
+
+        Note:
+            - 다른 모델/백엔드로 만든 manifest면 빈 인덱스로 취급 (벡터를 섞어 쓰면 유사도가 의미 없음)
+              실제 파일 정리는 update()에서 잠금을 잡은 뒤 수행
+        """
+        self.manifest = self._load_manifest()
+        if self.model_key is not None and self.manifest.get('__model__') != self.model_key:
+            if self.documents():
+                logger.info(f"임베딩 모델 변경 ({self.manifest.get('__model__')} → {self.model_key}): 문서 인덱스 다시 생성 필요")
+            self.manifest = {'__model__': self.model_key}
+        self.dim = self.manifest.get('__dim__')
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_manifest(self):
+        # 임시 파일에 쓴 뒤 교체 (중간에 죽어도 manifest가 깨지지 않도록)
+        tmp_path = f"{self.manifest_path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def documents(self) -> List[str]:
+        """인덱스에 들어있는 문서 경로 목록"""
+        return [k for k in self.manifest if not k.startswith('__')]
+
+    def _segment_paths(self, segment: str) -> Tuple[str, str, str]:
+        base = os.path.join(self.segment_dir, segment)
+        return base + '.f32', base + '.jsonl', base + '.idx'
+
+    def _remove_segment(self, segment: str):
+        cached = self._segments.pop(segment, None)
+        if cached is not None:
+            cached[2].close()
+        for path in self._segment_paths(segment):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _remove_orphan_segments(self):
+        """manifest에 없는 세그먼트 파일 삭제 (모델 변경 전 세그먼트, 중단된 인덱싱의 임시 파일)"""
+        live = {self.manifest[d]['segment'] for d in self.documents()}
+        for name in os.listdir(self.segment_dir):
+            if name.split('.', 1)[0] not in live:
+                os.remove(os.path.join(self.segment_dir, name))
+
+    # ------------------------------------------------------------------
+    # 인덱싱
+    # ------------------------------------------------------------------
+    def update(self, docs_dir: str) -> dict:
+        """
+        문서 폴더를 스캔해서 인덱스 증분 업데이트
+
+        Args:
+            docs_dir: 문서 폴더 (하위 폴더 포함)
+
+        Returns:
+            dict: {"added": n, "updated": n, "removed": n, "unchanged": n, "chunks": n}
+
+        Process:
+            1. 폴더 내 지원 문서 목록 수집
+            2. 크기/수정시간이 같으면 skip (해시 계산 생략)
+            3. 다르면 해시 비교 → 내용이 같으면 메타데이터만 갱신
+            4. 내용이 바뀐 문서만 다시 청크 분할 + 임베딩
+            5. 폴더에서 사라진 문서는 인덱스에서 제거
+
+        Note:
+            - 파일 잠금을 잡고 manifest를 다시 읽은 뒤 진행
+              (먼저 끝난 워커가 인덱싱한 문서는 다음 워커에서 unchanged)
+        """
+        if self.encoder is None:
+            raise ValueError("인덱싱에는 encoder가 필요합니다.")
+
+        with self._locked():
+            self._reload_manifest()
+            self._remove_orphan_segments()
+            return self._update(docs_dir)
+
+    def _update(self, docs_dir: str) -> dict:
+        stats = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0, 'chunks': 0}
+        seen = set()
+
+        for root, _, files in os.walk(docs_dir):
+            for name in sorted(files):
+                if os.path.splitext(name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                    continue
+                path = os.path.join(root, name)
+                rel_path = os.path.relpath(path, docs_dir).replace(os.sep, '/')
+                seen.add(rel_path)
+
+                st = os.stat(path)
+                entry = self.manifest.get(rel_path)
+                if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime:
+                    stats['unchanged'] += 1
+                    continue
+
+                digest = file_sha256(path)
+                if entry and entry['sha256'] == digest:
+                    # 내용은 같고 수정시간만 바뀐 경우
+                    entry['mtime'] = st.st_mtime
+                    stats['unchanged'] += 1
+                    continue
+
+                if entry:
+                    self._remove_segment(entry['segment'])
+                    stats['updated'] += 1
+                else:
+                    stats['added'] += 1
+
+                segment = hashlib.sha1(f"{rel_path}|{digest}".encode('utf-8')).hexdigest()[:16]
+                n_chunks = self._index_document(path, segment)
+                stats['chunks'] += n_chunks
+                self.manifest[rel_path] = {
+                    'sha256': digest,
+                    'size': st.st_size,
+                    'mtime': st.st_mtime,
+                    'segment': segment,
+                    'n_chunks': n_chunks,
+                }
+                # 문서 하나 끝날 때마다 저장 → 중간에 중단돼도 다음 실행에서 이어서 진행
+                self._save_manifest()
+
+        for rel_path in [d for d in self.documents() if d not in seen]:
+            self._remove_segment(self.manifest.pop(rel_path)['segment'])
+            stats['removed'] += 1
+
+        self._save_manifest()
+        logger.info(f"문서 인덱스 업데이트 완료: {stats}")
+        return stats
+
+    def _index_document(self, path: str, segment: str) -> int:
+        """
+        문서 하나를 청크 분할 + 임베딩해서 세그먼트 파일에 기록
+
+        Note:
+            - 청크는 embed_batch_size개씩 모아서 임베딩 → 바로 파일에 append
+            - 메모리에는 배치 하나 분량만 유지 (문서 크기와 무관)
+            - 임시 파일에 다 쓴 뒤 세 파일을 제자리로 교체
+        """
+        paths = self._segment_paths(segment)
+        tmp_paths = [f"{path}.tmp-{os.getpid()}" for path in paths]
+        vec_tmp, meta_tmp, idx_tmp = tmp_paths
+        n_chunks = 0
+        batch = []
+
+        with open(vec_tmp, 'wb') as vec_f, open(meta_tmp, 'wb') as meta_f, open(idx_tmp, 'wb') as idx_f:
+            def _flush():
+                nonlocal n_chunks
+                if not batch:
+                    return
+                # 청크 길이가 제각각이므로 비슷한 길이끼리 다시 묶어서 인코딩
+                embeddings = encode_bucketed(
+                    self.encoder,
+                    [text for _, _, text in batch],
+                    token_budget=self.token_budget,
+                    max_batch_size=len(batch),
+                    normalize_embeddings=self.normalize_embeddings,
+                    source='document'
+                )
+                self._check_dim(embeddings.shape[1])
+                embeddings.tofile(vec_f)
+
+                offsets = np.empty(len(batch), dtype=np.uint64)
+                for i, (start, end, text) in enumerate(batch):
+                    offsets[i] = meta_f.tell()
+                    line = json.dumps({'start': start, 'end': end, 'text': text}, ensure_ascii=False)
+                    meta_f.write(line.encode('utf-8') + b'\n')
+                offsets.tofile(idx_f)
+
+                n_chunks += len(batch)
+                batch.clear()
+
+            blocks = iter_document_text(path)
+            for chunk in iter_chunks(blocks, self.chunk_size, self.chunk_overlap):
+                batch.append(chunk)
+                if len(batch) >= self.embed_batch_size:
+                    _flush()
+            _flush()
+
+        for tmp_path, final_path in zip(tmp_paths, paths):
+            os.replace(tmp_path, final_path)
+        logger.info(f"문서 인덱싱: {path} ({n_chunks}개 청크)")
+        return n_chunks
+
+    def _check_dim(self, dim: int):
+        if self.dim is None:
+            self.dim = int(dim)
+            self.manifest['__dim__'] = self.dim
+        elif self.dim != dim:
+            raise ValueError(f"임베딩 차원 불일치: 인덱스 {self.dim}, 모델 {dim} (인덱스를 다시 만들어주세요)")
+
+    # ------------------------------------------------------------------
+    # 검색
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return sum(self.manifest[d]['n_chunks'] for d in self.documents())
+
+    def _open_segment(self, segment: str):
+        """
+        세그먼트 세 파일을 한 번에 열어서 캐시
+
+        Note:
+            - 임베딩/위치/메타데이터를 같은 시점의 파일로 고정
+              (다른 프로세스가 인덱스를 갱신해도 검색 결과와 출처가 어긋나지 않음)
+        """
+        with self._read_lock:
+            cached = self._segments.get(segment)
+            if cached is None:
+                vec_path, meta_path, idx_path = self._segment_paths(segment)
+                vectors = np.memmap(vec_path, dtype=np.float32, mode='r').reshape(-1, self.dim)
+                offsets = np.memmap(idx_path, dtype=np.uint64, mode='r')
+                cached = (vectors, offsets, open(meta_path, 'rb'))
+                self._segments[segment] = cached
+            return cached
+
+    def _segment_vectors(self, segment: str) -> np.ndarray:
+        return self._open_segment(segment)[0]
+
+    def get_chunk(self, segment: str, position: int) -> dict:
+        """세그먼트의 position번째 청크 메타데이터 읽기 (idx로 바로 seek)"""
+        _, offsets, meta_f = self._open_segment(segment)
+        # 열어 둔 파일을 여러 요청 스레드가 같이 쓰므로 seek + readline을 묶어서 처리
+        with self._read_lock:
+            meta_f.seek(int(offsets[position]))
+            line = meta_f.readline()
+        return json.loads(line.decode('utf-8'))
+
+    def search(self, query_embedding, top_k: int = 5, threshold: float = 0.0) -> List[dict]:
+        """
+        질문 임베딩과 가장 비슷한 청크 검색
+
+        Args:
+            query_embedding: 질문 임베딩 (정규화된 벡터)
+            top_k: 반환할 청크 수
+            threshold: 최소 유사도
+
+        Returns:
+            List[dict]: [{"score", "document", "start", "end", "text"}, ...] (유사도 내림차순)
+
+        Note:
+            - 세그먼트별로 상위 k개만 남기고 합침 → 전체 행렬을 메모리에 올리지 않음
+            - 다른 프로세스가 인덱스를 갱신해서 아직 열지 않은 세그먼트가 지워졌으면
+              manifest를 다시 읽고 1번 재시도
+        """
+        try:
+            return self._search(query_embedding, top_k, threshold)
+        except FileNotFoundError:
+            logger.info("문서 인덱스가 갱신됨: manifest 다시 읽기")
+            self._reload_manifest()
+            return self._search(query_embedding, top_k, threshold)
+
+    def _search(self, query_embedding, top_k: int, threshold: float) -> List[dict]:
+        manifest = self.manifest  # 검색 도중 manifest가 교체돼도 같은 버전 사용
+        documents = [d for d in manifest if not d.startswith('__')]
+        if not self.dim or not sum(manifest[d]['n_chunks'] for d in documents):
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32).reshape(-1)
+        candidates = []  # (score, 문서, 세그먼트, 위치)
+
+        for document in documents:
+            entry = manifest[document]
+            if not entry['n_chunks']:
+                continue
+            scores = self._segment_vectors(entry['segment']) @ query
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            for i in top:
+                if scores[i] >= threshold:
+                    candidates.append((float(scores[i]), document, entry['segment'], int(i)))
+
+        candidates.sort(reverse=True, key=lambda x: x[0])
+
+        results = []
+        for score, document, segment, position in candidates[:top_k]:
+            chunk = self.get_chunk(segment, position)
+            results.append({
+                'score': score,
+                'document': document,
+                'start': chunk['start'],
+                'end': chunk['end'],
+                'text': chunk['text'],
+            })
+        return results
+
+
+def main():
+    """메인 실행 함수 (문서 인덱스 생성/업데이트)"""
+    import argparse
+    from config import EMBEDDING_CONFIG
+    from encoder_backends import load_encoder
+
+    parser = argparse.ArgumentParser(description='문서 청크 인덱서')
+    parser.add_argument('--docs', type=str, default='./docs',
+                       help='문서 폴더 경로 (txt, md, html)')
+    parser.add_argument('--index', type=str, default='./index/documents',
+                       help='인덱스 저장 폴더')
+    parser.add_argument('--chunk_size', type=int, default=DEFAULT_CHUNK_SIZE,
+                       help='청크 길이 (문자 수)')
+    parser.add_argument('--chunk_overlap', type=int, default=DEFAULT_CHUNK_OVERLAP,
+                       help='청크 겹침 길이 (문자 수)')
+    parser.add_argument('--batch_size', type=int, default=DEFAULT_EMBED_BATCH_SIZE,
+                       help='임베딩 배치 크기')
+
+    args = parser.parse_args()
+
+    encoder = load_encoder()
+
+    index = DocumentIndex(
+        args.index,
+        encoder=encoder,
+        model_key=f"{EMBEDDING_CONFIG['model_name']}|{EMBEDDING_CONFIG.get('backend', 'torch')}",
+        normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings'],
+        chunk_size=args.chunk_size,
+        chunk_overlap=args.chunk_overlap,
+        embed_batch_size=args.batch_size
+    )
+    stats = index.update(args.docs)
+    print(f"완료: 추가 {stats['added']}, 변경 {stats['updated']}, 삭제 {stats['removed']}, "
+          f"유지 {stats['unchanged']} (새 청크 {stats['chunks']}개, 전체 {len(index)}개)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+"""
+임베딩 차원 축소 - 지식 베이스 임베딩으로 학습한 투영 행렬 (768차원 → 128/256차원)
+지식 베이스가 커지면 질문마다 (행 수 × 768) 유사도 계산과 메모리가 부담이 됨
+
+핵심 기능:
+    1. 지식 베이스 임베딩 캐시 (질문 목록 + 모델이 같으면 재시작 시 임베딩 생략)
+    2. 투영 행렬 학습 (NumPy, truncated SVD)
+       - 768 × 768 2차 모멘트 행렬을 청크 단위로 누적 → 고유값 분해
+       - 100만 행이어도 전체 행렬 SVD 없이 학습 가능
+    3. 투영 행렬을 임베딩 캐시 옆에 저장 (projection-<차원>.npz)
+    4. 검색 시 질문 임베딩에도 같은 투영 적용
+    5. 투영 후 다시 정규화 → 내적 = 투영 공간의 코사인 유사도
+
+투영 후 다시 정규화하는 이유:
+    - 투영하면 버린 차원만큼 길이가 줄어듦 (768 → 128이면 같은 문장끼리도 내적 0.4 안팎)
+    - 다시 정규화하지 않으면 0.4/0.6/0.8 임계값에서 답변이 사라짐
+
+평균을 빼지 않는 이유 (PCA 대신 truncated SVD):
+    - 정규화 후 내적이 원래 코사인 유사도와 값의 범위가 같음 → 임계값 0.4/0.6/0.8을 그대로 사용
+    - 평균을 빼면 유사도 분포가 달라져 임계값을 다시 맞춰야 함
+
+설정 (config.py):
+    EMBEDDING_CONFIG = {
+        ...
+        'projection_dim': 256,                            # None이면 사용 안 함 (기본값)
+        'embedding_cache_dir': './index/knowledge_base',  # 임베딩 캐시 + 투영 행렬 저장 폴더
+    }
+
+평가:
+    python benchmark.py projection --size 10000 --dims 128,256
+    → 차원별 top-1/top-5 일치율, 임계값 판단(답변/추천/답변 없음) 일치율, 메모리 절감량, 검색 지연시간
+"""
+import os
+import glob
+import hashlib
+import logging
+from typing import List, Optional
+import numpy as np
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = './index/knowledge_base'
+# 2차 모멘트 누적 시 한 번에 처리할 행 수
+_FIT_CHUNK = 65536
+
+
+class Projection:
+    """
+    차원 축소 투영 (원래 차원 → dim)
+
+    Attributes:
+        components: (원래 차원, dim) 투영 행렬
+        energy: 보존된 에너지 비율 (상위 dim개 특이값 제곱 합 / 전체, 1에 가까울수록 손실 적음)
+    """
+
+    def __init__(self, components: np.ndarray, energy: float):
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.energy = float(energy)
+
+    @property
+    def dim(self) -> int:
+        return self.components.shape[1]
+
+    def transform(self, vectors: np.ndarray) -> np.ndarray:
+        """(n, 원래 차원) 또는 (원래 차원,) → (n, dim) 또는 (dim,), 행별로 다시 정규화"""
+        return normalize_rows(np.asarray(vectors, dtype=np.float32) @ self.components)
+
+    def save(self, path: str, fingerprint: str):
+        tmp_path = f"{path}.tmp-{os.getpid()}.npz"
+        np.savez(tmp_path, components=self.components, energy=self.energy, fingerprint=fingerprint)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> Optional['Projection']:
+        """저장된 투영 로딩 (지식 베이스가 바뀌어 fingerprint가 다르면 None)"""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            if str(data['fingerprint']) != fingerprint:
+                return None
+            return cls(data['components'], float(data['energy']))
+
+
+def fit_projection(embeddings: np.ndarray, dim: int) -> Projection:
+    """
+    임베딩 행렬로 투영 행렬 학습 (truncated SVD)
+
+    Args:
+        embeddings: (행 수, 원래 차원) 정규화된 임베딩
+        dim: 목표 차원 (원래 차원보다 크면 원래 차원)
+
+    Returns:
+        Projection
+
+    Process:
+        1. XᵀX (원래 차원 × 원래 차원) 청크 단위 누적 (float64)
+        2. 고유값 분해 → 고유값 큰 순서로 dim개 고유벡터 선택
+           (XᵀX의 고유벡터 = X의 오른쪽 특이벡터)
+
+    Note:
+        - 행 수가 dim보다 적으면 나머지 방향은 정보가 없음 (경고만 출력)
+    """
+    n, full_dim = embeddings.shape
+    dim = min(dim, full_dim)
+    if n < dim:
+        logger.warning(f"지식 베이스 {n}행 < 투영 차원 {dim}: 일부 차원은 정보 없음")
+
+    moment = np.zeros((full_dim, full_dim), dtype=np.float64)
+    for start in range(0, n, _FIT_CHUNK):
+        chunk = np.asarray(embeddings[start:start + _FIT_CHUNK], dtype=np.float64)
+        moment += chunk.T @ chunk
+
+    eigenvalues, eigenvectors = np.linalg.eigh(moment)
+    order = np.argsort(eigenvalues)[::-1][:dim]
+    total = eigenvalues.clip(min=0).sum()
+    energy = eigenvalues[order].clip(min=0).sum() / total if total > 0 else 0.0
+    return Projection(eigenvectors[:, order], energy)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """행별 L2 정규화 (크기 0인 행은 그대로 0)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def kb_fingerprint(texts: List[str], model_key: str) -> str:
+    """지식 베이스 질문 목록 + 모델 설정의 해시 (캐시 유효성 확인용)"""
+    digest = hashlib.sha256(model_key.encode('utf-8'))
+    for text in texts:
+        digest.update(b'\0')
+        digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class EmbeddingCache:
+    """
+    지식 베이스 임베딩 + 투영 행렬 캐시
+
+    파일 구조:
+        <cache_dir>/embeddings.npy            정규화된 원래 차원 임베딩
+        <cache_dir>/embeddings.fingerprint    위 임베딩을 만든 질문 목록/모델의 해시 (행 수 포함)
+        <cache_dir>/projection-<dim>.npz      차원별 투영 행렬 (fingerprint 포함)
+
+    Note:
+        - 캐시는 지식 베이스 하나만 보관 (fingerprint가 바뀌면 투영 행렬도 지움)
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self._embeddings_path = os.path.join(cache_dir, 'embeddings.npy')
+        self._fingerprint_path = os.path.join(cache_dir, 'embeddings.fingerprint')
+
+    def load_embeddings(self, fingerprint: str) -> Optional[np.ndarray]:
+        """
+        캐시된 임베딩 (없거나 fingerprint가 다르면 None)
+
+        Note:
+            - 두 파일은 따로 교체되므로 읽는 사이에 다른 워커가 저장할 수 있음
+              → fingerprint를 임베딩 전후로 두 번 읽어서 같고, 행 수도 맞을 때만 사용
+              (저장하는 쪽은 임베딩을 바꾸기 전에 fingerprint부터 지움)
+        """
+        try:
+            before = self._read_fingerprint()
+            if before is None or before[0] != fingerprint:
+                return None
+            embeddings = np.load(self._embeddings_path)
+            if self._read_fingerprint() != before or len(embeddings) != before[1]:
+                return None
+            return embeddings
+        except (OSError, ValueError):
+            return None
+
+    def _read_fingerprint(self):
+        """(fingerprint, 행 수), 파일이 없거나 예전 형식이면 None"""
+        with open(self._fingerprint_path, 'r', encoding='utf-8') as f:
+            parts = f.read().split()
+        if len(parts) != 2:
+            return None
+        return parts[0], int(parts[1])
+
+    def save_embeddings(self, fingerprint: str, embeddings: np.ndarray):
+        """
+        임베딩 + fingerprint 저장
+
+        Note:
+            - 프로세스별 임시 파일에 쓴 뒤 교체 (여러 워커가 동시에 저장해도 파일이 섞이지 않음)
+            - 순서: fingerprint 삭제 → 임베딩 교체 → fingerprint 교체
+              (읽는 쪽이 새 임베딩을 예전 fingerprint와 짝짓지 않도록)
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        try:
+            os.remove(self._fingerprint_path)
+        except FileNotFoundError:
+            pass
+        for path in glob.glob(os.path.join(self.cache_dir, 'projection-*.npz')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass  # 다른 워커가 이미 지움
+
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        tmp_path = f"{self._embeddings_path}.tmp-{os.getpid()}.npy"
+        np.save(tmp_path, embeddings)
+        os.replace(tmp_path, self._embeddings_path)
+
+        tmp_path = f"{self._fingerprint_path}.tmp-{os.getpid()}"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(f"{fingerprint} {len(embeddings)}")
+        os.replace(tmp_path, self._fingerprint_path)
+
+    def projection(self, fingerprint: str, embeddings: np.ndarray, dim: int) -> Projection:
+        """저장된 투영 행렬 로딩, 없으면 학습 후 저장"""
+        path = os.path.join(self.cache_dir, f'projection-{dim}.npz')
+        projection = Projection.load(path, fingerprint)
+        if projection is None:
+            projection = fit_projection(embeddings, dim)
+            os.makedirs(self.cache_dir, exist_ok=True)
+            projection.save(path, fingerprint)
+            logger.info(f"투영 행렬 학습 완료: {embeddings.shape[1]} → {projection.dim}차원 "
+                        f"(보존 에너지 {projection.energy:.3f})")
+        return projection
@@ -0,0 +1,160 @@
+"""
+임베딩 배치 스케줄러 - 길이가 비슷한 문장끼리 묶어서 패딩 낭비 줄이기
+고정 batch_size로 짧은 문장과 긴 문서 청크를 섞어 인코딩하면 짧은 문장이 긴 문장 길이만큼 패딩됨
+
+핵심 기능:
+    1. 토큰 길이 계산 (모델 토크나이저 사용)
+    2. 길이순 정렬 → 토큰 예산(token_budget) 안에서 배치 구성
+       - 짧은 문장: 큰 배치 (예: 256개)
+       - 긴 문장: 작은 배치 (예: 16개)
+    3. 배치마다 가장 긴 문장 길이까지만 패딩 (동적 시퀀스 길이)
+    4. 원래 순서로 결과 복원
+
+예시 (token_budget=8192):
+    길이 16 토큰 문장 → 한 배치에 최대 512개
+    길이 256 토큰 청크 → 한 배치에 최대 32개
+
+사용 예:
+    from encode_scheduler import encode_bucketed
+    embeddings = encode_bucketed(model, texts, normalize_embeddings=True)
+"""
+import logging
+from typing import List, Tuple
+import numpy as np
+from metrics import BATCH_SIZES
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 배치당 최대 토큰 수 (패딩 포함, 배치 크기 × 배치 내 최대 길이)
+DEFAULT_TOKEN_BUDGET = 8192
+# 배치당 최대 문장 수
+DEFAULT_MAX_BATCH_SIZE = 512
+# 토큰 길이 계산 시 한 번에 토크나이즈할 문장 수
+_TOKENIZE_CHUNK = 4096
+
+
+def token_lengths(encoder, texts: List[str]) -> np.ndarray:
+    """
+    문장별 토큰 길이 (특수 토큰 포함, 최대 길이에서 잘림)
+
+    Note:
+        - 토크나이저가 없는 인코더는 문자 수로 대신함
+    """
+    tokenizer = getattr(encoder, 'tokenizer', None)
+    max_length = getattr(encoder, 'max_seq_length', None) or 512
+    if tokenizer is None:
+        return np.fromiter((min(len(t), max_length) for t in texts), dtype=np.int64, count=len(texts))
+
+    lengths = np.empty(len(texts), dtype=np.int64)
+    for start in range(0, len(texts), _TOKENIZE_CHUNK):
+        chunk = texts[start:start + _TOKENIZE_CHUNK]
+        ids = tokenizer(chunk, add_special_tokens=True, truncation=True, max_length=max_length)['input_ids']
+        lengths[start:start + len(chunk)] = [len(x) for x in ids]
+    return lengths
+
+
+def plan_batches(lengths: np.ndarray, token_budget: int = DEFAULT_TOKEN_BUDGET,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE) -> List[np.ndarray]:
+    """
+    토큰 예산 안에서 길이가 비슷한 문장끼리 배치 구성
+
+    Args:
+        lengths: 문장별 토큰 길이
+        token_budget: 배치당 최대 토큰 수 (배치 크기 × 배치 내 최대 길이)
+        max_batch_size: 배치당 최대 문장 수
+
+    Returns:
+        List[np.ndarray]: 배치별 원래 인덱스 (짧은 문장 배치부터)
+
+    Process:
+        1. 길이 오름차순 정렬
+        2. 다음 문장을 넣었을 때 (개수 × 그 문장 길이)가 예산을 넘으면 새 배치
+           (정렬돼 있으므로 마지막에 넣은 문장이 배치 내 최대 길이)
+    """
+    order = np.argsort(lengths, kind='stable')
+    batches = []
+    start = 0
+    for pos in range(len(order)):
+        size = pos - start + 1
+        if size > 1 and (size * lengths[order[pos]] > token_budget or size > max_batch_size):
+            batches.append(order[start:pos])
+            start = pos
+    if start < len(order):
+        batches.append(order[start:])
+    return batches
+
+
+def padding_stats(lengths: np.ndarray, batches: List[np.ndarray]) -> dict:
+    """
+    배치 구성의 패딩 효율
+
+    Returns:
+        dict: {"batches", "real_tokens", "padded_tokens", "efficiency"}
+              efficiency = 실제 토큰 / 패딩 포함 토큰 (1에 가까울수록 낭비 없음)
+    """
+    real = int(lengths.sum())
+    padded = int(sum(len(b) * lengths[b].max() for b in batches if len(b)))
+    return {
+        'batches': len(batches),
+        'real_tokens': real,
+        'padded_tokens': padded,
+        'efficiency': round(real / padded, 4) if padded else None,
+    }
+
+
+def fixed_batches(lengths: np.ndarray, batch_size: int) -> List[np.ndarray]:
+    """비교용: 입력 순서 그대로 고정 크기 배치"""
+    index = np.arange(len(lengths))
+    return [index[i:i + batch_size] for i in range(0, len(index), batch_size)]
+
+
+def encode_bucketed(encoder, texts: List[str], token_budget: int = DEFAULT_TOKEN_BUDGET,
+                    max_batch_size: int = DEFAULT_MAX_BATCH_SIZE, normalize_embeddings: bool = True,
+                    source: str = 'bucketed', show_progress_bar: bool = False) -> np.ndarray:
+    """
+    길이별 배치로 인코딩 후 원래 순서로 반환
+
+    Args:
+        encoder: encode()가 있는 인코더 (SentenceTransformer / OnnxEncoder)
+        texts: 인코딩할 문장 목록
+        token_budget: 배치당 최대 토큰 수
+        max_batch_size: 배치당 최대 문장 수
+        normalize_embeddings: 임베딩 정규화 여부
+        source: /metrics 배치 크기 라벨 (knowledge_base, document, query ...)
+        show_progress_bar: 배치 진행 상황 로그 출력
+
+    Returns:
+        np.ndarray: (len(texts), dim) float32, texts와 같은 순서
+    """
+    if not texts:
+        return np.empty((0, 0), dtype=np.float32)
+
+    lengths = token_lengths(encoder, texts)
+    batches = plan_batches(lengths, token_budget, max_batch_size)
+
+    output = None
+    for n, index in enumerate(batches, 1):
+        # 배치 하나를 통째로 넘김 → 배치 내 최대 길이까지만 패딩
+        embeddings = encoder.encode(
+            [texts[i] for i in index],
+            convert_to_numpy=True,
+            normalize_embeddings=normalize_embeddings,
+            batch_size=len(index),
+            show_progress_bar=False
+        )
+        if output is None:
+            output = np.empty((len(texts), embeddings.shape[1]), dtype=np.float32)
+        output[index] = embeddings
+        BATCH_SIZES.observe(len(index), source=source)
+        if show_progress_bar and (n % 50 == 0 or n == len(batches)):
+            logger.info(f"임베딩 배치 {n}/{len(batches)}")
+    return output
+
+
+def encoder_settings() -> Tuple[int, int]:
+    """설정 파일의 (token_budget, max_batch_size), 없으면 기본값"""
+    from config import EMBEDDING_CONFIG
+    return (EMBEDDING_CONFIG.get('token_budget', DEFAULT_TOKEN_BUDGET),
+            EMBEDDING_CONFIG.get('max_batch_size', DEFAULT_MAX_BATCH_SIZE))
@@ -0,0 +1,414 @@
+"""
+임베딩 인코더 백엔드 - GPU 없는 서버에서 질문 임베딩을 더 빠르고 가볍게
+PyTorch eager 모드 대신 ONNX Runtime / int8 양자화 모델 선택 가능
+
+백엔드 종류:
+    1. torch:       SentenceTransformer 그대로 (기본값, 기준)
+    2. torch-int8:  PyTorch 동적 int8 양자화 (Linear 레이어, 시작할 때마다 양자화)
+    3. onnx:        ONNX Runtime (float32)
+    4. onnx-int8:   ONNX Runtime + 동적 int8 양자화
+
+작동 방식 (onnx 계열):
+    1. 처음 한 번: 로컬 모델을 변환해서 models/<모델>/<백엔드>/<모델 버전>/ 폴더에 저장 (export)
+       - 임시 폴더에 다 만든 뒤 폴더째 교체 → 다른 워커가 덜 만든 파일을 읽지 않음
+       - 모델이 바뀌면(버전이 다르면) 새 폴더에 다시 변환
+    2. 이후: 저장된 파일을 바로 로딩 (변환 생략)
+    3. parity 검사: 기준(torch) 임베딩과 코사인 유사도 비교
+
+설정 (config.py):
+    EMBEDDING_CONFIG = {
+        ...
+        'backend': 'onnx',          # torch / torch-int8 / onnx / onnx-int8
+        'artifact_dir': './models', # 변환된 모델 저장 폴더
+        'model_revision': None,     # 모델 버전 (선택, 없으면 자동 확인)
+    }
+
+실행 방법:
+    python encoder_backends.py export --backend onnx-int8
+    python encoder_backends.py parity --backend onnx-int8
+"""
+import os
+import json
+import shutil
+import tempfile
+import logging
+from contextlib import contextmanager
+from typing import List, Union
+import numpy as np
+from config import EMBEDDING_CONFIG
+from inference_runtime import inference_threads
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'torch-int8', 'onnx', 'onnx-int8')
+DEFAULT_ARTIFACT_DIR = './models'
+# parity 허용 오차 (1 - 최소 코사인 유사도): 0.01 → 모든 문장이 기준과 코사인 0.99 이상이어야 통과
+DEFAULT_PARITY_TOLERANCE = 0.01
+
+
+def _model_revision() -> str:
+    """
+    모델 버전 식별자 (변환 파일 폴더 이름)
+
+    순서:
+        1. EMBEDDING_CONFIG['model_revision'] (직접 지정)
+        2. 로컬 폴더 모델: 폴더 안 파일 이름/크기/수정 시각 해시
+        3. HuggingFace Hub 모델: 받아 둔 스냅샷의 커밋 해시 (네트워크 사용 안 함)
+        4. 아직 받지 않은 모델이면 'unknown' (export_onnx가 모델을 받은 뒤 다시 확인)
+    """
+    import hashlib
+
+    revision = EMBEDDING_CONFIG.get('model_revision')
+    if revision:
+        return str(revision).replace('/', '__')
+    path = EMBEDDING_CONFIG['model_name']
+    if os.path.isdir(path):
+        digest = hashlib.sha1()
+        for root, _, files in sorted(os.walk(path)):
+            for name in sorted(files):
+                stat = os.stat(os.path.join(root, name))
+                digest.update(f"{os.path.relpath(os.path.join(root, name), path)}|{stat.st_size}|{stat.st_mtime_ns}".encode('utf-8'))
+        return digest.hexdigest()[:12]
+    try:
+        from huggingface_hub import snapshot_download
+        return os.path.basename(snapshot_download(path, local_files_only=True))[:12]
+    except Exception:
+        return 'unknown'
+
+
+def _artifact_path(backend: str, artifact_dir: str = None) -> str:
+    """백엔드별 변환 모델 저장 위치 (models/<모델 이름>/<백엔드>/<모델 버전>)"""
+    artifact_dir = artifact_dir or EMBEDDING_CONFIG.get('artifact_dir', DEFAULT_ARTIFACT_DIR)
+    model_dir = EMBEDDING_CONFIG['model_name'].replace('/', '__')
+    return os.path.join(artifact_dir, model_dir, backend, _model_revision())
+
+
+@contextmanager
+def _staging_dir(final_dir: str):
+    """
+    임시 폴더에 변환 파일을 만든 뒤 폴더째 final_dir로 교체
+
+    Note:
+        - 다른 워커가 먼저 끝냈으면 그쪽 결과를 쓰고 내 임시 폴더는 삭제
+        - 중간에 실패하면 임시 폴더 삭제 (final_dir은 그대로 없음)
+    """
+    parent = os.path.dirname(final_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix='.tmp-')
+    try:
+        yield tmp_dir
+        if os.path.isdir(final_dir) and not os.path.exists(os.path.join(final_dir, 'model.onnx')):
+            shutil.rmtree(final_dir, ignore_errors=True)  # 예전 방식으로 덜 만들어진 폴더
+        try:
+            os.replace(tmp_dir, final_dir)
+        except OSError:
+            if not os.path.exists(os.path.join(final_dir, 'model.onnx')):
+                raise
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def _load_sentence_transformer():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_CONFIG['model_name'], device=EMBEDDING_CONFIG['device'])
+
+
+# ----------------------------------------------------------------------
+# PyTorch int8
+# ----------------------------------------------------------------------
+def _load_torch_int8():
+    """
+    PyTorch 동적 int8 양자화 모델 로딩
+
+    Note:
+        - 변환 파일을 저장하지 않고 시작할 때마다 원래 모델을 양자화 (Linear 레이어, 수 초)
+          (저장해 두어도 양자화 구조를 만들려면 원래 float32 모델을 먼저 올려야 해서
+           로딩 시간/최대 메모리가 줄지 않음)
+        - CPU 전용 (양자화 연산은 CPU에서만 동작)
+    """
+    import torch
+
+    model = _load_sentence_transformer().to('cpu')
+    model.eval()
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# ----------------------------------------------------------------------
+# ONNX Runtime
+# ----------------------------------------------------------------------
+def export_onnx(artifact_dir: str = None, quantize: bool = False) -> str:
+    """
+    로컬 SentenceTransformer → ONNX 변환 후 저장
+
+    Args:
+        artifact_dir: 저장 폴더 (기본값: EMBEDDING_CONFIG['artifact_dir'] 또는 ./models)
+        quantize: True면 int8 동적 양자화 모델도 생성 (onnx-int8)
+
+    Returns:
+        str: 저장된 폴더 경로
+
+    저장 파일:
+        - model.onnx        (transformer 본체, 출력: last_hidden_state)
+        - tokenizer 파일들   (tokenizer.save_pretrained)
+        - encoder.json      (pooling 방식, 최대 길이, Normalize 모듈 여부)
+
+    Raises:
+        ValueError: Transformer → Pooling(cls/mean) → (Normalize) 이외의 구성
+                    (Dense 등은 ONNX 인코더가 재현하지 못함)
+    """
+    import torch
+
+    fp32_dir = _artifact_path('onnx', artifact_dir)
+
+    if not os.path.exists(os.path.join(fp32_dir, 'model.onnx')):
+        st_model = _load_sentence_transformer().to('cpu')
+        # 처음 받은 모델이면 버전을 이제 알 수 있음
+        fp32_dir = _artifact_path('onnx', artifact_dir)
+        if not os.path.exists(os.path.join(fp32_dir, 'model.onnx')):
+            _export_fp32(st_model, fp32_dir)
+
+    if not quantize:
+        return fp32_dir
+
+    int8_dir = _artifact_path('onnx-int8', artifact_dir)
+    if not os.path.exists(os.path.join(int8_dir, 'model.onnx')):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+
+        with _staging_dir(int8_dir) as tmp_dir:
+            shutil.copytree(fp32_dir, tmp_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns('model.onnx'))
+            quantize_dynamic(os.path.join(fp32_dir, 'model.onnx'), os.path.join(tmp_dir, 'model.onnx'),
+                             weight_type=QuantType.QInt8)
+        logger.info(f"ONNX int8 모델 저장: {int8_dir}")
+    return int8_dir
+
+
+def _export_fp32(st_model, fp32_dir: str):
+    """SentenceTransformer → model.onnx + 토크나이저 + encoder.json (임시 폴더에서 만든 뒤 교체)"""
+    import torch
+
+    transformer = st_model[0]
+    pooling = st_model[1]
+    modules = [type(module).__name__ for module in st_model]
+    if modules[:2] != ['Transformer', 'Pooling'] or any(m != 'Normalize' for m in modules[2:]):
+        raise ValueError(f"ONNX 변환을 지원하지 않는 모델 구성: {modules}")
+    if not (pooling.pooling_mode_cls_token or pooling.pooling_mode_mean_tokens):
+        raise ValueError("ONNX 변환은 cls / mean pooling만 지원")
+
+    with _staging_dir(fp32_dir) as tmp_dir:
+        dummy = transformer.tokenizer(['ONNX 변환용 예시 문장'], return_tensors='pt')
+        torch.onnx.export(
+            transformer.auto_model,
+            (dummy['input_ids'], dummy['attention_mask']),
+            os.path.join(tmp_dir, 'model.onnx'),
+            input_names=['input_ids', 'attention_mask'],
+            output_names=['last_hidden_state'],
+            dynamic_axes={
+                'input_ids': {0: 'batch', 1: 'sequence'},
+                'attention_mask': {0: 'batch', 1: 'sequence'},
+                'last_hidden_state': {0: 'batch', 1: 'sequence'},
+            },
+            opset_version=14
+        )
+        transformer.tokenizer.save_pretrained(tmp_dir)
+        with open(os.path.join(tmp_dir, 'encoder.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'pooling': 'cls' if pooling.pooling_mode_cls_token else 'mean',
+                'max_seq_length': st_model.max_seq_length,
+                'dim': st_model.get_sentence_embedding_dimension(),
+                'normalize': 'Normalize' in modules,
+            }, f, indent=2)
+    logger.info(f"ONNX 모델 저장: {fp32_dir}")
+
+
+class OnnxEncoder:
+    """
+    ONNX Runtime 인코더 (SentenceTransformer.encode와 같은 사용법)
+
+    Attributes:
+        tokenizer: HuggingFace 토크나이저
+        max_seq_length: 최대 토큰 길이
+        pooling: 'mean' 또는 'cls'
+        normalize: 원래 모델에 Normalize 모듈이 있으면 True (항상 정규화해서 반환)
+    """
+
+    def __init__(self, model_dir: str, num_threads: int = None):
+        """
+        Args:
+            model_dir: export_onnx가 만든 폴더
+            num_threads: ONNX Runtime intra-op 스레드 수 (None이면 기본값)
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        with open(os.path.join(model_dir, 'encoder.json'), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        self.pooling = meta['pooling']
+        self.max_seq_length = meta['max_seq_length']
+        self.dim = meta['dim']
+        self.normalize = meta.get('normalize', False)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, 'model.onnx'), options, providers=['CPUExecutionProvider'])
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False,
+               show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        """
+        문장 → 임베딩 (SentenceTransformer.encode 호환)
+
+        Note:
+            - 입력이 문자열 하나면 1차원 벡터 반환
+            - 길이순으로 정렬해서 배치 구성 (패딩 낭비 감소) 후 원래 순서로 복원
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        order = np.argsort([-len(s) for s in sentences], kind='stable')
+        output = np.empty((len(sentences), self.dim), dtype=np.float32)
+        for start in range(0, len(sentences), batch_size):
+            index = order[start:start + batch_size]
+            output[index] = self._encode_batch([sentences[i] for i in index])
+
+        if normalize_embeddings or self.normalize:
+            norms = np.linalg.norm(output, axis=1, keepdims=True)
+            output = output / np.clip(norms, 1e-12, None)
+        return output[0] if single else output
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        tokens = self.tokenizer(texts, padding=True, truncation=True,
+                                max_length=self.max_seq_length, return_tensors='np')
+        attention_mask = tokens['attention_mask'].astype(np.int64)
+        hidden = self.session.run(None, {
+            'input_ids': tokens['input_ids'].astype(np.int64),
+            'attention_mask': attention_mask,
+        })[0]
+        if self.pooling == 'cls':
+            return hidden[:, 0]
+        # mean pooling (패딩 토큰 제외)
+        mask = attention_mask[:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+
+# ----------------------------------------------------------------------
+# 공통 진입점
+# ----------------------------------------------------------------------
+def load_encoder(backend: str = None, artifact_dir: str = None):
+    """
+    설정된 백엔드의 인코더 로딩
+
+    Args:
+        backend: torch / torch-int8 / onnx / onnx-int8
+                 (None이면 EMBEDDING_CONFIG['backend'], 없으면 torch)
+        artifact_dir: 변환 모델 저장 폴더
+
+    Returns:
+        encode() 메서드가 있는 인코더 (SentenceTransformer 호환)
+
+    Note:
+        - onnx 계열은 변환 파일이 없으면 자동으로 변환 후 저장 (모델 버전마다 1회)
+    """
+    backend = backend or EMBEDDING_CONFIG.get('backend', 'torch')
+    if backend not in BACKENDS:
+        raise ValueError(f"알 수 없는 인코더 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+
+    logger.info(f"임베딩 모델 로딩 중: {EMBEDDING_CONFIG['model_name']} (백엔드: {backend})")
+    if backend == 'torch':
+        return _load_sentence_transformer()
+    if backend == 'torch-int8':
+        return _load_torch_int8()
+
+    model_dir = _artifact_path(backend, artifact_dir)
+    if not os.path.exists(os.path.join(model_dir, 'model.onnx')):
+        model_dir = export_onnx(artifact_dir, quantize=(backend == 'onnx-int8'))
+    # 스레드 수: 설정값 > 워커당 스레드 수(inference_runtime) > ONNX Runtime 기본값
+    return OnnxEncoder(model_dir, num_threads=EMBEDDING_CONFIG.get('num_threads') or inference_threads())
+
+
+def parity_check(reference, candidate, texts: List[str],
+                 tolerance: float = DEFAULT_PARITY_TOLERANCE) -> dict:
+    """
+    두 인코더의 임베딩이 같은지 확인
+
+    Args:
+        reference: 기준 인코더 (보통 torch)
+        candidate: 비교할 인코더
+        texts: 비교할 문장 목록 (보통 지식 베이스 질문들)
+        tolerance: 허용 오차 (코사인 유사도가 1 - tolerance 이상이면 통과)
+
+    Returns:
+        dict: {"passed", "min_cosine", "mean_cosine", "max_abs_diff", "top1_agreement"}
+
+    Note:
+        - top1_agreement: 각 문장을 질문으로 썼을 때 가장 비슷한 문장이 같은 비율
+    """
+    ref = reference.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    cand = candidate.encode(texts, convert_to_numpy=True, normalize_embeddings=True)
+    return compare_embeddings(ref, cand, tolerance)
+
+
+def compare_embeddings(ref: np.ndarray, cand: np.ndarray,
+                       tolerance: float = DEFAULT_PARITY_TOLERANCE) -> dict:
+    """정규화된 임베딩 두 벌 비교 (parity_check 결과와 같은 형식)"""
+    ref = np.asarray(ref, dtype=np.float32)
+    cand = np.asarray(cand, dtype=np.float32)
+    cosine = (ref * cand).sum(axis=1)
+    top1 = float(np.mean((ref @ ref.T).argmax(axis=1) == (cand @ cand.T).argmax(axis=1)))
+    return {
+        'passed': bool(cosine.min() >= 1 - tolerance),
+        'min_cosine': round(float(cosine.min()), 6),
+        'mean_cosine': round(float(cosine.mean()), 6),
+        'max_abs_diff': round(float(np.abs(ref - cand).max()), 6),
+        'top1_agreement': round(top1, 4),
+    }
+
+
+def main():
+    """메인 실행 함수 (모델 변환 / parity 검사)"""
+    import argparse
+    import pandas as pd
+
+    parser = argparse.ArgumentParser(description='임베딩 인코더 백엔드 관리')
+    parser.add_argument('command', choices=['export', 'parity'],
+                       help='export: 변환 후 저장, parity: 기준(torch)과 임베딩 비교')
+    parser.add_argument('--backend', choices=BACKENDS[1:], default='onnx',
+                       help='대상 백엔드')
+    parser.add_argument('--artifact_dir', type=str, default=None,
+                       help='변환 모델 저장 폴더 (기본값: ./models)')
+    parser.add_argument('--excel_path', type=str, default='./data/data.xlsx',
+                       help='parity 검사용 질문 엑셀')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_PARITY_TOLERANCE,
+                       help='parity 허용 오차 (1 - 최소 코사인 유사도)')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        if args.backend == 'torch-int8':
+            print("torch-int8은 저장할 변환 파일이 없습니다 (시작할 때마다 양자화).")
+            return
+        path = export_onnx(args.artifact_dir, quantize=(args.backend == 'onnx-int8'))
+        print(f"변환 완료: {args.backend} → {path}")
+        return
+
+    texts = [str(q).strip() for q in pd.read_excel(args.excel_path)['질문']]
+    result = parity_check(load_encoder('torch'), load_encoder(args.backend, args.artifact_dir),
+                          texts, tolerance=args.tolerance)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if not result['passed']:
+        raise SystemExit(f"parity 검사 실패: 최소 코사인 유사도 {result['min_cosine']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""
+추론 실행 환경 - 워커 수에 맞춰 torch/BLAS 스레드 수 조정 + CPU 코어 고정
+gunicorn 워커 여러 개가 각자 코어 수만큼 스레드를 만들면 CPU를 서로 뺏어서 p99 지연시간이 폭증
+
+문제 예시 (8코어 서버, 워커 2개):
+    - 기본값: 워커마다 torch 스레드 8개 → 16개 스레드가 8코어 경쟁
+    - 조정 후: 워커마다 4개 → 8개 스레드 = 8코어
+
+gthread 워커 (워커마다 요청 스레드 여러 개):
+    - 요청 스레드마다 인코딩이 동시에 돌고, 각각 추론 스레드를 씀
+    - 추론 스레드 = 코어 수 ÷ (워커 수 × 요청 스레드 수)
+      예: 8코어, 워커 2개, 요청 스레드 4개 → 추론 스레드 1개 (동시 인코딩 8개 = 8코어)
+
+핵심 기능:
+    1. 워커 수 / 사용 가능한 코어 수로 워커당 스레드 수 계산
+    2. OMP/MKL/OpenBLAS 환경변수 + torch.set_num_threads 설정
+    3. (선택) 워커마다 서로 겹치지 않는 코어 집합에 고정 (Linux)
+    4. 선택된 구성을 /api/health에 표시
+
+설정 (환경변수):
+    KTRGPT_WORKERS=2          워커 수 (gunicorn workers와 같게)
+    KTRGPT_THREADS=4          워커당 스레드 수 (없으면 자동 계산)
+    KTRGPT_REQUEST_THREADS=4  워커당 요청 스레드 수 (gunicorn threads와 같게, 기본값 1)
+    KTRGPT_PIN_CORES=1        코어 고정 사용
+
+사용 예 (gunicorn.conf.py):
+    import inference_runtime
+    inference_runtime.configure_process(workers=workers, request_threads=threads)   # 마스터 (preload 전)
+    worker_slots = inference_runtime.WorkerSlots(workers)
+
+    def pre_fork(server, worker):
+        worker.slot = worker_slots.acquire()                    # 마스터: 빈 번호 배정
+
+    def post_fork(server, worker):
+        inference_runtime.configure_process(workers=workers, worker_index=worker.slot,
+                                            request_threads=threads)
+
+    def child_exit(server, worker):
+        worker_slots.release(worker.slot)                       # 마스터: 번호 반납
+
+Note:
+    - 환경변수는 numpy/torch import 전에 설정해야 효과가 있으므로 이 모듈은 가장 먼저 import
+    - 이 모듈은 numpy/torch를 최상단에서 import하지 않음
+"""
+import os
+import logging
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 스레드 수를 제어하는 환경변수 (BLAS/OpenMP 라이브러리별)
+THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS',
+                   'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS')
+
+# 현재 프로세스에 적용된 구성 (/api/health 표시용)
+_topology = None
+
+
+def available_cores() -> list:
+    """이 프로세스가 쓸 수 있는 CPU 코어 번호 목록"""
+    if hasattr(os, 'sched_getaffinity'):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def plan_topology(workers: int = 1, worker_index: int = None, threads: int = None,
+                  cores: list = None, request_threads: int = 1) -> dict:
+    """
+    워커당 스레드 수와 코어 집합 계산
+
+    Args:
+        workers: 전체 워커 수
+        worker_index: 이 워커 번호 (0부터, None이면 마스터/단일 프로세스)
+        threads: 인코딩 1건당 추론 스레드 수 (None이면 코어 수 ÷ (워커 수 × 요청 스레드 수))
+        cores: 사용 가능한 코어 목록 (None이면 자동)
+        request_threads: 워커당 요청 스레드 수 (gunicorn gthread의 threads, sync면 1)
+
+    Returns:
+        dict: {"workers", "worker_index", "request_threads", "available_cores", "threads", "cores"}
+
+    Example:
+        8코어, workers=2, worker_index=1 → threads=4, cores=[4, 5, 6, 7]
+        8코어, workers=2, worker_index=1, request_threads=4 → threads=1, cores=[4, 5, 6, 7]
+    """
+    cores = cores if cores is not None else available_cores()
+    workers = max(1, workers)
+    request_threads = max(1, request_threads or 1)
+    threads = threads or max(1, len(cores) // (workers * request_threads))
+
+    assigned = None
+    if worker_index is not None:
+        # 워커 하나가 동시에 쓰는 스레드 = 요청 스레드 × 추론 스레드
+        span = min(threads * request_threads, len(cores))
+        start = (worker_index * span) % len(cores)
+        assigned = [cores[(start + i) % len(cores)] for i in range(span)]
+
+    return {
+        'workers': workers,
+        'worker_index': worker_index,
+        'request_threads': request_threads,
+        'available_cores': len(cores),
+        'threads': threads,
+        'cores': assigned,
+    }
+
+
+class WorkerSlots:
+    """
+    gunicorn 마스터에서 워커 번호(0 ~ workers-1) 관리
+
+    Note:
+        - worker.age는 워커를 새로 띄울 때마다 증가하는 값이라 번호로 쓰면 안 됨
+          (max_requests로 워커가 재시작되면 살아 있는 두 워커가 같은 번호 → 같은 코어에 고정)
+        - 재시작된 워커는 죽은 워커가 반납한 가장 작은 번호를 이어받음
+        - 마스터는 단일 스레드이므로 잠금 불필요
+    """
+
+    def __init__(self, workers: int):
+        self.workers = max(1, workers)
+        self._used = set()
+
+    def acquire(self) -> int:
+        """비어 있는 가장 작은 번호 (TTIN 등으로 워커가 workers보다 많으면 workers 이상 번호)"""
+        slot = 0
+        while slot in self._used:
+            slot += 1
+        self._used.add(slot)
+        return slot
+
+    def release(self, slot: int):
+        self._used.discard(slot)
+
+
+def configure_process(workers: int = None, worker_index: int = None, threads: int = None,
+                      pin: bool = None, request_threads: int = None) -> dict:
+    """
+    현재 프로세스의 추론 스레드 구성 적용
+
+    Args:
+        workers: 전체 워커 수 (None이면 KTRGPT_WORKERS, 없으면 1)
+        worker_index: 이 워커 번호 (코어 고정에 사용)
+        threads: 워커당 스레드 수 (None이면 KTRGPT_THREADS, 없으면 자동)
+        pin: 코어 고정 여부 (None이면 KTRGPT_PIN_CORES)
+        request_threads: 워커당 요청 스레드 수 (None이면 KTRGPT_REQUEST_THREADS, 없으면 1)
+
+    Returns:
+        dict: 적용된 구성 (get_topology()와 같음)
+
+    Process:
+        1. 스레드 수 계산 (plan_topology)
+        2. BLAS/OpenMP 환경변수 설정 (아직 로딩 전인 라이브러리에 적용)
+        3. torch가 이미 로딩돼 있으면 torch.set_num_threads
+        4. pin이면 os.sched_setaffinity로 코어 고정 (Linux만)
+    """
+    global _topology
+
+    workers = workers or int(os.environ.get('KTRGPT_WORKERS', '1'))
+    threads = threads or int(os.environ.get('KTRGPT_THREADS', '0')) or None
+    request_threads = request_threads or int(os.environ.get('KTRGPT_REQUEST_THREADS', '1'))
+    if pin is None:
+        pin = os.environ.get('KTRGPT_PIN_CORES') == '1'
+
+    topology = plan_topology(workers, worker_index, threads, request_threads=request_threads)
+    topology['pid'] = os.getpid()
+    topology['pinned'] = False
+
+    for name in THREAD_ENV_VARS:
+        os.environ[name] = str(topology['threads'])
+
+    if pin and topology['cores'] and hasattr(os, 'sched_setaffinity'):
+        try:
+            os.sched_setaffinity(0, topology['cores'])
+            topology['pinned'] = True
+        except OSError as e:
+            logger.warning(f"코어 고정 실패: {str(e)}")
+
+    _apply_torch_threads(topology['threads'])
+    topology['torch_threads'] = _torch_threads()
+
+    _topology = topology
+    logger.info(f"추론 스레드 구성: 워커 {workers}개 중 {worker_index}, 요청 스레드 {topology['request_threads']}개, "
+                f"추론 스레드 {topology['threads']}개, "
+                f"코어 {topology['cores'] if topology['pinned'] else '고정 안 함'}")
+    return topology
+
+
+def _apply_torch_threads(threads: int):
+    """torch 스레드 수 설정 (torch가 설치/로딩된 경우만)"""
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(threads)
+    try:
+        # inter-op 스레드는 병렬 작업 시작 전 한 번만 설정 가능
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass
+
+
+def _torch_threads():
+    try:
+        import torch
+        return torch.get_num_threads()
+    except ImportError:
+        return None
+
+
+def get_topology() -> dict:
+    """현재 프로세스 구성 (configure_process 전이면 None)"""
+    if _topology is None:
+        return None
+    topology = dict(_topology)
+    topology['torch_threads'] = _torch_threads()
+    return topology
+
+
+def inference_threads() -> int:
+    """인코더(ONNX Runtime 등)가 사용할 스레드 수 (구성 전이면 None = 라이브러리 기본값)"""
+    return _topology['threads'] if _topology else None
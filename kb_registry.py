@@ -0,0 +1,285 @@
+"""
+지식 베이스 레지스트리 - 부서별 지식 베이스(IT, 인사, 시험 절차 ...)를 서버 하나에서 제공
+임베딩 모델은 하나만 로딩해서 모든 지식 베이스가 공유 → 부서를 추가해도 모델 메모리는 그대로
+
+핵심 기능:
+    1. 설정 파일(knowledge_bases.json)로 지식 베이스 목록 관리
+    2. 처음 질문이 들어올 때 로딩 (lazy loading)
+       - 같은 지식 베이스를 동시에 요청하면 한 번만 로딩 (single-flight)
+    3. 메모리 예산을 넘으면 가장 오래 안 쓴 지식 베이스부터 제거 (LRU)
+       - 제거된 지식 베이스는 다음 요청 때 다시 로딩 (임베딩 캐시가 있어 빠름)
+    4. /api/chat의 kb 파라미터로 지식 베이스 선택
+
+설정 파일 (knowledge_bases.json):
+    {
+        "default": "it",
+        "memory_budget_mb": 512,
+        "knowledge_bases": {
+            "it": {"excel_path": "./data/data.xlsx", "document_dir": "./docs"},
+            "hr": {"excel_path": "./data/hr.xlsx"},
+            "testing": {"excel_path": "./data/testing.xlsx", "document_dir": "./docs/testing"}
+        }
+    }
+
+    - 설정 파일이 없으면 기존과 같이 data/data.xlsx 하나만 사용 ("default")
+    - 지식 베이스별 경로 (지정 안 하면 이름으로 자동):
+        미답변 로그:   logs/unanswered_<이름>.xlsx
+        임베딩 캐시:   index/knowledge_base/<이름>
+        문서 인덱스:   index/documents/<이름>
+
+사용 예:
+    registry = KnowledgeBaseRegistry(load_registry_config(), query_log_dir='logs/queries')
+    chatbot = registry.get('hr')
+    answer = chatbot.generate_answer('연차 신청 방법')
+"""
+import os
+import sys
+import json
+import threading
+import logging
+from collections import OrderedDict
+from config import EMBEDDING_CONFIG
+from single_flight import SingleFlight
+from metrics import KB_EVENTS, KB_MEMORY
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_PATH = './knowledge_bases.json'
+
+
+def load_registry_config(path: str = None) -> dict:
+    """
+    지식 베이스 설정 읽기
+
+    Args:
+        path: 설정 파일 경로 (None이면 KTRGPT_KB_CONFIG, 없으면 ./knowledge_bases.json)
+
+    Returns:
+        dict: {"default", "memory_budget_mb", "knowledge_bases": {이름: {...}}}
+
+    Note:
+        - 파일이 없으면 기존 단일 지식 베이스 구성 (data/data.xlsx, 기존 로그/캐시 경로)
+        - KTRGPT_KB_MEMORY_MB 환경변수가 있으면 memory_budget_mb 대신 사용
+    """
+    path = path or os.environ.get('KTRGPT_KB_CONFIG', DEFAULT_CONFIG_PATH)
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    else:
+        config = {
+            'default': 'default',
+            'knowledge_bases': {
+                'default': {
+                    'excel_path': './data/data.xlsx',
+                    'document_dir': './docs' if os.path.isdir('./docs') else None,
+                    'document_index_dir': './index/documents',
+                    'question_log_file': 'logs/unanswered_questions.xlsx',
+                    'embedding_cache_dir': EMBEDDING_CONFIG.get('embedding_cache_dir', './index/knowledge_base'),
+                }
+            }
+        }
+
+    if os.environ.get('KTRGPT_KB_MEMORY_MB'):
+        config['memory_budget_mb'] = float(os.environ['KTRGPT_KB_MEMORY_MB'])
+    if not config.get('knowledge_bases'):
+        raise ValueError(f"지식 베이스 설정이 비어 있음: {path}")
+    config.setdefault('default', next(iter(config['knowledge_bases'])))
+    return config
+
+
+def estimate_memory(chatbot) -> int:
+    """
+    챗봇 하나가 차지하는 메모리 추정 (바이트)
+
+    포함:
+        - 임베딩 행렬 (실제 크기, 투영 사용 시 projection_dim 기준)
+        - 질문/답변 문자열
+        - 질문 임베딩 캐시 (최대 크기 기준)
+
+    Note:
+        - 임베딩 모델은 공유하므로 제외
+        - 문서 인덱스는 memmap (OS 페이지 캐시)이므로 제외
+        - 질문 임베딩 캐시는 투영 전 벡터를 저장 (문서 검색이 원래 차원을 사용)
+          → 캐시는 인코더 출력 차원 기준
+    """
+    size = chatbot.embeddings.nbytes
+    size += sum(sys.getsizeof(q) + sys.getsizeof(a) for q, a in chatbot.knowledge_base)
+    size += chatbot._query_cache_size * _encoder_dim(chatbot) * 4
+    return int(size)
+
+
+def _encoder_dim(chatbot) -> int:
+    """인코더 출력 차원 (인코더가 알려주지 않으면 설정값)"""
+    get_dim = getattr(chatbot.embedding_model, 'get_sentence_embedding_dimension', None)
+    dim = get_dim() if get_dim else None
+    return dim or EMBEDDING_CONFIG['embedding_dim']
+
+
+class KnowledgeBaseRegistry:
+    """
+    이름 → SemanticRAGChatbot (지연 로딩 + 메모리 예산 LRU)
+
+    Attributes:
+        default: 기본 지식 베이스 이름 (kb 파라미터가 없을 때)
+        memory_budget: 메모리 예산 (바이트, None이면 제한 없음)
+    """
+
+    def __init__(self, config: dict, enable_logging: bool = True, query_log_dir: str = None,
+                 embedding_model=None):
+        """
+        Args:
+            config: load_registry_config() 결과
+            enable_logging: 미답변 질문 로깅 여부
+            query_log_dir: 질의 로그 폴더 (모든 지식 베이스가 로그 하나를 공유, "kb"로 구분)
+            embedding_model: 이미 로딩된 인코더 (None이면 처음 지식 베이스 로딩 시 1번만 로딩)
+        """
+        self.specs = config['knowledge_bases']
+        self.default = config['default']
+        budget_mb = config.get('memory_budget_mb')
+        self.memory_budget = int(budget_mb * 1024 * 1024) if budget_mb else None
+        self.enable_logging = enable_logging
+
+        self._embedding_model = embedding_model
+        self._model_lock = threading.Lock()
+        self._query_log = None
+        if query_log_dir:
+            from query_log import QueryLogWriter
+            self._query_log = QueryLogWriter(query_log_dir)
+
+        self._loaded = OrderedDict()  # 이름 → (챗봇, 추정 메모리), 최근 사용 순
+        self._lock = threading.Lock()
+        self._loading = SingleFlight('kb_load')
+
+    def names(self) -> list:
+        return list(self.specs)
+
+    def question_log_file(self, name: str = None) -> str:
+        """
+        지식 베이스의 미답변 질문 엑셀 경로 (지식 베이스를 로딩하지 않음)
+
+        Raises:
+            KeyError: 설정에 없는 이름
+        """
+        name = name or self.default
+        if name not in self.specs:
+            raise KeyError(name)
+        return self.specs[name].get('question_log_file', f'logs/unanswered_{name}.xlsx')
+
+    def get(self, name: str = None):
+        """
+        지식 베이스 챗봇 (없으면 로딩)
+
+        Args:
+            name: 지식 베이스 이름 (None/빈 문자열이면 기본값)
+
+        Raises:
+            KeyError: 설정에 없는 이름
+        """
+        name = name or self.default
+        if name not in self.specs:
+            raise KeyError(name)
+
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                self._loaded.move_to_end(name)
+                return entry[0]
+
+        chatbot, _ = self._loading.do(name, lambda: self._load_once(name))
+        return chatbot
+
+    def _load_once(self, name: str):
+        """
+        single-flight 안에서 다시 확인 후 로딩
+
+        Note:
+            - get()에서 _loaded를 확인한 직후 다른 요청의 로딩이 끝나고 flight 키까지 지워지면
+              이 요청이 새 flight를 시작함 → 여기서 다시 확인하지 않으면 같은 지식 베이스를 2번 로딩
+        """
+        with self._lock:
+            entry = self._loaded.get(name)
+            if entry is not None:
+                self._loaded.move_to_end(name)
+                return entry[0]
+        return self._load(name)
+
+    def get_loaded(self, name: str = None):
+        """이미 로딩된 지식 베이스만 반환 (없으면 None, 로딩하지 않음)"""
+        with self._lock:
+            entry = self._loaded.get(name or self.default)
+        return entry[0] if entry else None
+
+    def _encoder(self):
+        """공유 인코더 (처음 한 번만 로딩)"""
+        with self._model_lock:
+            if self._embedding_model is None:
+                from encoder_backends import load_encoder
+                self._embedding_model = load_encoder()
+                logger.info("임베딩 모델 로딩 완료 (모든 지식 베이스 공유)")
+            return self._embedding_model
+
+    def _load(self, name: str):
+        """지식 베이스 로딩 → 등록 → 예산 초과분 제거"""
+        from rag_chatbot_v2 import SemanticRAGChatbot
+
+        spec = self.specs[name]
+        logger.info(f"지식 베이스 로딩: {name}")
+        chatbot = SemanticRAGChatbot(
+            spec['excel_path'],
+            enable_logging=self.enable_logging,
+            document_dir=spec.get('document_dir'),
+            document_index_dir=spec.get('document_index_dir', os.path.join('./index/documents', name)),
+            embedding_model=self._encoder(),
+            query_log=self._query_log,
+            kb_name=name,
+            question_log_file=self.question_log_file(name),
+            embedding_cache_dir=spec.get('embedding_cache_dir', os.path.join('./index/knowledge_base', name)),
+        )
+        size = estimate_memory(chatbot)
+        KB_EVENTS.inc(kb=name, event='load')
+        KB_MEMORY.set(size, kb=name)
+
+        with self._lock:
+            self._loaded[name] = (chatbot, size)
+            self._evict_locked(keep=name)
+        return chatbot
+
+    def _evict_locked(self, keep: str):
+        """
+        메모리 예산을 넘으면 가장 오래 안 쓴 지식 베이스부터 제거 (self._lock 안에서 호출)
+
+        Note:
+            - 방금 로딩한 지식 베이스(keep)는 예산보다 커도 제거하지 않음
+            - 처리 중인 요청은 챗봇 참조를 들고 있으므로 제거돼도 끝까지 처리됨
+        """
+        if self.memory_budget is None:
+            return
+        total = sum(size for _, size in self._loaded.values())
+        for name in list(self._loaded):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            _, size = self._loaded.pop(name)
+            total -= size
+            KB_EVENTS.inc(kb=name, event='evict')
+            KB_MEMORY.set(0, kb=name)
+            logger.info(f"지식 베이스 제거 (메모리 예산 초과): {name}")
+        if total > self.memory_budget:
+            logger.warning(f"지식 베이스 '{keep}' 하나만으로 메모리 예산 초과: "
+                           f"{total / 1048576:.1f}MB > {self.memory_budget / 1048576:.1f}MB")
+
+    def stats(self) -> dict:
+        """/api/health 표시용 상태"""
+        with self._lock:
+            loaded = {name: {'knowledge_base_size': len(chatbot.knowledge_base),
+                             'memory_mb': round(size / 1048576, 2)}
+                      for name, (chatbot, size) in self._loaded.items()}
+        return {
+            'default': self.default,
+            'available': self.names(),
+            'loaded': loaded,
+            'memory_budget_mb': round(self.memory_budget / 1048576, 1) if self.memory_budget else None,
+        }
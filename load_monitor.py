@@ -0,0 +1,172 @@
+"""
+부하 감시 + 성능 저하 모드 (과부하 시 싼 경로로 답변)
+트래픽이 몰려 인코더가 느려지면 모든 요청이 전체 의미 검색을 기다리느라 서비스 전체가 함께 느려짐
+
+감시 지표:
+    1. 동시 처리 중인 요청 수 (이 프로세스, 같은 질문을 기다리는 요청 포함)
+    2. 최근 질문 인코딩 지연시간 (EWMA, 지수 가중 이동 평균)
+
+모드 전환 (히스테리시스 - 경계값 근처에서 왔다 갔다 하지 않도록):
+    - 정상 → 저하: 동시 요청 ≥ max_in_flight 또는 인코딩 EWMA ≥ max_encode_ms
+    - 저하 → 정상: 동시 요청 ≤ recover_in_flight 그리고 인코딩 EWMA ≤ recover_encode_ms
+                  그리고 저하 모드로 바뀐 뒤 min_dwell_sec 경과
+    - 저하 모드에서도 probe_interval_sec마다 요청 1개는 전체 경로로 처리
+      (인코딩 지연시간을 계속 측정해야 회복 여부를 알 수 있음)
+    - 워커 시작 직후 처음 warmup_samples번의 인코딩은 EWMA에 넣지 않음
+      (첫 인코딩은 항상 느림 → 새 워커/max_requests 재시작마다 저하 모드로 시작하는 문제)
+    - 인코딩 지연시간 신호는 min_samples번 이상 측정된 뒤부터 사용
+
+저하 모드의 답변 경로 (rag_chatbot_v2):
+    1. exact:   정규화된 질문이 지식 베이스 질문과 똑같음
+    2. cached:  질문 임베딩이 캐시에 있음 → 인코딩 없이 검색
+    3. lexical: 글자 2-gram 겹침 비율로 검색 (인코딩 없음)
+    4. reduced: 인코딩은 하되 top_k=1, 문서 검색/"관련 정보" 생략
+
+설정 (config.py):
+    EMBEDDING_CONFIG = {
+        ...
+        'degradation': {
+            'enabled': True,
+            'max_in_flight': 16, 'recover_in_flight': 8,
+            'max_encode_ms': 250, 'recover_encode_ms': 100,
+            'min_dwell_sec': 5, 'probe_interval_sec': 1,
+            'warmup_samples': 3, 'min_samples': 5,
+        },
+    }
+
+Note:
+    - 기본값은 꺼짐 (저하 모드 답변은 관련 문서가 없고 글자 2-gram 검색을 쓰므로
+      답변 내용이 달라짐 → 운영자가 설정에서 명시적으로 켜야 함)
+    - 동시 요청 수는 워커의 요청 스레드 수를 넘지 않음 (gthread threads = 4, sync 워커는 항상 1)
+      → max_in_flight를 그보다 작게 잡지 않으면 CPU 경쟁으로 늘어난 인코딩 지연시간이 주 신호
+"""
+import time
+import threading
+import logging
+from contextlib import contextmanager
+from config import EMBEDDING_CONFIG
+from metrics import DEGRADED_MODE, IN_FLIGHT_REQUESTS, ENCODE_LATENCY_EWMA
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SETTINGS = {
+    'enabled': False,
+    'max_in_flight': 16,
+    'recover_in_flight': 8,
+    'max_encode_ms': 250.0,
+    'recover_encode_ms': 100.0,
+    'min_dwell_sec': 5.0,
+    'probe_interval_sec': 1.0,
+    'ewma_alpha': 0.2,
+    'warmup_samples': 3,
+    'min_samples': 5,
+}
+
+
+class LoadMonitor:
+    """
+    동시 요청 수 + 인코딩 지연시간 EWMA로 성능 저하 모드 결정
+
+    Example:
+        with LOAD_MONITOR.track():
+            degraded = LOAD_MONITOR.degraded() and not LOAD_MONITOR.should_probe()
+            ...
+    """
+
+    def __init__(self, **settings):
+        unknown = set(settings) - set(DEFAULT_SETTINGS)
+        if unknown:
+            raise ValueError(f"알 수 없는 성능 저하 설정: {sorted(unknown)}")
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._encode_ewma = None  # 초
+        self._encode_samples = 0  # 워밍업 포함 측정 횟수
+        self._degraded = False
+        self._changed_at = time.monotonic()
+        self._last_probe = 0.0
+
+    @classmethod
+    def from_config(cls) -> 'LoadMonitor':
+        return cls(**EMBEDDING_CONFIG.get('degradation', {}))
+
+    @contextmanager
+    def track(self):
+        """요청 1개 처리 구간 (동시 요청 수 집계)"""
+        with self._lock:
+            self._in_flight += 1
+            IN_FLIGHT_REQUESTS.set(self._in_flight)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                IN_FLIGHT_REQUESTS.set(self._in_flight)
+
+    def observe_encode(self, seconds: float):
+        """질문 인코딩 1회 지연시간 기록 (캐시 적중은 기록하지 않음, 워밍업 구간은 버림)"""
+        alpha = self.settings['ewma_alpha']
+        with self._lock:
+            self._encode_samples += 1
+            if self._encode_samples <= self.settings['warmup_samples']:
+                return
+            if self._encode_ewma is None:
+                self._encode_ewma = seconds
+            else:
+                self._encode_ewma += alpha * (seconds - self._encode_ewma)
+            ENCODE_LATENCY_EWMA.set(self._encode_ewma)
+
+    def degraded(self) -> bool:
+        """현재 성능 저하 모드인지 (호출 시점에 전환 조건 확인)"""
+        if not self.settings['enabled']:
+            return False
+
+        s = self.settings
+        with self._lock:
+            encode_ms = (self._encode_ewma or 0.0) * 1000
+            if self._encode_samples - s['warmup_samples'] < s['min_samples']:
+                encode_ms = 0.0  # 측정 횟수가 부족하면 인코딩 신호 무시
+            now = time.monotonic()
+            if not self._degraded:
+                if self._in_flight >= s['max_in_flight'] or encode_ms >= s['max_encode_ms']:
+                    self._switch(True, now, encode_ms)
+            elif (now - self._changed_at >= s['min_dwell_sec']
+                  and self._in_flight <= s['recover_in_flight']
+                  and encode_ms <= s['recover_encode_ms']):
+                self._switch(False, now, encode_ms)
+            return self._degraded
+
+    def _switch(self, degraded: bool, now: float, encode_ms: float):
+        """모드 전환 (self._lock 안에서 호출)"""
+        self._degraded = degraded
+        self._changed_at = now
+        DEGRADED_MODE.set(1 if degraded else 0)
+        logger.warning(f"{'성능 저하 모드 시작' if degraded else '정상 모드 복귀'}: "
+                       f"동시 요청 {self._in_flight}개, 인코딩 EWMA {encode_ms:.1f}ms")
+
+    def should_probe(self) -> bool:
+        """저하 모드에서 이번 요청을 전체 경로로 처리할지 (probe_interval_sec마다 1개)"""
+        with self._lock:
+            now = time.monotonic()
+            if now - self._last_probe >= self.settings['probe_interval_sec']:
+                self._last_probe = now
+                return True
+            return False
+
+    def status(self) -> dict:
+        """/api/health 표시용 상태 (요청이 없을 때도 전환 조건을 다시 확인)"""
+        self.degraded()
+        with self._lock:
+            return {
+                'degraded': self._degraded,
+                'in_flight': self._in_flight,
+                'encode_samples': self._encode_samples,
+                'encode_ewma_ms': round(self._encode_ewma * 1000, 3) if self._encode_ewma is not None else None,
+            }
+
+
+# 프로세스 전체에서 하나 (인코더를 모든 지식 베이스가 공유하므로 부하도 프로세스 단위)
+LOAD_MONITOR = LoadMonitor.from_config()
@@ -0,0 +1,350 @@
+"""
+로그 내보내기 - 미답변 질문 / 전체 질의 기록을 CSV 또는 엑셀로 스트리밍
+관리자가 서버의 logs/unanswered_questions.xlsx를 직접 열지 않아도 되도록
+(직접 열면 파일이 잠겨서 log_unknown_question이 재시도/임시 파일로 빠짐)
+
+핵심 기능:
+    1. 미답변 로그 읽기 (한 행씩)
+       - 운영 중인 엑셀을 임시 폴더에 복사한 뒤 읽기 전용(read_only) 모드로 읽음
+       - 복사는 호출 즉시 (응답을 보내기 전에 실패를 알 수 있도록)
+       - 아직 병합 안 된 임시 파일(_temp.txt) 내용도 포함
+    2. 질의 로그 읽기 (logs/queries/*.jsonl.gz, 한 줄씩)
+    3. 기간(since/until) + 상태/결과 필터
+    4. 출력 형식
+       - csv: 행을 만드는 대로 바로 전송 (Excel에서 한글이 깨지지 않도록 BOM 포함)
+       - xlsx: 스트리밍하지 않음 - openpyxl write-only 모드로 임시 파일을 다 만든 뒤 전송
+               (zip 형식이라 끝까지 써야 보낼 수 있음, 웹은 최대 XLSX_MAX_ROWS행, 넘으면 csv 사용)
+       - 사용자가 입력한 질문이 =, +, -, @로 시작해도 수식으로 해석되지 않음
+         (csv: 앞에 ' 추가, xlsx: 문자열 셀로 기록)
+
+메모리:
+    - 행은 한 줄씩 처리 (전체를 DataFrame/리스트로 올리지 않음)
+    - 질의 로그 / CSV / 엑셀 출력: 로그 크기와 상관없이 일정 (엑셀은 디스크 임시 파일)
+    - 미답변 엑셀 읽기: xlsx의 공유 문자열 표(질문 문자열 목록)만 메모리에 올라감
+      (10만 행 ≈ 9MB, DataFrame으로 읽을 때보다 훨씬 적음)
+
+사용 예 (웹):
+    GET /api/unanswered/export?format=csv&since=2025-10-01&status=미답변
+    GET /api/queries/export?format=xlsx&since=2025-10-01&until=2025-11-01&outcome=unanswered
+
+사용 예 (명령줄):
+    python log_export.py unanswered --format xlsx --output unanswered.xlsx
+    python log_export.py queries --since 2025-10-01 --output queries.csv
+"""
+import os
+import io
+import csv
+import json
+import time
+import shutil
+import zipfile
+import logging
+import tempfile
+import weakref
+from typing import Iterable, Iterator, List
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
+from query_log import DEFAULT_LOG_DIR, list_segments, iter_records
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMATS = ('csv', 'xlsx')
+MIMETYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+UNANSWERED_COLUMNS = ['번호', '질문', '일시', '상태', '비고']
+QUERY_COLUMNS = ['ts', 'kb', 'question', 'outcome', 'latency_ms', 'top_id', 'top_score', 'top_k', 'coalesced']
+# CSV를 모아서 보낼 행 수 / 파일 전송 단위
+CSV_FLUSH_ROWS = 500
+READ_SIZE = 64 * 1024
+# 스프레드시트가 수식으로 해석하는 첫 글자
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+# 웹 엑셀 내보내기 최대 행 수 (엑셀은 다 만든 뒤 전송 → gunicorn timeout 30초 안에 끝나도록)
+XLSX_MAX_ROWS = 100000
+# 저장 중인 엑셀을 복사해서 깨진 파일이 나왔을 때 재시도
+SNAPSHOT_RETRIES = 5
+SNAPSHOT_RETRY_DELAY = 0.2
+
+
+class ExportTooLarge(ValueError):
+    """엑셀 내보내기 행 수 초과 (csv로 받거나 기간을 줄여야 함)"""
+
+
+def _normalize_ts(value: str) -> str:
+    """시각 문자열 비교용 정규화 ("2025-10-01 10:00" → "2025-10-01T10:00", None은 그대로)"""
+    return value.replace(' ', 'T') if value else value
+
+
+def _in_range(ts: str, since: str = None, until: str = None) -> bool:
+    """ISO 시각 문자열 범위 확인 (since 포함, until 미포함, since/until은 _normalize_ts 적용된 값)"""
+    ts = _normalize_ts(ts)
+    if since and ts < since:
+        return False
+    if until and ts >= until:
+        return False
+    return True
+
+
+def _is_formula_text(value) -> bool:
+    return isinstance(value, str) and value.startswith(FORMULA_PREFIXES)
+
+
+def _snapshot(log_file: str, snapshot: str):
+    """
+    운영 엑셀을 복사 (QuestionLogger가 저장하는 도중이면 깨진 복사본 → 잠시 후 재시도)
+
+    Note:
+        - xlsx는 zip이므로 모든 항목의 CRC를 확인해서 완전한 파일인지 검사
+    """
+    for attempt in range(SNAPSHOT_RETRIES):
+        shutil.copyfile(log_file, snapshot)
+        try:
+            with zipfile.ZipFile(snapshot) as z:
+                if z.testzip() is None:
+                    return
+        except zipfile.BadZipFile:
+            pass
+        logger.warning(f"미답변 로그 복사본이 깨짐 (저장 중), 재시도 {attempt + 1}/{SNAPSHOT_RETRIES}")
+        time.sleep(SNAPSHOT_RETRY_DELAY)
+    raise zipfile.BadZipFile(f"미답변 로그를 읽을 수 없음 (계속 저장 중?): {log_file}")
+
+
+def iter_unanswered_rows(log_file: str, since: str = None, until: str = None,
+                         status: str = None) -> Iterator[list]:
+    """
+    미답변 로그 행 [번호, 질문, 일시, 상태, 비고] (한 행씩)
+
+    Args:
+        log_file: 미답변 로그 엑셀 (logs/unanswered_questions.xlsx)
+        since/until: 일시 범위 (예: "2025-10-01", 포함/미포함)
+        status: 상태 필터 ('미답변' / '답변완료', None이면 전체)
+
+    Process:
+        1. 엑셀을 임시 파일로 복사 (운영 파일은 잠그지 않음, 저장 중이라 깨졌으면 재시도)
+        2. read_only 모드로 한 행씩 읽기
+        3. 임시 파일(_temp.txt)의 아직 병합 안 된 질문 추가 (상태 '미답변')
+
+    Note:
+        - 1번은 호출할 때 바로 실행 (실패하면 여기서 예외 → 웹 응답 헤더를 보내기 전에 오류 처리)
+        - 복사본은 반환된 이터레이터가 끝나거나 사라지면 삭제
+
+    Raises:
+        zipfile.BadZipFile: 저장 중인 엑셀을 재시도 후에도 복사하지 못함
+    """
+    snapshot = None
+    if os.path.exists(log_file):
+        tmp_dir = tempfile.mkdtemp()
+        snapshot = os.path.join(tmp_dir, 'snapshot.xlsx')
+        try:
+            _snapshot(log_file, snapshot)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+
+    rows = _iter_unanswered_rows(log_file, snapshot, _normalize_ts(since), _normalize_ts(until), status)
+    if snapshot:
+        weakref.finalize(rows, shutil.rmtree, os.path.dirname(snapshot), ignore_errors=True)
+    return rows
+
+
+def _iter_unanswered_rows(log_file: str, snapshot: str, since: str, until: str,
+                          status: str) -> Iterator[list]:
+    """iter_unanswered_rows 본체 (snapshot: 미리 만든 복사본, 원본이 없으면 None)"""
+    temp_log_file = log_file.replace('.xlsx', '_temp.txt')
+    last_number = 0
+
+    if snapshot:
+        try:
+            wb = load_workbook(snapshot, read_only=True)
+            try:
+                for row in wb.active.iter_rows(min_row=2, values_only=True):
+                    if not row or row[1] is None:
+                        continue
+                    row = list(row[:5]) + [None] * (5 - len(row[:5]))
+                    if isinstance(row[0], (int, float)):
+                        last_number = max(last_number, int(row[0]))
+                    row[2] = str(row[2]) if row[2] is not None else ''
+                    if status and row[3] != status:
+                        continue
+                    if not _in_range(row[2], since, until):
+                        continue
+                    yield row
+            finally:
+                wb.close()
+        finally:
+            shutil.rmtree(os.path.dirname(snapshot), ignore_errors=True)
+
+    if os.path.exists(temp_log_file) and (not status or status == '미답변'):
+        with open(temp_log_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                if '|' not in line:
+                    continue
+                timestamp, question = line.rstrip('\n').split('|', 1)
+                last_number += 1
+                if _in_range(timestamp, since, until):
+                    yield [last_number, question, timestamp, '미답변', '']
+
+
+def iter_query_rows(log_dir: str = DEFAULT_LOG_DIR, since: str = None, until: str = None,
+                    outcome: str = None, kb: str = None) -> Iterator[list]:
+    """
+    질의 로그 행 (QUERY_COLUMNS 순서, 한 줄씩)
+
+    Args:
+        log_dir: 질의 로그 폴더
+        since/until: ISO 시각 범위 (포함/미포함)
+        outcome: 결과 필터 (answered / passage / unanswered)
+        kb: 지식 베이스 필터
+    """
+    # 기록의 ts는 "2025-10-01T10:00:00" 형식 → 공백으로 입력된 범위도 같게 비교
+    since, until = _normalize_ts(since), _normalize_ts(until)
+    for record in iter_records(list_segments(log_dir), since, until):
+        if outcome and record.get('outcome') != outcome:
+            continue
+        if kb and record.get('kb') != kb:
+            continue
+        top_k = record.get('top_k') or []
+        yield [
+            record.get('ts', ''),
+            record.get('kb', ''),
+            record.get('question', ''),
+            record.get('outcome', ''),
+            record.get('latency_ms'),
+            top_k[0][0] if top_k else None,
+            top_k[0][1] if top_k else None,
+            json.dumps(top_k),
+            record.get('coalesced', False),
+        ]
+
+
+def stream_csv(columns: List[str], rows: Iterable[list]) -> Iterator[bytes]:
+    """CSV 바이트 조각 (CSV_FLUSH_ROWS행마다 전송, UTF-8 BOM 포함, 수식처럼 보이는 값은 ' 추가)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write('\ufeff')
+    writer.writerow(columns)
+    for n, row in enumerate(rows, 1):
+        writer.writerow(["'" + value if _is_formula_text(value) else value for value in row])
+        if n % CSV_FLUSH_ROWS == 0:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode('utf-8')
+
+
+def build_xlsx(columns: List[str], rows: Iterable[list], title: str = 'export',
+               max_rows: int = None) -> str:
+    """
+    엑셀 임시 파일 만들기 (다 만든 뒤 경로 반환, 스트리밍 아님)
+
+    Args:
+        max_rows: 최대 행 수 (None이면 제한 없음)
+
+    Raises:
+        ExportTooLarge: max_rows 초과 (임시 파일은 삭제)
+
+    Note:
+        - write-only 모드는 행을 디스크에 바로 기록 → 메모리 일정
+        - openpyxl은 =로 시작하는 문자열을 수식으로 저장하므로 그런 값은 문자열 셀로 기록
+    """
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title)
+        ws.append(columns)
+        too_large = False
+        for n, row in enumerate(rows, 1):
+            if max_rows is not None and n > max_rows:
+                too_large = True
+                break
+            ws.append([_text_cell(ws, value) if _is_formula_text(value) else value for value in row])
+        # 초과해도 저장까지 해야 openpyxl이 행을 쓰던 임시 파일을 정리함
+        wb.save(path)
+        if too_large:
+            raise ExportTooLarge(f"엑셀은 최대 {max_rows}행까지 내보낼 수 있습니다. csv 형식을 사용하거나 기간을 줄여주세요.")
+    except BaseException:
+        os.remove(path)
+        raise
+    return path
+
+
+def _stream_file(path: str) -> Iterator[bytes]:
+    """파일 바이트 조각 (전송이 끝나거나 중단되면 파일 삭제)"""
+    try:
+        with open(path, 'rb') as f:
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+    finally:
+        os.remove(path)
+
+
+def _text_cell(ws, value: str) -> WriteOnlyCell:
+    """값 그대로 표시되는 문자열 셀 (수식으로 해석 안 함)"""
+    cell = WriteOnlyCell(ws, value=value)
+    cell.data_type = 's'
+    return cell
+
+
+def stream_export(fmt: str, columns: List[str], rows: Iterable[list], title: str = 'export',
+                  max_xlsx_rows: int = None) -> Iterator[bytes]:
+    """
+    형식(csv/xlsx)에 맞는 스트림
+
+    Note:
+        - xlsx는 이 함수 안에서 파일을 다 만듦 (오류는 전송 시작 전에 발생)
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"지원하지 않는 형식: {fmt} (csv / xlsx)")
+    if fmt == 'csv':
+        return stream_csv(columns, rows)
+    path = build_xlsx(columns, rows, title, max_rows=max_xlsx_rows)
+    return _stream_file(path)
+
+
+def main():
+    """메인 실행 함수 (명령줄에서 파일로 내보내기)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='미답변/질의 로그 내보내기')
+    parser.add_argument('source', choices=['unanswered', 'queries'],
+                       help='unanswered: 미답변 로그, queries: 전체 질의 로그')
+    parser.add_argument('--format', type=str, default='csv', choices=FORMATS,
+                       help='출력 형식')
+    parser.add_argument('--output', type=str, required=True,
+                       help='저장할 파일 경로')
+    parser.add_argument('--since', type=str, default=None,
+                       help='시작 시각 (포함, 예: 2025-10-01)')
+    parser.add_argument('--until', type=str, default=None,
+                       help='종료 시각 (미포함, 예: 2025-11-01)')
+    parser.add_argument('--status', type=str, default=None,
+                       help='미답변 로그 상태 필터 (미답변 / 답변완료)')
+    parser.add_argument('--outcome', type=str, default=None,
+                       help='질의 로그 결과 필터 (answered / passage / unanswered)')
+    parser.add_argument('--log_file', type=str, default='logs/unanswered_questions.xlsx',
+                       help='미답변 로그 엑셀 경로')
+    parser.add_argument('--log_dir', type=str, default=DEFAULT_LOG_DIR,
+                       help='질의 로그 폴더')
+    args = parser.parse_args()
+
+    if args.source == 'unanswered':
+        columns = UNANSWERED_COLUMNS
+        rows = iter_unanswered_rows(args.log_file, args.since, args.until, args.status)
+    else:
+        columns = QUERY_COLUMNS
+        rows = iter_query_rows(args.log_dir, args.since, args.until, args.outcome)
+
+    with open(args.output, 'wb') as f:
+        for chunk in stream_export(args.format, columns, rows, args.source):
+            f.write(chunk)
+    print(f"내보내기 완료: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
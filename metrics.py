@@ -0,0 +1,375 @@
+"""
+성능 지표 수집 - 단계별 지연시간 히스토그램, 카운터, Prometheus /metrics 출력
+/api/chat이 느릴 때 어느 단계(정규화/임베딩/유사도/답변 구성/로깅)에서 시간이 걸렸는지 확인
+
+핵심 기능:
+    1. Counter: 누적 횟수 (캐시 적중/실패, 답변/미답변 등)
+    2. Gauge: 현재 값 (미답변 비율 등)
+    3. Histogram: 지연시간 분포 (버킷 + 최근 샘플로 p50/p95/p99)
+    4. Prometheus 텍스트 형식 출력 (/metrics)
+    5. 샘플링 프로파일러 (켜고 끌 수 있음, 기본 꺼짐)
+
+오버헤드:
+    - 관측 1회 = perf_counter 2번 + 잠금 1번 + 리스트 연산 몇 개 (수 µs 이하)
+    - 백분위는 /metrics 요청 시에만 계산
+
+프로세스 단위:
+    - 지표는 프로세스(gunicorn 워커)마다 따로 쌓임 (워커 간 합산 안 함)
+    - /metrics 1번 = 그 요청을 받은 워커 1개의 값
+    - 어느 워커인지는 ktrgpt_process_info{pid="...",worker="..."} 로 구분
+      (모든 지표에 pid 라벨을 붙이면 워커가 재시작될 때마다 시계열이 늘어나므로 붙이지 않음)
+
+사용 예:
+    from metrics import STAGE_LATENCY
+    with STAGE_LATENCY.time(stage='encode'):
+        embedding = model.encode(text)
+"""
+import sys
+import time
+import bisect
+import threading
+from collections import deque, Counter as _Counter
+from contextlib import contextmanager
+from typing import Dict, Tuple, Sequence
+import logging
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 기본 지연시간 버킷 (초): 1ms ~ 10s
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 배치 크기 버킷
+DEFAULT_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+# 백분위 계산용 최근 샘플 수 (라벨 조합별)
+RESERVOIR_SIZE = 2048
+# /metrics에 출력할 백분위
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _label_key(labelnames: Tuple[str, ...], labels: dict) -> Tuple[str, ...]:
+    """라벨 dict → 정해진 순서의 튜플 (dict 키로 사용)"""
+    return tuple(str(labels.get(name, '')) for name in labelnames)
+
+
+def _escape_label_value(value) -> str:
+    """라벨 값 이스케이프 (Prometheus 텍스트 형식: \\ → \\\\, " → \\", 줄바꿈 → \\n)"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames: Tuple[str, ...], key: Tuple[str, ...], extra: dict = None) -> str:
+    """Prometheus 라벨 문자열: {stage="encode",le="0.1"}"""
+    pairs = list(zip(labelnames, key))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs)
+    return '{' + body + '}'
+
+
+class _Metric:
+    """지표 공통 부분 (이름, 설명, 라벨, 잠금)"""
+
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def render(self) -> str:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """
+    누적 카운터 (증가만 가능)
+
+    Example:
+        CACHE_EVENTS.inc(cache='query_embedding', result='hit')
+    """
+
+    kind = 'counter'
+
+    def __init__(self, name, help_text, labelnames=()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def render(self) -> str:
+        with self._lock:
+            items = sorted(self._values.items())
+        return '\n'.join(f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items)
+
+
+class Gauge(Counter):
+    """현재 값 (올라가고 내려갈 수 있음)"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """
+    분포 지표 (지연시간, 배치 크기)
+
+    저장 방식:
+        - 누적 버킷 카운트 + 합계 + 개수 (Prometheus histogram 형식)
+        - 최근 RESERVOIR_SIZE개 샘플 (p50/p95/p99 계산용)
+
+    Example:
+        with STAGE_LATENCY.time(stage='score'):
+            ...
+    """
+
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 라벨 조합 → [버킷 카운트 리스트, 합계, 개수, 최근 샘플 deque]
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [[0] * (len(self.buckets) + 1), 0.0, 0, deque(maxlen=RESERVOIR_SIZE)]
+                self._series[key] = series
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+            series[3].append(value)
+
+    @contextmanager
+    def time(self, **labels):
+        """with 블록 실행 시간(초)을 기록"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def quantiles(self, **labels) -> dict:
+        """최근 샘플 기준 백분위 {0.5: ..., 0.95: ..., 0.99: ...}"""
+        with self._lock:
+            series = self._series.get(_label_key(self.labelnames, labels))
+            samples = sorted(series[3]) if series else []
+        return self._quantiles(samples)
+
+    @staticmethod
+    def _quantiles(samples: list) -> dict:
+        if not samples:
+            return {}
+        last = len(samples) - 1
+        return {q: samples[min(last, int(round(q * last)))] for q in QUANTILES}
+
+    def render(self) -> str:
+        with self._lock:
+            snapshot = [(key, list(s[0]), s[1], s[2], sorted(s[3])) for key, s in sorted(self._series.items())]
+
+        lines = []
+        for key, bucket_counts, total, count, samples in snapshot:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': bound})} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+
+        # 백분위는 별도 gauge로 출력 (histogram 형식에는 quantile이 없음)
+        quantile_lines = []
+        for key, _, _, _, samples in snapshot:
+            for q, value in self._quantiles(samples).items():
+                quantile_lines.append(
+                    f"{self.name}_quantile{_format_labels(self.labelnames, key, {'quantile': q})} {value}")
+        if quantile_lines:
+            lines.append(f"# HELP {self.name}_quantile {self.help_text} (최근 {RESERVOIR_SIZE}개 샘플 백분위)")
+            lines.append(f"# TYPE {self.name}_quantile gauge")
+            lines.extend(quantile_lines)
+        return '\n'.join(lines)
+
+
+class MetricsRegistry:
+    """지표 등록소 (이름 → 지표) + Prometheus 텍스트 출력"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name, help_text, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help_text, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, help_text, labelnames=labelnames)
+
+    def gauge(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, help_text, labelnames=labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, help_text, labelnames=labelnames, buckets=buckets)
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식 (text/plain; version=0.0.4)"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        parts = []
+        for metric in metrics:
+            body = metric.render()
+            parts.append(f"# HELP {metric.name} {metric.help_text}\n# TYPE {metric.name} {metric.kind}")
+            if body:
+                parts.append(body)
+        return '\n'.join(parts) + '\n'
+
+
+# ----------------------------------------------------------------------
+# 전역 등록소 + 챗봇 공통 지표
+# ----------------------------------------------------------------------
+REGISTRY = MetricsRegistry()
+
+# generate_answer 단계별 지연시간 (normalize, encode, score, passage, compose, log)
+STAGE_LATENCY = REGISTRY.histogram(
+    'ktrgpt_stage_latency_seconds', '답변 생성 단계별 소요 시간(초)', labelnames=('stage',))
+# 전체 요청 지연시간
+REQUEST_LATENCY = REGISTRY.histogram(
+    'ktrgpt_request_latency_seconds', 'generate_answer 전체 소요 시간(초)')
+# 질문 결과 (answered / passage / unanswered)
+ANSWER_OUTCOMES = REGISTRY.counter(
+    'ktrgpt_answers_total', '질문 처리 결과별 횟수', labelnames=('outcome',))
+# 미답변 비율 (누적)
+UNANSWERED_RATIO = REGISTRY.gauge(
+    'ktrgpt_unanswered_ratio', '전체 질문 중 미답변 비율')
+# 캐시 적중/실패
+CACHE_EVENTS = REGISTRY.counter(
+    'ktrgpt_cache_events_total', '캐시 적중(hit)/실패(miss) 횟수', labelnames=('cache', 'result'))
+# 임베딩 배치 크기
+BATCH_SIZES = REGISTRY.histogram(
+    'ktrgpt_encode_batch_size', '임베딩 배치당 문장 수', labelnames=('source',), buckets=DEFAULT_SIZE_BUCKETS)
+# 요청 합치기 (leader = 직접 계산, follower = 진행 중인 계산 결과 공유)
+COALESCED_REQUESTS = REGISTRY.counter(
+    'ktrgpt_coalesced_requests_total', '동일 질문 요청 합치기 횟수', labelnames=('flight', 'role'))
+# 지식 베이스 로딩/제거 (kb_registry)
+KB_EVENTS = REGISTRY.counter(
+    'ktrgpt_kb_events_total', '지식 베이스 로딩(load)/메모리 예산 초과로 제거(evict) 횟수', labelnames=('kb', 'event'))
+# 메모리에 올라간 지식 베이스별 추정 메모리 (제거되면 0)
+KB_MEMORY = REGISTRY.gauge(
+    'ktrgpt_kb_memory_bytes', '지식 베이스별 추정 메모리 사용량(바이트)', labelnames=('kb',))
+# 성능 저하 모드 (load_monitor)
+DEGRADED_MODE = REGISTRY.gauge(
+    'ktrgpt_degraded_mode', '성능 저하 모드 여부 (1 = 저하, 0 = 정상)')
+IN_FLIGHT_REQUESTS = REGISTRY.gauge(
+    'ktrgpt_in_flight_requests', '처리 중인 질문 요청 수')
+ENCODE_LATENCY_EWMA = REGISTRY.gauge(
+    'ktrgpt_encode_latency_ewma_seconds', '질문 인코딩 지연시간 지수 가중 이동 평균(초)')
+# 이 지표를 낸 프로세스 (워커마다 지표가 따로이므로 /metrics 응답이 어느 워커 것인지 표시)
+PROCESS_INFO = REGISTRY.gauge(
+    'ktrgpt_process_info', '지표를 응답한 프로세스 (pid, 워커 번호)', labelnames=('pid', 'worker'))
+# 저하 모드 답변 경로 (exact / cached / lexical / reduced)
+DEGRADED_ANSWERS = REGISTRY.counter(
+    'ktrgpt_degraded_answers_total', '성능 저하 모드 답변 경로별 횟수', labelnames=('path',))
+
+
+def record_outcome(outcome: str):
+    """질문 결과 카운터 증가 + 미답변 비율 갱신"""
+    ANSWER_OUTCOMES.inc(outcome=outcome)
+    total = sum(ANSWER_OUTCOMES.value(outcome=o) for o in ('answered', 'passage', 'unanswered'))
+    if total:
+        UNANSWERED_RATIO.set(ANSWER_OUTCOMES.value(outcome='unanswered') / total)
+
+
+# ----------------------------------------------------------------------
+# 샘플링 프로파일러
+# ----------------------------------------------------------------------
+class SamplingProfiler:
+    """
+    샘플링 프로파일러 (다른 스레드의 호출 스택을 주기적으로 수집)
+
+    작동 방식:
+        1. 백그라운드 스레드가 interval초마다 sys._current_frames() 조회
+        2. 각 스레드의 스택을 "파일:함수;파일:함수;..." 형태로 집계
+        3. report()로 flamegraph.pl 호환 collapsed stack 텍스트 반환
+
+    Note:
+        - 꺼져 있을 때는 오버헤드 0 (스레드 없음)
+        - 켜져 있어도 요청 처리 코드에는 아무것도 추가되지 않음
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 40):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._stacks = _Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """프로파일링 시작 (이전 결과는 초기화)"""
+        if self.running:
+            return
+        with self._lock:
+            self._stacks.clear()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        logger.info("샘플링 프로파일러 시작")
+
+    def stop(self):
+        """프로파일링 중지 (결과는 유지)"""
+        if not self.running:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        logger.info("샘플링 프로파일러 중지")
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    code = frame.f_code
+                    stack.append(f"{code.co_filename.rsplit('/', 1)[-1]}:{code.co_name}")
+                    frame = frame.f_back
+                with self._lock:
+                    self._stacks[';'.join(reversed(stack))] += 1
+
+    def report(self, limit: int = 200) -> str:
+        """collapsed stack 형식 (많이 잡힌 순)"""
+        with self._lock:
+            items = self._stacks.most_common(limit)
+        return '\n'.join(f"{stack} {count}" for stack, count in items) + '\n'
+
+
+PROFILER = SamplingProfiler()
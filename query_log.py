@@ -0,0 +1,429 @@
+"""
+질의 로그 - 모든 질문을 구조화(JSONL)해서 백그라운드로 기록 + 오프라인 분석
+트래픽 재현(replay), 답변 적중률/지연시간/유사도 분포 분석에 사용
+
+핵심 기능:
+    1. 질문마다 1줄 JSON 기록 (질문, 상위 k개 ID/유사도, 지연시간, 결과)
+    2. 큐 + 백그라운드 스레드로 기록 (요청 처리 스레드는 큐에 넣기만 함)
+    3. 세그먼트 파일 자동 교체 (크기/시간 기준) + gzip 압축
+    4. 오래된 세그먼트 자동 삭제 (최대 개수)
+    5. 분석기: 파일을 한 줄씩 읽어 리포트 생성 (전체를 메모리에 올리지 않음)
+
+기록 형식 (1줄 = 1질문):
+    {"ts": "2025-10-01T09:00:00.123", "question": "mis 설치", "outcome": "answered",
+     "top_k": [[3, 0.941], [7, 0.632]], "latency_ms": 41.2}
+
+파일:
+    - logs/queries/queries-<시작시각>-<pid>-<순번>.jsonl      (기록 중인 세그먼트)
+    - logs/queries/queries-<시작시각>-<pid>-<순번>.jsonl.gz   (교체 완료, 압축됨)
+
+실행 방법 (분석):
+    python query_log.py --log_dir logs/queries
+    python query_log.py --log_dir logs/queries --since 2025-10-01 --output report.json
+"""
+import os
+import glob
+import gzip
+import json
+import math
+import time
+import queue
+import shutil
+import atexit
+import logging
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Iterator, Iterable
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 기본 설정
+DEFAULT_LOG_DIR = 'logs/queries'
+DEFAULT_MAX_SEGMENT_BYTES = 64 * 1024 * 1024   # 세그먼트 최대 크기 (압축 전 64MB)
+DEFAULT_MAX_SEGMENT_AGE = 3600                 # 세그먼트 최대 기간 (초, 1시간)
+DEFAULT_MAX_SEGMENTS = 500                     # 보관할 압축 세그먼트 수
+DEFAULT_QUEUE_SIZE = 10000                     # 큐 최대 길이 (넘치면 버림)
+FLUSH_INTERVAL = 1.0                           # 디스크 flush 주기 (초)
+
+# 이 프로세스의 기록기들이 지금 쓰고 있는 세그먼트 (같은 프로세스 안의 다른 기록기 보호)
+_OPEN_SEGMENTS = set()
+
+
+def _segment_pid(path: str):
+    """세그먼트 파일 이름에서 기록한 프로세스 pid 추출 (queries-<날짜>-<시각>-<pid>-<순번>.jsonl)"""
+    try:
+        return int(os.path.basename(path).rsplit('-', 2)[-2])
+    except (IndexError, ValueError):
+        return None
+
+
+def _pid_alive(pid: int) -> bool:
+    """같은 서버에서 pid 프로세스가 살아있는지 (신호 0 = 존재 확인만)"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # 다른 사용자의 프로세스
+    return True
+
+
+class QueryLogWriter:
+    """
+    질의 로그 비동기 기록기
+
+    Attributes:
+        log_dir: 세그먼트 저장 폴더
+        dropped: 큐가 가득 차서 버린 기록 수
+    """
+
+    def __init__(self, log_dir: str = DEFAULT_LOG_DIR,
+                 max_segment_bytes: int = DEFAULT_MAX_SEGMENT_BYTES,
+                 max_segment_age: float = DEFAULT_MAX_SEGMENT_AGE,
+                 max_segments: int = DEFAULT_MAX_SEGMENTS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        """
+        기록기 초기화 + 백그라운드 스레드 시작
+
+        Args:
+            log_dir: 세그먼트 저장 폴더 (없으면 생성)
+            max_segment_bytes: 세그먼트 교체 기준 크기 (바이트)
+            max_segment_age: 세그먼트 교체 기준 시간 (초)
+            max_segments: 보관할 압축 세그먼트 최대 수 (초과 시 오래된 것부터 삭제)
+            queue_size: 큐 최대 길이
+        """
+        self.log_dir = log_dir
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.max_segments = max_segments
+        self.dropped = 0
+
+        os.makedirs(log_dir, exist_ok=True)
+        self._compress_orphans()
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._path = None
+        self._opened_at = 0.0
+        self._bytes = 0
+        self._seq = 0  # 같은 초에 여러 세그먼트가 생겨도 이름이 겹치지 않도록
+
+        self._thread = threading.Thread(target=self._run, name='query-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def _compress_orphans(self):
+        """
+        이전 실행에서 압축되지 못한 세그먼트 정리 (워커 종료/재시작으로 남은 파일)
+
+        대상:
+            - 파일 이름의 pid가 이미 종료된 프로세스
+            - 지금 프로세스의 pid인데 이 프로세스의 기록기가 쓰고 있지 않은 파일 (예전 프로세스의 pid 재사용)
+            - 마지막 기록 후 max_segment_age의 2배 이상 지난 파일
+              (살아있는 기록기는 max_segment_age가 지나면 스스로 교체하므로, pid가 다른 프로세스에
+               재사용된 경우에만 해당)
+
+        Note:
+            - 다른 워커가 기록 중인 파일은 건드리지 않음 (압축 후 삭제하면 그 워커의 이후 기록이 사라짐)
+            - 여러 워커가 동시에 같은 파일을 압축하려 할 수 있음 → _compress에서 처리
+        """
+        for path in glob.glob(os.path.join(self.log_dir, 'queries-*.jsonl')):
+            pid = _segment_pid(path)
+            if pid == os.getpid():
+                alive = path in _OPEN_SEGMENTS
+            else:
+                alive = pid is not None and _pid_alive(pid)
+            if alive:
+                try:
+                    if time.time() - os.path.getmtime(path) <= 2 * self.max_segment_age:
+                        continue
+                except FileNotFoundError:
+                    continue  # 다른 워커가 이미 압축함
+            self._compress(path)
+
+    def log(self, record: dict):
+        """
+        기록 1건 추가 (블로킹 없음)
+
+        Note:
+            - 큐가 가득 차면 버리고 dropped 증가 (요청 처리가 느려지지 않도록)
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """남은 기록을 모두 쓰고 현재 세그먼트 압축"""
+        if not self._thread.is_alive():
+            return
+        self._queue.put(None)
+        self._thread.join()
+
+    # ------------------------------------------------------------------
+    # 백그라운드 스레드
+    # ------------------------------------------------------------------
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                record = self._queue.get(timeout=FLUSH_INTERVAL)
+            except queue.Empty:
+                record = False  # 시간 기준 교체/flush 확인용
+
+            if record is None:
+                break
+            try:
+                if record:
+                    self._write(record)
+                now = time.monotonic()
+                if self._file and now - self._opened_at >= self.max_segment_age:
+                    self._rotate()
+                elif self._file and now - last_flush >= FLUSH_INTERVAL:
+                    self._file.flush()
+                    last_flush = now
+            except Exception as e:
+                logger.error(f"질의 로그 기록 실패: {str(e)}")
+
+        if self._file:
+            self._rotate()
+
+    def _write(self, record: dict):
+        if self._file is None:
+            self._open()
+        line = json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self._file.write(line)
+        self._bytes += len(line.encode('utf-8'))
+        if self._bytes >= self.max_segment_bytes:
+            self._rotate()
+
+    def _open(self):
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        self._seq += 1
+        self._path = os.path.join(self.log_dir, f"queries-{stamp}-{os.getpid()}-{self._seq:04d}.jsonl")
+        self._file = open(self._path, 'a', encoding='utf-8')
+        _OPEN_SEGMENTS.add(self._path)
+        self._opened_at = time.monotonic()
+        self._bytes = 0
+
+    def _rotate(self):
+        """현재 세그먼트 닫기 → 압축 → 오래된 세그먼트 정리"""
+        self._file.close()
+        self._file = None
+        _OPEN_SEGMENTS.discard(self._path)
+        self._compress(self._path)
+        self._prune()
+
+    @staticmethod
+    def _compress(path: str):
+        """
+        세그먼트 gzip 압축
+
+        Note:
+            - 프로세스별 임시 파일에 쓴 뒤 이름 변경 (읽는 쪽이 덜 쓴 .gz를 보지 않음)
+            - 다른 워커가 먼저 압축/삭제했으면 조용히 넘어감
+        """
+        tmp_path = f"{path}.gz.tmp-{os.getpid()}"
+        try:
+            with open(path, 'rb') as src, gzip.open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(tmp_path, path + '.gz')
+            os.remove(path)
+        except FileNotFoundError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune(self):
+        segments = sorted(glob.glob(os.path.join(self.log_dir, 'queries-*.jsonl.gz')))
+        for path in segments[:max(0, len(segments) - self.max_segments)]:
+            os.remove(path)
+
+
+# ----------------------------------------------------------------------
+# 읽기 / 분석
+# ----------------------------------------------------------------------
+def list_segments(log_dir: str = DEFAULT_LOG_DIR) -> list:
+    """세그먼트 파일 목록 (압축/기록 중 모두, 이름순 = 시간순)"""
+    paths = glob.glob(os.path.join(log_dir, 'queries-*.jsonl.gz'))
+    paths += glob.glob(os.path.join(log_dir, 'queries-*.jsonl'))
+    return sorted(paths)
+
+
+def iter_records(paths: Iterable[str], since: str = None, until: str = None) -> Iterator[dict]:
+    """
+    세그먼트 파일들을 한 줄씩 읽어 기록 반환 (스트리밍)
+
+    Args:
+        paths: 세그먼트 파일 경로 목록
+        since/until: ISO 시각 문자열 범위 (예: "2025-10-01", 포함/미포함)
+
+    Note:
+        - 기록 중인 파일의 마지막 줄이 잘려 있으면 건너뜀
+        - 목록을 만든 뒤 압축/삭제된 파일은 건너뜀
+    """
+    for path in paths:
+        opener = gzip.open if path.endswith('.gz') else open
+        try:
+            f = opener(path, 'rt', encoding='utf-8')
+        except FileNotFoundError:
+            continue
+        with f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                ts = record.get('ts', '')
+                if since and ts < since:
+                    continue
+                if until and ts >= until:
+                    continue
+                yield record
+
+
+class _LogHistogram:
+    """
+    고정 로그 스케일 히스토그램 (스트리밍 백분위 계산)
+
+    Note:
+        - 값 개수와 상관없이 버킷 수만큼만 메모리 사용
+        - 버킷 폭 약 2% → 백분위 오차 약 2% 이내
+    """
+
+    def __init__(self, min_value: float = 0.01, growth: float = 1.02):
+        self.min_value = min_value
+        self.log_growth = math.log(growth)
+        self.counts = Counter()
+        self.count = 0
+        self.total = 0.0
+
+    def add(self, value: float):
+        index = 0 if value <= self.min_value else int(math.log(value / self.min_value) / self.log_growth) + 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+
+    def _upper(self, index: int) -> float:
+        return self.min_value * math.exp(self.log_growth * index)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return round(self._upper(index), 3)
+        return round(self._upper(max(self.counts)), 3)
+
+    def summary(self) -> dict:
+        if not self.count:
+            return {'count': 0}
+        return {
+            'count': self.count,
+            'mean': round(self.total / self.count, 3),
+            'p50': self.percentile(0.5),
+            'p90': self.percentile(0.9),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+        }
+
+
+def analyze(records: Iterable[dict], top_n: int = 20) -> dict:
+    """
+    질의 로그 분석 리포트 (스트리밍, 메모리 일정)
+
+    Returns:
+        dict: {
+            "total": 전체 질문 수,
+            "outcomes": {"answered": n, "passage": n, "unanswered": n},
+            "hit_rate": 답변 비율,
+            "latency_ms": {"p50", "p95", "p99", ...},
+            "top1_score": 0.1 단위 분포,
+            "top_answers": 가장 많이 나간 (지식 베이스, 답변 ID) 상위 top_n,
+            "top_unanswered": 가장 많이 나온 (지식 베이스, 미답변 질문) 상위 top_n
+        }
+
+    Note:
+        - 답변 ID는 지식 베이스 안의 행 번호이므로 지식 베이스별로 따로 집계
+          ("kb"가 없는 예전 기록은 kb=None)
+    """
+    total = 0
+    outcomes = Counter()
+    latency = _LogHistogram()
+    score_bins = Counter()
+    top_answers = Counter()
+    unanswered = Counter()
+    first_ts = last_ts = None
+
+    for record in records:
+        total += 1
+        outcome = record.get('outcome', 'unknown')
+        outcomes[outcome] += 1
+        ts = record.get('ts')
+        if ts:
+            first_ts = ts if first_ts is None else min(first_ts, ts)
+            last_ts = ts if last_ts is None else max(last_ts, ts)
+        if record.get('latency_ms') is not None:
+            latency.add(record['latency_ms'])
+
+        kb = record.get('kb')
+        top_k = record.get('top_k') or []
+        if top_k:
+            answer_id, score = top_k[0]
+            score_bins[f"{math.floor(score * 10) / 10:.1f}"] += 1
+            if outcome == 'answered':
+                top_answers[(kb, answer_id)] += 1
+        if outcome == 'unanswered':
+            unanswered[(kb, record.get('question', ''))] += 1
+            # 미답변 질문 종류가 너무 많아지면 드문 것부터 정리 (메모리 상한)
+            if len(unanswered) > top_n * 100:
+                unanswered = Counter(dict(unanswered.most_common(top_n * 10)))
+
+    answered = outcomes.get('answered', 0) + outcomes.get('passage', 0)
+    return {
+        'total': total,
+        'period': {'from': first_ts, 'to': last_ts},
+        'outcomes': dict(outcomes),
+        'hit_rate': round(answered / total, 4) if total else None,
+        'latency_ms': latency.summary(),
+        'top1_score': dict(sorted(score_bins.items())),
+        'top_answers': [{'kb': kb, 'id': i, 'count': c} for (kb, i), c in top_answers.most_common(top_n)],
+        'top_unanswered': [{'kb': kb, 'question': q, 'count': c}
+                           for (kb, q), c in unanswered.most_common(top_n)],
+    }
+
+
+def main():
+    """메인 실행 함수 (질의 로그 분석)"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='질의 로그 분석')
+    parser.add_argument('--log_dir', type=str, default=DEFAULT_LOG_DIR,
+                       help='질의 로그 폴더')
+    parser.add_argument('--since', type=str, default=None,
+                       help='시작 시각 (예: 2025-10-01)')
+    parser.add_argument('--until', type=str, default=None,
+                       help='끝 시각 (미포함, 예: 2025-10-02)')
+    parser.add_argument('--top', type=int, default=20,
+                       help='상위 답변/미답변 질문 개수')
+    parser.add_argument('--output', type=str, default=None,
+                       help='리포트 JSON 저장 경로 (없으면 화면 출력만)')
+
+    args = parser.parse_args()
+
+    report = analyze(iter_records(list_segments(args.log_dir), args.since, args.until), top_n=args.top)
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text)
+        print(f"리포트 저장: {args.output}")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
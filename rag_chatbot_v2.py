@@ -23,28 +23,63 @@ RAG (Retrieval-Augmented Generation) 기반 챗봇 v2
     - 오프라인 동작 가능
     - 한국어 특화 모델로 더 정확함
 """
+import re
 import pandas as pd
 import numpy as np
 from typing import List, Tuple
 import logging
-from sentence_transformers import SentenceTransformer
+import threading
+import time
+from datetime import datetime
+from collections import OrderedDict, Counter
 from config import EMBEDDING_CONFIG
+from encoder_backends import load_encoder
+from encode_scheduler import encode_bucketed, encoder_settings
 from question_logger import QuestionLogger
+from document_ingest import DocumentIndex
+from query_log import QueryLogWriter
+from metrics import STAGE_LATENCY, REQUEST_LATENCY, CACHE_EVENTS, BATCH_SIZES, DEGRADED_ANSWERS, record_outcome
+from single_flight import SingleFlight
+from embedding_projection import EmbeddingCache, kb_fingerprint, normalize_rows, DEFAULT_CACHE_DIR
+from load_monitor import LOAD_MONITOR
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 성능 저하 모드 글자 2-gram 검색의 최소 겹침 비율 (Jaccard)
+LEXICAL_THRESHOLD = 0.5
+# 이 이상이면 [참고: 질문] 없이 답변만 표시 (Jaccard, 코사인 0.8 기준과 별도)
+# 짧은 질문에서 0.9 ≈ 글자 한두 개 차이 (띄어쓰기/조사 정도)
+LEXICAL_ANSWER_THRESHOLD = 0.9
+
+
+def _bigrams(text: str) -> set:
+    """단어별 글자 2-gram 집합 (한 글자 단어는 그대로)"""
+    return {word[i:i + 2] for word in re.findall(r'\w+', text.lower()) for i in range(max(1, len(word) - 1))}
+
+
 class SemanticRAGChatbot:
     """의미 기반 검색을 사용하는 RAG 챗봇"""
     
-    def __init__(self, excel_path: str, enable_logging: bool = True):
+    def __init__(self, excel_path: str, enable_logging: bool = True,
+                 document_dir: str = None, document_index_dir: str = './index/documents',
+                 query_log_dir: str = None, embedding_model=None, query_log: QueryLogWriter = None,
+                 kb_name: str = None, question_log_file: str = None, embedding_cache_dir: str = None):
         """
         RAG 챗봇 초기화
         
         Args:
             excel_path: 질문-답변 데이터가 있는 엑셀 파일 경로
             enable_logging: 알 수 없는 질문 로깅 활성화 여부 (기본값: True)
+            document_dir: 매뉴얼/절차 문서 폴더 (지정하면 문서 청크도 검색)
+            document_index_dir: 문서 청크 인덱스 저장 폴더 (변경된 문서만 다시 임베딩)
+            query_log_dir: 질의 로그 폴더 (지정하면 모든 질문을 JSONL로 백그라운드 기록)
+            embedding_model: 이미 로딩된 인코더 (지식 베이스 여러 개가 모델 하나를 공유할 때)
+            query_log: 이미 만든 질의 로그 (여러 지식 베이스가 공유, query_log_dir보다 우선)
+            kb_name: 지식 베이스 이름 (질의 로그에 "kb"로 기록)
+            question_log_file: 미답변 질문 엑셀 경로 (None이면 logs/unanswered_questions.xlsx)
+            embedding_cache_dir: 임베딩 캐시 폴더 (None이면 EMBEDDING_CONFIG 설정값)
         
         Process:
             1. 로컬 임베딩 모델 로딩 (한국어 특화)
@@ -52,6 +87,7 @@ class SemanticRAGChatbot:
             3. 엑셀 파일에서 질문-답변 로딩
             4. 각 질문마다 임베딩 생성 (로컬 모델 사용)
             5. 임베딩을 메모리에 저장 (캐싱)
+            6. 문서 폴더가 있으면 문서 인덱스 증분 업데이트
         
         Note:
             - 초기화 시 약 2-3초 소요 (모델 로딩 + 27개 임베딩 생성)
@@ -59,25 +95,50 @@ class SemanticRAGChatbot:
             - OpenAI API 비용 없음, 오프라인 동작 가능
         """
         # 로컬 임베딩 모델 초기화
-        logger.info(f"임베딩 모델 로딩 중: {EMBEDDING_CONFIG['model_name']}")
-        self.embedding_model = SentenceTransformer(
-            EMBEDDING_CONFIG['model_name'],
-            device=EMBEDDING_CONFIG['device']
-        )
-        logger.info("임베딩 모델 로딩 완료")
+        # EMBEDDING_CONFIG['backend']: torch(기본) / torch-int8 / onnx / onnx-int8
+        # embedding_model을 넘기면 모델을 다시 로딩하지 않고 공유
+        if embedding_model is None:
+            embedding_model = load_encoder()
+            logger.info("임베딩 모델 로딩 완료")
+        self.embedding_model = embedding_model
+        self.kb_name = kb_name
+        self.embedding_cache_dir = embedding_cache_dir or EMBEDDING_CONFIG.get('embedding_cache_dir', DEFAULT_CACHE_DIR)
         
         # 지식 베이스 저장소 (질문, 답변) 튜플 리스트
         self.knowledge_base = []
         
-        # 임베딩 저장소 (768차원 벡터 리스트)
-        self.embeddings = []
+        # 임베딩 저장소 (행 수 × 768 정규화 행렬, 투영 사용 시 행 수 × projection_dim)
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+        
+        # 차원 축소 투영 (EMBEDDING_CONFIG['projection_dim'], 없으면 원래 차원 그대로)
+        self.projection = None
+        
+        # 질문 임베딩 캐시 (정규화된 질문 → 벡터, LRU)
+        # 같은 질문이 반복되면 임베딩 생성 생략
+        self._query_cache = OrderedDict()
+        self._query_cache_size = EMBEDDING_CONFIG.get('query_cache_size', 1024)
+        self._query_cache_lock = threading.Lock()
+        
+        # 동일 질문 요청 합치기 (처리 중인 같은 질문은 결과 공유, 미답변 기록도 1번만)
+        self._answer_flight = SingleFlight('answer')
+        
+        # 부하 감시 (과부하 시 성능 저하 모드, 프로세스 전체 공유)
+        # 저하 모드용 완전 일치/글자 2-gram 색인은 처음 필요할 때 생성
+        self.load_monitor = LOAD_MONITOR
+        self._lexical = None
+        self._lexical_lock = threading.Lock()
         
         # 질문 로거 초기화 (미답변 질문 자동 기록)
         self.enable_logging = enable_logging
         if enable_logging:
-            self.question_logger = QuestionLogger()
+            self.question_logger = QuestionLogger(question_log_file) if question_log_file else QuestionLogger()
             logger.info("질문 로거 활성화")
         
+        # 질의 로그 (모든 질문의 상위 k개/유사도/지연시간/결과, 백그라운드 기록)
+        if query_log is None and query_log_dir:
+            query_log = QueryLogWriter(query_log_dir)
+        self.query_log = query_log
+        
         # 지식 베이스 로딩 (엑셀 → 메모리)
         self._load_knowledge_base(excel_path)
         
@@ -85,6 +146,21 @@ class SemanticRAGChatbot:
         # 로컬 모델 사용으로 빠르게 처리
         self._generate_embeddings()
         
+        # 문서 청크 인덱스 (선택)
+        # 변경된 문서만 다시 임베딩하므로 재시작 시에도 빠름
+        self.document_index = None
+        if document_dir:
+            self.document_index = DocumentIndex(
+                document_index_dir,
+                encoder=self.embedding_model,
+                model_key=f"{EMBEDDING_CONFIG['model_name']}|{EMBEDDING_CONFIG.get('backend', 'torch')}",
+                normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings'],
+                embed_batch_size=EMBEDDING_CONFIG['batch_size'],
+                token_budget=encoder_settings()[0]
+            )
+            self.document_index.update(document_dir)
+            logger.info(f"문서 인덱스 로딩 완료: {len(self.document_index)}개 청크")
+        
         logger.info(f"지식 베이스 로딩 완료: {len(self.knowledge_base)}개 항목")
     
     def _load_knowledge_base(self, excel_path: str):
@@ -122,14 +198,16 @@ class SemanticRAGChatbot:
         
         Process:
             1. 모든 질문 정규화 (MIS → MIS, mis → MIS 통일)
-            2. 로컬 임베딩 모델로 배치 처리
-            3. 768차원 벡터 생성
-            4. self.embeddings에 저장
+            2. 임베딩 캐시 확인 (질문 목록 + 모델이 같으면 그대로 사용)
+            3. 없으면 로컬 임베딩 모델로 배치 처리 (길이가 비슷한 질문끼리 묶음) 후 캐시 저장
+            4. projection_dim이 설정돼 있으면 투영 행렬 로딩/학습 후 차원 축소
+            5. self.embeddings에 저장 (행렬)
         
         Note:
             - 로컬 모델 사용으로 빠름 (약 1-2초)
             - API 비용 없음
             - 배치 처리로 효율적
+            - 투영을 쓰면 원래 차원 임베딩은 캐시 파일에만 남음 (메모리 절감)
             
         Example:
             "MIS 설치" → [0.234, 0.567, ..., 0.891] (768개 숫자)
@@ -143,26 +221,48 @@ class SemanticRAGChatbot:
                 for question, _ in self.knowledge_base
             ]
             
-            # 로컬 모델로 배치 임베딩 생성 (빠름!)
-            # normalize_embeddings=True: 코사인 유사도 최적화
-            embeddings = self.embedding_model.encode(
-                normalized_questions,
-                convert_to_numpy=True,
-                normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings'],
-                batch_size=EMBEDDING_CONFIG['batch_size'],
-                show_progress_bar=True
-            )
+            # 캐시 확인 (모델/백엔드가 바뀌면 다시 생성)
+            cache = EmbeddingCache(self.embedding_cache_dir)
+            model_key = f"{EMBEDDING_CONFIG['model_name']}|{EMBEDDING_CONFIG.get('backend', 'torch')}"
+            fingerprint = kb_fingerprint(normalized_questions, model_key)
+            embeddings = cache.load_embeddings(fingerprint)
+            
+            if embeddings is not None:
+                logger.info("임베딩 캐시 사용")
+            else:
+                # 로컬 모델로 배치 임베딩 생성 (빠름!)
+                # 토큰 길이순으로 묶어서 패딩 낭비 최소화 (encode_scheduler)
+                # normalize_embeddings=True: 코사인 유사도 최적화
+                token_budget, max_batch_size = encoder_settings()
+                embeddings = encode_bucketed(
+                    self.embedding_model,
+                    normalized_questions,
+                    token_budget=token_budget,
+                    max_batch_size=max_batch_size,
+                    normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings'],
+                    source='knowledge_base',
+                    show_progress_bar=True
+                )
+                # 행별 정규화 → 내적 = 코사인 유사도
+                embeddings = normalize_rows(embeddings)
+                cache.save_embeddings(fingerprint, embeddings)
             
-            # 리스트로 변환하여 저장
-            self.embeddings = embeddings.tolist()
+            # 차원 축소 (선택)
+            projection_dim = EMBEDDING_CONFIG.get('projection_dim')
+            if projection_dim and len(embeddings):
+                self.projection = cache.projection(fingerprint, embeddings, projection_dim)
+                embeddings = self.projection.transform(embeddings)
             
-            logger.info(f"임베딩 생성 완료: {len(self.embeddings)}개 (차원: {len(self.embeddings[0])})")
+            self.embeddings = embeddings
+            
+            logger.info(f"임베딩 생성 완료: {len(self.embeddings)}개 (차원: {self.embeddings.shape[1]})")
             
         except Exception as e:
             logger.error(f"임베딩 생성 실패: {str(e)}")
             # 실패 시 빈 벡터로 초기화
             dim = EMBEDDING_CONFIG['embedding_dim']
-            self.embeddings = [[0] * dim for _ in self.knowledge_base]
+            self.projection = None
+            self.embeddings = np.zeros((len(self.knowledge_base), dim), dtype=np.float32)
     
     def _cosine_similarity(self, vec1: List[float], vec2: List[float]) -> float:
         """
@@ -238,7 +338,53 @@ class SemanticRAGChatbot:
         
         return normalized
     
-    def _find_similar_qa(self, query: str, top_k: int = 5, threshold: float = 0.4) -> List[Tuple[str, str, float]]:
+    def _encode_query(self, query: str) -> np.ndarray:
+        """
+        질문 임베딩 생성 (정규화 포함)
+        
+        Args:
+            query: 사용자 질문
+        
+        Returns:
+            np.ndarray: 768차원 벡터
+        
+        Note:
+            - 정규화된 질문 기준 LRU 캐시 (query_cache_size개, 기본 1024)
+            - 캐시 적중/실패는 /metrics에 기록
+        """
+        # "mis" → "MIS", "erp" → "ERP"
+        with STAGE_LATENCY.time(stage='normalize'):
+            normalized_query = self._normalize_text(query)
+        
+        # 캐시 확인 (같은 질문이면 임베딩 재사용)
+        with self._query_cache_lock:
+            cached = self._query_cache.get(normalized_query)
+            if cached is not None:
+                self._query_cache.move_to_end(normalized_query)
+        if cached is not None:
+            CACHE_EVENTS.inc(cache='query_embedding', result='hit')
+            return cached
+        CACHE_EVENTS.inc(cache='query_embedding', result='miss')
+        
+        start = time.perf_counter()
+        with STAGE_LATENCY.time(stage='encode'):
+            embedding = self.embedding_model.encode(
+                normalized_query,
+                convert_to_numpy=True,
+                normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings']
+            )
+        self.load_monitor.observe_encode(time.perf_counter() - start)
+        BATCH_SIZES.observe(1, source='query')
+        
+        if self._query_cache_size > 0:
+            with self._query_cache_lock:
+                self._query_cache[normalized_query] = embedding
+                if len(self._query_cache) > self._query_cache_size:
+                    self._query_cache.popitem(last=False)
+        return embedding
+    
+    def _find_similar_qa(self, query: str, top_k: int = 5, threshold: float = 0.4,
+                         query_embedding: np.ndarray = None) -> List[Tuple[str, str, float]]:
         """
         의미 기반 유사 질문-답변 검색 (핵심 기능!)
         
@@ -246,6 +392,7 @@ class SemanticRAGChatbot:
             query: 사용자 질문 (예: "mis 설치 방법")
             top_k: 반환할 상위 결과 개수 (기본값: 5개)
             threshold: 최소 유사도 임계값 (기본값: 0.4 = 40%)
+            query_embedding: 미리 계산한 질문 임베딩 (있으면 재사용)
         
         Returns:
             List[Tuple[질문, 답변, 유사도]]: 유사한 질문-답변 쌍 리스트
@@ -269,36 +416,77 @@ class SemanticRAGChatbot:
             → 반환: [("MIS 설치해주세요", "...", 0.941), ...]
         """
         try:
-            # 1. 쿼리 정규화 (대소문자 통일)
-            # "mis" → "MIS", "erp" → "ERP"
-            normalized_query = self._normalize_text(query)
-            
-            # 2. 쿼리 임베딩 생성 (로컬 모델 사용)
+            # 1-2. 쿼리 정규화 + 임베딩 생성 (로컬 모델 사용)
             # 텍스트 → 768차원 벡터
-            query_embedding = self.embedding_model.encode(
-                normalized_query,
-                convert_to_numpy=True,
-                normalize_embeddings=EMBEDDING_CONFIG['normalize_embeddings']
-            )
-            
-            # 3. 저장된 모든 질문과 유사도 계산
-            similarities = []
-            for i, (q, a) in enumerate(self.knowledge_base):
-                # 코사인 유사도 계산 (0 ~ 1 사이 값)
-                similarity = self._cosine_similarity(query_embedding, self.embeddings[i])
-                similarities.append((similarity, q, a))
+            if query_embedding is None:
+                query_embedding = self._encode_query(query)
             
-            # 4. 유사도 높은 순으로 정렬 (내림차순)
-            similarities.sort(reverse=True, key=lambda x: x[0])
+            # 3-5. 유사도 계산 + 정렬 + 임계값 이상 상위 k개
+            ranked = self._rank_qa(query_embedding, top_k=top_k, threshold=threshold)
+            return [(self.knowledge_base[i][0], self.knowledge_base[i][1], sim) for i, sim in ranked]
             
-            # 5. 임계값 이상인 상위 k개만 반환
-            # 예: threshold=0.4 → 40% 이상 유사한 것만
-            results = [(q, a, sim) for sim, q, a in similarities[:top_k] if sim >= threshold]
+        except Exception as e:
+            logger.error(f"검색 실패: {str(e)}")
+            return []
+    
+    def _rank_qa(self, query_embedding: np.ndarray, top_k: int = 5,
+                 threshold: float = 0.4) -> List[Tuple[int, float]]:
+        """
+        지식 베이스 유사도 순위 계산
+        
+        Args:
+            query_embedding: 질문 임베딩
+            top_k: 반환할 상위 결과 개수
+            threshold: 최소 유사도
+        
+        Returns:
+            List[Tuple[지식 베이스 ID(행 번호), 유사도]]: 유사도 내림차순
+
+        Note:
+            - 투영을 쓰면 질문 임베딩도 같은 투영 후 축소된 차원에서 비교
+              (투영 결과는 다시 정규화돼 있으므로 내적 = 코사인, 0.4/0.6/0.8 임계값 그대로 적용)
+            - 문서 청크 검색은 원래 차원 임베딩 그대로 사용
+        """
+        if not len(self.embeddings) or top_k <= 0:
+            return []
+        
+        with STAGE_LATENCY.time(stage='score'):
+            # 3. 저장된 모든 질문과 유사도 계산 (행렬 × 벡터 한 번)
+            # 지식 베이스 임베딩은 정규화돼 있으므로 내적 = 코사인 유사도
+            query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(-1))
+            if self.projection is not None:
+                query = self.projection.transform(query)
+            scores = self.embeddings @ query
             
-            return results
+            # 4. 상위 k개만 골라서 유사도 높은 순으로 정렬 (전체 정렬 생략)
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
             
+            # 5. 임계값 이상인 것만 반환
+            # 예: threshold=0.4 → 40% 이상 유사한 것만
+            return [(int(i), float(scores[i])) for i in top if scores[i] >= threshold]
+    
+    def _find_similar_passages(self, query_embedding: np.ndarray, top_k: int = 3,
+                               threshold: float = 0.4) -> List[dict]:
+        """
+        문서 청크 검색 (문서 인덱스가 있을 때만)
+        
+        Args:
+            query_embedding: 질문 임베딩
+            top_k: 반환할 청크 수
+            threshold: 최소 유사도
+        
+        Returns:
+            List[dict]: [{"score", "document", "start", "end", "text"}, ...]
+        """
+        if self.document_index is None:
+            return []
+        try:
+            with STAGE_LATENCY.time(stage='passage'):
+                return self.document_index.search(query_embedding, top_k=top_k, threshold=threshold)
         except Exception as e:
-            logger.error(f"검색 실패: {str(e)}")
+            logger.error(f"문서 검색 실패: {str(e)}")
             return []
     
     def generate_answer(self, question: str) -> str:
@@ -312,7 +500,7 @@ class SemanticRAGChatbot:
             str: 답변 텍스트 (엑셀 데이터 그대로)
         
         Process Flow:
-            1. 유사한 질문 검색
+            1. 유사한 질문 검색 (+ 문서 청크 검색)
                ↓
             2-A. 찾음 → 답변 반환
             2-B. 못 찾음 → 로그에 기록 + "찾을 수 없습니다" 반환
@@ -326,45 +514,252 @@ class SemanticRAGChatbot:
             - ChatGPT 사용 안 함! (엑셀 답변 그대로)
             - 유사도 0.8 이상: 답변만 표시
             - 유사도 0.4~0.8: [참고: 원본질문] + 답변 표시
+            - 단계별 소요 시간은 /metrics에서 확인 (ktrgpt_stage_latency_seconds)
+            - 검색 상세 정보(상위 k개, 유사도, 결과)가 필요하면 answer_query 사용
+        """
+        return self.answer_query(question)['answer']
+    
+    def answer_query(self, question: str) -> dict:
+        """
+        질문 처리 결과 (답변 + 검색 상세 정보)
+        
+        Args:
+            question: 사용자 질문
+        
+        Returns:
+            dict: {
+                "answer": 답변 텍스트,
+                "outcome": "answered" / "passage" / "unanswered",
+                "top_k": [[지식 베이스 ID, 유사도], ...] (유사도 내림차순),
+                "latency_ms": 처리 시간 (ms),
+                "coalesced": 다른 요청의 처리 결과를 공유했는지 여부,
+                "degraded": 성능 저하 모드로 처리했는지 여부,
+                "path": 저하 모드 답변 경로 (exact / cached / lexical / reduced, 저하 모드일 때만)
+            }
+        
+        Note:
+            - generate_answer는 이 결과의 answer만 반환
+            - 정규화된 질문과 저하 모드 여부가 같은 요청이 처리 중이면 기다렸다가 그 결과를 공유
+              (저하 모드 여부는 요청마다 판단 → 정상 요청이 저하 모드 답변을 받아 가지 않음)
+            - 결과/저하 경로 지표는 계산 1번이 아니라 요청마다 기록
+            - 과부하면 인코딩을 피하는 싼 경로로 처리 (load_monitor)
+            - 질의 로그가 켜져 있으면 결과를 큐에 넣고 바로 반환 (기록은 백그라운드)
+        """
+        start = time.perf_counter()
+        with self.load_monitor.track():
+            # 저하 모드에서도 주기적으로 1개는 전체 경로로 처리 (인코딩 지연시간 측정 → 회복 판단)
+            degraded = self.load_monitor.degraded() and not self.load_monitor.should_probe()
+            key = (degraded, ' '.join(self._normalize_text(question).split()))
+            shared, coalesced = self._answer_flight.do(key, lambda: self._answer_query(question, degraded))
+        # 공유 결과는 요청마다 복사해서 지연시간 등을 따로 기록
+        result = dict(shared)
+        result['coalesced'] = coalesced
+        elapsed = time.perf_counter() - start
+        REQUEST_LATENCY.observe(elapsed)
+        result['latency_ms'] = round(elapsed * 1000, 3)
+        record_outcome(result['outcome'])
+        if degraded:
+            DEGRADED_ANSWERS.inc(path=result['path'])
+        
+        if self.query_log is not None:
+            # 답변 원문은 지식 베이스 ID로 추적 가능하므로 기록하지 않음
+            record = {'ts': datetime.now().isoformat(timespec='milliseconds'), 'question': question}
+            if self.kb_name:
+                record['kb'] = self.kb_name
+            record.update((k, v) for k, v in result.items() if k != 'answer')
+            self.query_log.log(record)
+        return result
+    
+    def _answer_query(self, question: str, degraded: bool = False) -> dict:
         """
-        logger.info(f"질문 처리 중: {question}")
+        answer_query 본체
+        
+        Args:
+            question: 사용자 질문
+            degraded: 성능 저하 모드 여부
+        
+        Process:
+            - 정상: 의미 검색(상위 5개) + 문서 검색 → 답변 구성 → 미답변 로깅
+            - 저하: 인코딩 없는 경로(완전 일치 → 캐시된 임베딩 → 글자 2-gram)를 먼저 시도,
+                    모두 실패하면 top_k=1로 의미 검색 (문서 검색/"관련 정보" 생략)
+        """
+        if not degraded:
+            result = self._answer_full(question)
+        else:
+            result = self._answer_cheap(question)
+            if result is None:
+                result = self._answer_full(question, top_k=1, reduced=True)
+                result['path'] = 'reduced'
+        result['degraded'] = degraded
+        return result
+    
+    def _answer_full(self, question: str, top_k: int = 5, reduced: bool = False) -> dict:
+        """의미 검색 → 답변 구성 → 미답변 로깅 (reduced=True면 문서 검색/관련 정보 생략)"""
+        logger.debug("질문 처리 중: %s", question)
         
         # 1. 유사한 질문-답변 검색 (의미 기반)
         # top_k=5: 상위 5개, threshold=0.4: 40% 이상 유사
-        similar_qas = self._find_similar_qa(question, top_k=5, threshold=0.4)
+        try:
+            query_embedding = self._encode_query(question)
+            ranked = self._rank_qa(query_embedding, top_k=top_k, threshold=0.4)
+        except Exception as e:
+            logger.error(f"검색 실패: {str(e)}")
+            query_embedding, ranked = None, []
+        top_k = [[i, round(sim, 4)] for i, sim in ranked]
+        similar_qas = [(self.knowledge_base[i][0], self.knowledge_base[i][1], sim) for i, sim in ranked]
+        
+        # 1-1. 문서 청크 검색 (문서 인덱스가 있을 때)
+        # Q&A보다 문서 구절이 더 비슷하면 구절 + 출처로 답변
+        passages = []
+        if query_embedding is not None and not reduced:
+            passages = self._find_similar_passages(query_embedding, top_k=3, threshold=0.4)
+        if passages and (not similar_qas or passages[0]['score'] > similar_qas[0][2]):
+            best = passages[0]
+            logger.debug("가장 유사한 문서 구절: '%s' (유사도: %.3f)", best['document'], best['score'])
+            return {
+                'answer': f"{best['text']}\n\n[출처: {best['document']} ({best['start']}~{best['end']})]",
+                'outcome': 'passage',
+                'top_k': top_k,
+                'source': {'document': best['document'], 'start': best['start'],
+                           'end': best['end'], 'score': round(best['score'], 4)},
+            }
         
         # 2-A. 검색 결과 없음 (유사도 모두 0.4 미만)
         if not similar_qas:
             # 알 수 없는 질문 로깅 (자동으로 엑셀에 기록)
             if self.enable_logging:
-                self.question_logger.log_unknown_question(question)
-                logger.info(f"알 수 없는 질문 로그에 추가: {question}")
+                with STAGE_LATENCY.time(stage='log'):
+                    self.question_logger.log_unknown_question(question)
+                logger.debug("알 수 없는 질문 로그에 추가: %s", question)
             
-            return "죄송합니다. 해당 질문에 대한 정보를 찾을 수 없습니다. 다른 방식으로 질문해주시거나, 관리자에게 문의해주세요."
+            return {
+                'answer': "죄송합니다. 해당 질문에 대한 정보를 찾을 수 없습니다. 다른 방식으로 질문해주시거나, 관리자에게 문의해주세요.",
+                'outcome': 'unanswered',
+                'top_k': top_k,
+            }
         
         # 2-B. 검색 성공 - 가장 유사한 답변 선택
+        return {'answer': self._compose_answer(similar_qas, related=not reduced), 'outcome': 'answered', 'top_k': top_k}
+    
+    def _compose_answer(self, similar_qas: List[Tuple[str, str, float]], related: bool = True,
+                        answer_threshold: float = 0.8) -> str:
+        """
+        검색 결과로 답변 텍스트 구성
+        
+        Args:
+            similar_qas: [(질문, 답변, 유사도), ...] 유사도 내림차순
+            related: 2~5위 "관련 정보" 포함 여부 (코사인 0.6 기준이므로 의미 검색 결과에만 사용)
+            answer_threshold: 이 이상이면 답변만 표시 (코사인 0.8, 글자 검색은 LEXICAL_ANSWER_THRESHOLD)
+        """
         best_q, best_a, best_sim = similar_qas[0]  # 첫 번째가 가장 유사
-        logger.info(f"가장 유사한 질문: '{best_q}' (유사도: {best_sim:.3f})")
+        logger.debug("가장 유사한 질문: '%s' (유사도: %.3f)", best_q, best_sim)
+        
+        with STAGE_LATENCY.time(stage='compose'):
+            # 3. 유사도에 따라 답변 형식 결정
+            if best_sim >= answer_threshold:
+                # 매우 유사 (80% 이상) → 답변만 표시
+                result = best_a
+            else:
+                # 보통 유사 (40~80%) → 참고 질문도 함께 표시
+                result = f"[참고: {best_q}]\n\n{best_a}"
+            
+            # 4. 추가 관련 정보가 있으면 제공
+            # 2~5위 중 유사도 0.6 이상인 것들
+            if related and len(similar_qas) > 1:
+                additional = "\n\n관련 정보:\n" + "\n".join([
+                    f"- {a}" for q, a, sim in similar_qas[1:] if sim >= 0.6
+                ])
+                # 관련 정보가 실제로 있을 때만 추가
+                if additional.strip() != "관련 정보:":
+                    result += additional
+        return result
+    
+    def _answer_cheap(self, question: str) -> dict:
+        """
+        성능 저하 모드의 인코딩 없는 답변 (못 찾으면 None)
+        
+        순서:
+            1. exact: 정규화된 질문이 지식 베이스 질문과 같음 (유사도 1.0)
+            2. cached: 질문 임베딩이 캐시에 있으면 상위 1개 의미 검색
+            3. lexical: 글자 2-gram 겹침 비율(Jaccard) LEXICAL_THRESHOLD 이상
         
-        # 3. 유사도에 따라 답변 형식 결정
-        if best_sim >= 0.8:
-            # 매우 유사 (80% 이상) → 답변만 표시
-            result = best_a
+        Note:
+            - 못 찾아도 미답변으로 기록하지 않음 (reduced 경로가 의미 검색 후 판단)
+            - lexical 점수는 코사인이 아니므로 답변 형식은 LEXICAL_ANSWER_THRESHOLD로 판단
+              (top_k의 점수도 Jaccard, path로 구분)
+        """
+        normalized = self._normalize_text(question)
+        exact, postings, sizes = self._lexical_index()
+        
+        index = exact.get(' '.join(normalized.split()))
+        if index is not None:
+            ranked, path = [(index, 1.0)], 'exact'
         else:
-            # 보통 유사 (40~80%) → 참고 질문도 함께 표시
-            result = f"[참고: {best_q}]\n\n{best_a}"
-        
-        # 4. 추가 관련 정보가 있으면 제공
-        # 2~5위 중 유사도 0.6 이상인 것들
-        if len(similar_qas) > 1:
-            additional = "\n\n관련 정보:\n" + "\n".join([
-                f"- {a}" for q, a, sim in similar_qas[1:] if sim >= 0.6
-            ])
-            # 관련 정보가 실제로 있을 때만 추가
-            if additional.strip() != "관련 정보:":
-                result += additional
+            with self._query_cache_lock:
+                cached = self._query_cache.get(normalized)
+            if cached is not None:
+                CACHE_EVENTS.inc(cache='query_embedding', result='hit')
+                ranked, path = self._rank_qa(cached, top_k=1, threshold=0.4), 'cached'
+            else:
+                with STAGE_LATENCY.time(stage='lexical'):
+                    ranked, path = self._lexical_search(normalized, postings, sizes), 'lexical'
+        if not ranked:
+            return None
+        
+        similar_qas = [(self.knowledge_base[i][0], self.knowledge_base[i][1], sim) for i, sim in ranked]
+        answer_threshold = LEXICAL_ANSWER_THRESHOLD if path == 'lexical' else 0.8
+        return {
+            'answer': self._compose_answer(similar_qas, related=False, answer_threshold=answer_threshold),
+            'outcome': 'answered',
+            'top_k': [[i, round(sim, 4)] for i, sim in ranked],
+            'path': path,
+        }
+    
+    def _lexical_index(self):
+        """
+        (완전 일치 dict, 2-gram → 행 번호 목록, 행별 2-gram 수) - 처음 호출 시 1번 생성
+        """
+        if self._lexical is None:
+            with self._lexical_lock:
+                if self._lexical is None:
+                    exact, postings, sizes = {}, {}, []
+                    for i, (question, _) in enumerate(self.knowledge_base):
+                        normalized = self._normalize_text(question)
+                        exact.setdefault(' '.join(normalized.split()), i)
+                        grams = _bigrams(normalized)
+                        sizes.append(len(grams))
+                        for gram in grams:
+                            postings.setdefault(gram, []).append(i)
+                    self._lexical = (exact, postings, sizes)
+                    logger.info(f"성능 저하 모드 색인 생성: 2-gram {len(postings)}개")
+        return self._lexical
+    
+    def _lexical_search(self, normalized: str, postings: dict, sizes: list) -> List[Tuple[int, float]]:
+        """
+        글자 2-gram 겹침 비율이 가장 높은 지식 베이스 행 1개
         
-        return result
+        Note:
+            - 너무 흔한 2-gram은 후보 수집에서 제외
+              (max(1000행, 전체 행의 10%)보다 많은 행에 나오는 2-gram → 작은 지식 베이스에서는 제외 없음)
+        """
+        grams = _bigrams(normalized)
+        if not grams:
+            return []
+        limit = max(1000, len(self.knowledge_base) // 10)
+        counts = Counter()
+        for gram in grams:
+            rows = postings.get(gram)
+            if rows and len(rows) <= limit:
+                counts.update(rows)
+        if not counts:
+            return []
+        
+        best, best_score = None, 0.0
+        for i, overlap in counts.items():
+            score = overlap / (len(grams) + sizes[i] - overlap)
+            if score > best_score:
+                best, best_score = i, score
+        return [(best, best_score)] if best_score >= LEXICAL_THRESHOLD else []
     
     def interactive_mode(self):
         """대화형 모드"""
@@ -397,13 +792,15 @@ def main():
     parser = argparse.ArgumentParser(description='의미 기반 RAG 챗봇')
     parser.add_argument('--excel_path', type=str, default='./data/data.xlsx',
                        help='질문-답변 엑셀 파일 경로')
+    parser.add_argument('--document_dir', type=str, default=None,
+                       help='매뉴얼/절차 문서 폴더 (txt, md, html)')
     
     args = parser.parse_args()
     
     try:
         # RAG 챗봇 초기화
         print("챗봇 초기화 중... (임베딩 생성)")
-        chatbot = SemanticRAGChatbot(args.excel_path)
+        chatbot = SemanticRAGChatbot(args.excel_path, document_dir=args.document_dir)
         
         # 대화형 모드 시작
         chatbot.interactive_mode()
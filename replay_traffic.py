@@ -0,0 +1,360 @@
+"""
+트래픽 재현(replay) - 실제 질문 흐름을 그대로 다시 보내 용량 계획/변경 영향 확인
+지식 베이스나 모델을 바꾸기 전에 "실제 트래픽에서 어떻게 동작할지" 측정
+
+핵심 기능:
+    1. 트래픽 소스
+       - 질의 로그 (logs/queries/*.jsonl.gz, query_log.py)
+       - 미답변 로그 (logs/unanswered_questions.xlsx의 질문/일시)
+       - 합성 트래픽 (data.xlsx 기반, 포아송 도착)
+    2. 대상
+       - in-process: 지식 베이스 레지스트리로 SemanticRAGChatbot을 직접 호출
+       - http: 실행 중인 서버의 /api/chat
+       - 질의 로그의 "kb"(지식 베이스 이름)를 그대로 사용 (없으면 기본 지식 베이스)
+    3. 속도
+       - 원래 시간 간격 유지 (--speed 1)
+       - N배속 (--speed 10)
+       - 최대 속도 (--speed 0, 간격 무시)
+    4. 결과
+       - 처리량, 지연시간 백분위, 오류 수, 예정 시각 대비 지연
+       - 기준 실행(--baseline) 대비 답변이 바뀐 질문 목록 (지식 베이스별로 구분)
+
+실행 방법:
+    python replay_traffic.py --query_log logs/queries --speed 10
+    python replay_traffic.py --unanswered logs/unanswered_questions.xlsx --synthetic 500 --target http
+    python replay_traffic.py --query_log logs/queries --baseline benchmarks/replay_20251001_090000.json
+
+출력:
+    - benchmarks/replay_<날짜시간>.json (다음 실행의 --baseline으로 사용 가능)
+"""
+import os
+import json
+import time
+import random
+import logging
+import tempfile
+import threading
+from datetime import datetime
+from typing import List, Tuple, Optional
+from concurrent.futures import ThreadPoolExecutor
+from benchmark import latency_summary, environment_info, write_result, load_seed_qa, generate_queries
+from query_log import list_segments, iter_records
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 기준 실행 비교 시 결과에 포함할 변경 사례 수
+MAX_CHANGED_SAMPLES = 50
+
+# 재현 이벤트: (상대 시각 초, 질문, 지식 베이스 이름 또는 None=기본)
+Event = Tuple[float, str, Optional[str]]
+
+
+# ----------------------------------------------------------------------
+# 트래픽 소스 → [(상대 시각 초, 질문, 지식 베이스), ...]
+# ----------------------------------------------------------------------
+def _parse_ts(value) -> float:
+    """'2025-10-01T09:00:00.123' / '2025-10-01 09:00:00' / datetime → epoch 초"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value).replace(' ', 'T')).timestamp()
+
+
+def _to_relative(events: List[Event]) -> List[Event]:
+    """절대 시각 → 첫 이벤트 기준 상대 시각 (시간순 정렬)"""
+    if not events:
+        return []
+    events.sort(key=lambda e: e[0])
+    origin = events[0][0]
+    return [(ts - origin, q, kb) for ts, q, kb in events]
+
+
+def load_query_log(log_dir: str, since: str = None, until: str = None, limit: int = None) -> List[Event]:
+    """질의 로그에서 (시각, 질문, 지식 베이스) 목록 읽기"""
+    events = []
+    for record in iter_records(list_segments(log_dir), since, until):
+        if record.get('question') and record.get('ts'):
+            events.append((_parse_ts(record['ts']), record['question'], record.get('kb')))
+            if limit and len(events) >= limit:
+                break
+    return _to_relative(events)
+
+
+def load_unanswered_log(xlsx_path: str, kb: str = None) -> List[Event]:
+    """
+    미답변 로그 엑셀에서 (시각, 질문) 목록 읽기 (엑셀에는 지식 베이스 정보가 없으므로 kb로 지정)
+
+    Note:
+        - openpyxl read-only 모드로 한 행씩 읽음 (파일이 커도 메모리 일정)
+        - 컬럼: [번호, 질문, 일시, 상태, 비고]
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(xlsx_path, read_only=True)
+    ws = wb.active
+    events = []
+    for row in ws.iter_rows(min_row=2, values_only=True):
+        if len(row) < 3 or not row[1] or not row[2]:
+            continue
+        try:
+            events.append((_parse_ts(row[2]), str(row[1]), kb))
+        except ValueError:
+            continue
+    wb.close()
+    return _to_relative(events)
+
+
+def synthetic_traffic(excel_path: str, count: int, rate: float, rng: random.Random) -> List[Event]:
+    """
+    합성 트래픽 생성 (포아송 도착, 초당 rate개)
+
+    Note:
+        - 질문 생성은 benchmark.generate_queries와 동일 (변형 + 무관한 질문 섞기)
+    """
+    queries = generate_queries(load_seed_qa(excel_path), count, rng)
+    events, t = [], 0.0
+    for q in queries:
+        events.append((t, q, None))
+        t += rng.expovariate(rate)
+    return events
+
+
+def merge_traffic(*sources: List[Event]) -> List[Event]:
+    """여러 소스를 상대 시각 기준으로 합치기"""
+    merged = [event for source in sources for event in source]
+    merged.sort(key=lambda e: e[0])
+    return merged
+
+
+# ----------------------------------------------------------------------
+# 대상
+# ----------------------------------------------------------------------
+class InProcessTarget:
+    """
+    지식 베이스 레지스트리로 SemanticRAGChatbot 직접 호출 (미답변 엑셀/질의 로그 기록은 끔)
+
+    Args:
+        excel_path: 기본 지식 베이스 엑셀 (None이면 지식 베이스 설정값)
+        kb_config: 지식 베이스 설정 파일 (None이면 KTRGPT_KB_CONFIG / ./knowledge_bases.json)
+
+    Note:
+        - excel_path를 바꾸면 임베딩 캐시/문서 인덱스도 임시 폴더 사용
+          (운영 ./index/... 캐시를 덮어쓰거나 문서 인덱스를 갱신하지 않도록, 종료 시 삭제)
+    """
+
+    name = 'in-process'
+
+    def __init__(self, excel_path: str = None, kb_config: str = None):
+        from kb_registry import KnowledgeBaseRegistry, load_registry_config
+        config = load_registry_config(kb_config)
+        self._tmp_dir = None
+        if excel_path:
+            self._tmp_dir = tempfile.TemporaryDirectory(prefix='ktrgpt_replay_')
+            spec = config['knowledge_bases'][config['default']]
+            spec['excel_path'] = excel_path
+            spec['embedding_cache_dir'] = os.path.join(self._tmp_dir.name, 'knowledge_base')
+            spec['document_index_dir'] = os.path.join(self._tmp_dir.name, 'documents')
+        self.registry = KnowledgeBaseRegistry(config, enable_logging=False)
+
+    def __call__(self, question: str, kb: str = None) -> Tuple[bool, str]:
+        try:
+            return True, self.registry.get(kb).generate_answer(question)
+        except Exception as e:
+            logger.error(f"재현 중 오류: {str(e)}")
+            return False, None
+
+
+class HttpTarget:
+    """실행 중인 서버의 /api/chat 호출"""
+
+    name = 'http'
+
+    def __init__(self, url: str, timeout: float = 30.0):
+        self.url = url.rstrip('/') + '/api/chat'
+        self.timeout = timeout
+
+    def __call__(self, question: str, kb: str = None) -> Tuple[bool, str]:
+        import urllib.request
+
+        payload = {'question': question}
+        if kb:
+            payload['kb'] = kb
+        req = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}
+        )
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                body = json.loads(resp.read().decode('utf-8'))
+            return bool(body.get('success')), body.get('answer')
+        except Exception:
+            return False, None
+
+
+# ----------------------------------------------------------------------
+# 재현
+# ----------------------------------------------------------------------
+def replay(events: List[Event], target, speed: float = 1.0, concurrency: int = 32) -> dict:
+    """
+    트래픽 재현 (open-loop: 응답을 기다리지 않고 예정 시각에 요청 발사)
+
+    Args:
+        events: [(상대 시각 초, 질문, 지식 베이스), ...] (시간순)
+        target: (질문, 지식 베이스) → (성공 여부, 답변) 호출 가능 객체
+        speed: 재생 속도 (1 = 원래 속도, 10 = 10배속, 0 = 간격 무시)
+        concurrency: 동시에 처리 중일 수 있는 최대 요청 수
+
+    Returns:
+        dict: 처리량, 지연시간, 예정 시각 대비 지연, 오류 수,
+              답변 {지식 베이스 이름("" = 기본): {질문: 답변}}
+
+    Note:
+        - 동시 요청이 concurrency를 넘으면 발사가 밀림 → schedule_lag에 반영
+    """
+    latencies, lags = [], []
+    answers = {}
+    errors = 0
+    lock = threading.Lock()
+
+    def _run(question: str, kb: str, scheduled: float):
+        nonlocal errors
+        start = time.perf_counter()
+        ok, answer = target(question, kb)
+        latency = time.perf_counter() - start
+        with lock:
+            lags.append(max(0.0, start - scheduled))
+            if ok:
+                latencies.append(latency)
+                # 같은 질문이라도 지식 베이스가 다르면 답변이 다르므로 따로 저장
+                answers.setdefault(kb or '', {}).setdefault(question, answer)
+            else:
+                errors += 1
+
+    logger.info(f"재현 시작: {len(events)}개 질문, 속도 {speed or '최대'}x, 대상 {target.name}")
+    origin = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for offset, question, kb in events:
+            scheduled = origin + (offset / speed if speed > 0 else 0.0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(_run, question, kb, scheduled)
+    elapsed = time.perf_counter() - origin
+
+    return {
+        'target': target.name,
+        'speed': speed,
+        'concurrency': concurrency,
+        'total_requests': len(events),
+        'errors': errors,
+        'duration_sec': round(elapsed, 3),
+        'requests_per_sec': round(len(events) / elapsed, 1) if elapsed > 0 else None,
+        'original_span_sec': round(events[-1][0], 3) if events else 0,
+        'latency': latency_summary(latencies),
+        'schedule_lag': latency_summary(lags),
+        'answers': answers,
+    }
+
+
+def compare_answers(answers: dict, baseline_path: str) -> dict:
+    """
+    기준 실행 결과와 (지식 베이스, 질문)별 답변 비교
+
+    Returns:
+        dict: {"compared": 공통 질문 수, "changed": 바뀐 수, "samples": [...]}
+
+    Note:
+        - 지식 베이스 구분 전 형식({질문: 답변})의 기준 결과는 기본 지식 베이스("")로 간주
+    """
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f).get('answers', {})
+    if any(not isinstance(v, dict) for v in baseline.values()):
+        baseline = {'': baseline}
+
+    common = [(kb, q) for kb, by_question in answers.items()
+              for q in by_question if q in baseline.get(kb, {})]
+    changed = [(kb, q) for kb, q in common if answers[kb][q] != baseline[kb][q]]
+    return {
+        'baseline': baseline_path,
+        'compared': len(common),
+        'changed': len(changed),
+        'changed_ratio': round(len(changed) / len(common), 4) if common else None,
+        'samples': [{'kb': kb, 'question': q, 'before': baseline[kb][q], 'after': answers[kb][q]}
+                    for kb, q in changed[:MAX_CHANGED_SAMPLES]],
+    }
+
+
+def main():
+    """메인 실행 함수"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description='트래픽 재현 도구')
+    parser.add_argument('--query_log', type=str, default=None,
+                       help='질의 로그 폴더 (logs/queries)')
+    parser.add_argument('--since', type=str, default=None,
+                       help='질의 로그 시작 시각 (예: 2025-10-01)')
+    parser.add_argument('--until', type=str, default=None,
+                       help='질의 로그 끝 시각 (미포함)')
+    parser.add_argument('--unanswered', type=str, default=None,
+                       help='미답변 로그 엑셀 (logs/unanswered_questions.xlsx)')
+    parser.add_argument('--synthetic', type=int, default=0,
+                       help='합성 질문 수 (data.xlsx 기반)')
+    parser.add_argument('--synthetic_rate', type=float, default=5.0,
+                       help='합성 트래픽 초당 질문 수')
+    parser.add_argument('--limit', type=int, default=None,
+                       help='최대 질문 수')
+    parser.add_argument('--target', choices=['in-process', 'http'], default='in-process',
+                       help='재현 대상')
+    parser.add_argument('--url', type=str, default='http://localhost:8000',
+                       help='http 대상 서버 주소')
+    parser.add_argument('--excel_path', type=str, default=None,
+                       help='in-process 기본 지식 베이스/합성 트래픽용 엑셀 (없으면 지식 베이스 설정값, 합성은 ./data/data.xlsx)')
+    parser.add_argument('--kb_config', type=str, default=None,
+                       help='in-process 대상 지식 베이스 설정 파일 (knowledge_bases.json)')
+    parser.add_argument('--unanswered_kb', type=str, default=None,
+                       help='미답변 로그 질문을 보낼 지식 베이스 (없으면 기본)')
+    parser.add_argument('--speed', type=float, default=1.0,
+                       help='재생 속도 (1=원래 속도, 10=10배속, 0=최대 속도)')
+    parser.add_argument('--concurrency', type=int, default=32,
+                       help='최대 동시 요청 수')
+    parser.add_argument('--baseline', type=str, default=None,
+                       help='비교할 이전 재현 결과 JSON')
+    parser.add_argument('--output_dir', type=str, default='benchmarks',
+                       help='결과 JSON 저장 폴더')
+    parser.add_argument('--seed', type=int, default=42,
+                       help='합성 트래픽 난수 시드')
+
+    args = parser.parse_args()
+
+    sources = []
+    if args.query_log:
+        sources.append(load_query_log(args.query_log, args.since, args.until, args.limit))
+    if args.unanswered:
+        sources.append(load_unanswered_log(args.unanswered, args.unanswered_kb))
+    if args.synthetic:
+        sources.append(synthetic_traffic(args.excel_path or './data/data.xlsx', args.synthetic, args.synthetic_rate,
+                                         random.Random(args.seed)))
+    events = merge_traffic(*sources)[:args.limit]
+    if not events:
+        parser.error('재현할 질문이 없습니다. --query_log, --unanswered, --synthetic 중 하나 이상 지정하세요.')
+
+    if args.target == 'http':
+        target = HttpTarget(args.url)
+    else:
+        target = InProcessTarget(args.excel_path, args.kb_config)
+
+    result = {'benchmark': 'replay', 'environment': environment_info()}
+    result.update(replay(events, target, speed=args.speed, concurrency=args.concurrency))
+    if args.baseline:
+        result['comparison'] = compare_answers(result['answers'], args.baseline)
+
+    path = write_result('replay', result, args.output_dir)
+    summary = {k: v for k, v in result.items() if k != 'answers'}
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    print(f"\n결과 저장: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+요청 합치기 (single-flight) - 같은 질문이 동시에 들어오면 한 번만 계산해서 결과 공유
+공지가 나간 직후 수백 명이 같은 질문을 하면 각 요청이 따로 임베딩/검색하는 낭비를 막음
+
+작동 방식:
+    1. 첫 요청(leader): 계산 실행
+    2. 계산 중에 같은 키로 들어온 요청(follower): 계산이 끝날 때까지 대기
+    3. 계산이 끝나면 모두 같은 결과를 받음 (예외도 그대로 전달)
+    4. 결과는 저장하지 않음 (캐시가 아님) → 끝난 뒤 들어온 요청은 새로 계산
+
+배포 시 주의:
+    - 같은 프로세스 안에서 동시에 처리 중인 요청끼리만 합쳐짐
+    - 스레드로 요청을 처리하는 워커 필요
+      (deploy_server.sh: gunicorn worker_class = "gthread", threads = 4 / Flask 개발 서버 threaded=True)
+    - gunicorn sync 워커는 프로세스당 요청을 1개씩만 처리하므로 합쳐지지 않음 (효과 없음)
+
+사용 예:
+    flight = SingleFlight()
+    result, shared = flight.do(normalized_question, lambda: compute(question))
+"""
+import threading
+from typing import Any, Callable, Tuple
+from metrics import COALESCED_REQUESTS
+
+
+class _Call:
+    """진행 중인 계산 1건 (결과를 기다리는 요청들이 공유)"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    키별 진행 중 계산 합치기
+
+    Attributes:
+        name: /metrics 라벨 (ktrgpt_coalesced_requests_total{flight="..."})
+    """
+
+    def __init__(self, name: str = 'answer'):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        키가 같은 계산이 진행 중이면 기다렸다가 그 결과를, 아니면 직접 계산
+
+        Args:
+            key: 합치기 기준 (예: 정규화된 질문)
+            fn: 인자 없는 계산 함수
+
+        Returns:
+            Tuple[결과, 공유 여부]: 공유 여부 True = 다른 요청의 결과를 받음
+
+        Raises:
+            계산 중 발생한 예외 (leader/follower 모두 같은 예외)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+
+        if not leader:
+            COALESCED_REQUESTS.inc(flight=self.name, role='follower')
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        COALESCED_REQUESTS.inc(flight=self.name, role='leader')
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            # 먼저 목록에서 지우고 깨움 → 깨어난 뒤 들어온 요청은 새로 계산
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        """현재 진행 중인 계산 수"""
+        with self._lock:
+            return len(self._calls)
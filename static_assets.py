@@ -0,0 +1,235 @@
+"""
+정적 자원/응답 전송 최적화 - 페이지, 로고, JSON 응답을 적은 비용으로 전송
+아침 9시에 수백 명이 동시에 페이지를 열면 페이지/로고 요청이 채팅 요청과 같은 sync 워커를 차지함
+
+핵심 기능:
+    1. 페이지 미리 렌더링 (PageCache)
+       - index.html / logs.html은 요청마다 달라지는 값이 없으므로 처음 1번만 Jinja 렌더링
+       - gzip(+ brotli) 압축본도 미리 만들어 둠
+       - ETag → 브라우저가 If-None-Match로 물어보면 본문 없이 304
+         (압축 방식마다 다른 ETag: "<해시>", "<해시>-gzip", "<해시>-br")
+    2. 지문(fingerprint) 붙은 정적 자원 (StaticAssets)
+       - /assets/logo.<해시>.png → 내용이 바뀌면 URL도 바뀜
+       - Cache-Control: max-age=1년, immutable → 브라우저가 다시 요청하지 않음
+       - 파일은 시작 시 메모리에 올려서 요청마다 디스크를 읽지 않음
+       - 템플릿에서는 {{ asset_url('logo') }}
+    3. JSON 응답 압축 (compress_response)
+       - MIN_COMPRESS_BYTES 이상 JSON만 (짧은 채팅 답변은 압축 비용이 더 큼)
+       - 브라우저가 지원하면 brotli (brotli 패키지 설치 시), 아니면 gzip
+
+사용 예 (web_chatbot.py):
+    ASSETS, PAGES = init_app(app)
+
+    @app.route('/')
+    def index():
+        return PAGES.response('index.html')
+
+Note:
+    - app.debug이면 템플릿을 매번 렌더링 (수정 내용 바로 확인)
+"""
+import os
+import gzip
+import hashlib
+import mimetypes
+import threading
+import logging
+from flask import Response, request, render_template
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 로깅 설정
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# 논리 이름 → 파일 경로 (프로젝트 폴더 기준)
+ASSETS = {
+    'logo': 'ktr로고.png',
+}
+# 이보다 작은 JSON은 압축하지 않음 (바이트)
+MIN_COMPRESS_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+# 지문 붙은 자원: 1년 + immutable / 페이지: 매번 ETag 확인
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+PAGE_CACHE_CONTROL = 'no-cache'
+# 지문 없는 옛 URL(/logo): 1시간
+LEGACY_CACHE_CONTROL = 'public, max-age=3600'
+
+
+def _etag(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()[:20]
+
+
+def _compress(body: bytes) -> dict:
+    """{인코딩: 압축본} (압축해도 작아지지 않으면 제외)"""
+    encoded = {'gzip': gzip.compress(body, compresslevel=GZIP_LEVEL)}
+    if brotli is not None:
+        encoded['br'] = brotli.compress(body, quality=BROTLI_QUALITY)
+    return {name: data for name, data in encoded.items() if len(data) < len(body)}
+
+
+def _choose_encoding(encoded: dict):
+    """브라우저 Accept-Encoding에 맞는 압축 방식 (brotli 우선, 없으면 None)"""
+    for name in ('br', 'gzip'):
+        if name in encoded and name in request.accept_encodings:
+            return name
+    return None
+
+
+def cached_response(body: bytes, etag: str, mimetype: str, cache_control: str,
+                    encoded: dict = None) -> Response:
+    """
+    ETag/압축을 처리한 응답
+
+    Process:
+        1. 미리 압축한 본문 중 브라우저가 지원하는 것 선택
+        2. 압축 방식별 ETag ("<해시>-gzip" 등, 압축 안 하면 "<해시>")
+           → 캐시/프록시가 다른 압축본을 304로 재사용하지 않도록 강한 ETag를 구분
+        3. If-None-Match가 선택한 압축본의 ETag와 같으면 304 (본문 없음)
+    """
+    headers = {'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    encoding = _choose_encoding(encoded or {})
+    if encoding:
+        etag = f"{etag}-{encoding}"
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304, headers=headers)
+        response.set_etag(etag)
+        return response
+
+    if encoding:
+        body = encoded[encoding]
+        headers['Content-Encoding'] = encoding
+    response = Response(body, mimetype=mimetype, headers=headers)
+    response.set_etag(etag)
+    return response
+
+
+class StaticAssets:
+    """
+    지문 붙은 정적 자원 (시작 시 메모리에 로딩)
+
+    URL 형식:
+        /assets/<이름>.<내용 해시 10자>.<확장자>
+    """
+
+    def __init__(self, root: str = '.', assets: dict = None):
+        self._urls = {}     # 논리 이름 → URL
+        self._files = {}    # URL 파일 이름 → (본문, mimetype, ETag, 압축본)
+        self._names = {}    # 논리 이름 → URL 파일 이름
+        for name, path in (assets or ASSETS).items():
+            full_path = os.path.join(root, path)
+            if not os.path.exists(full_path):
+                logger.warning(f"정적 자원 없음: {full_path}")
+                continue
+            with open(full_path, 'rb') as f:
+                body = f.read()
+            digest = hashlib.sha256(body).hexdigest()
+            ext = os.path.splitext(path)[1]
+            filename = f"{name}.{digest[:10]}{ext}"
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            # 이미지/압축 파일은 이미 압축돼 있으므로 텍스트만 압축
+            encoded = _compress(body) if mimetype.startswith('text/') or mimetype.endswith(('javascript', 'json', 'svg+xml')) else {}
+            self._files[filename] = (body, mimetype, digest[:20], encoded)
+            self._names[name] = filename
+            self._urls[name] = f"/assets/{filename}"
+
+    def url(self, name: str) -> str:
+        """템플릿용 URL (없는 자원이면 빈 문자열)"""
+        return self._urls.get(name, '')
+
+    def response(self, filename: str) -> Response:
+        """/assets/<filename> 응답 (지문이 다르면 404)"""
+        entry = self._files.get(filename)
+        if entry is None:
+            return Response('Not Found', status=404, mimetype='text/plain')
+        body, mimetype, etag, encoded = entry
+        return cached_response(body, etag, mimetype, IMMUTABLE_CACHE_CONTROL, encoded)
+
+    def legacy_response(self, name: str) -> Response:
+        """지문 없는 옛 URL 응답 (예: /logo, 짧은 캐시 + ETag)"""
+        filename = self._names.get(name)
+        if filename is None:
+            return Response('Not Found', status=404, mimetype='text/plain')
+        body, mimetype, etag, encoded = self._files[filename]
+        return cached_response(body, etag, mimetype, LEGACY_CACHE_CONTROL, encoded)
+
+
+class PageCache:
+    """
+    미리 렌더링한 페이지 (템플릿 이름 → 본문, ETag, 압축본)
+
+    Note:
+        - 템플릿에 요청마다 달라지는 값이 없을 때만 사용
+        - 템플릿 파일을 수정하면 서버 재시작 필요 (debug 모드 제외)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._pages = {}
+        self._lock = threading.Lock()
+
+    def _render(self, template: str):
+        page = self._pages.get(template)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(template)
+                if page is None:
+                    body = render_template(template).encode('utf-8')
+                    page = (body, _etag(body), _compress(body))
+                    self._pages[template] = page
+        return page
+
+    def response(self, template: str) -> Response:
+        if self.app.debug:
+            return Response(render_template(template), mimetype='text/html')
+        body, etag, encoded = self._render(template)
+        return cached_response(body, etag, 'text/html', PAGE_CACHE_CONTROL, encoded)
+
+
+def compress_response(response: Response) -> Response:
+    """
+    큰 JSON 응답 압축 (after_request 훅)
+
+    대상:
+        - 200 응답, application/json, MIN_COMPRESS_BYTES 이상
+        - 스트리밍/파일 응답, 이미 압축된 응답은 제외
+    """
+    if (response.status_code != 200 or response.mimetype != 'application/json'
+            or response.direct_passthrough or response.is_streamed
+            or 'Content-Encoding' in response.headers):
+        return response
+
+    body = response.get_data()
+    if len(body) < MIN_COMPRESS_BYTES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    if brotli is not None and 'br' in request.accept_encodings:
+        encoding, data = 'br', brotli.compress(body, quality=BROTLI_QUALITY)
+    elif 'gzip' in request.accept_encodings:
+        encoding, data = 'gzip', gzip.compress(body, compresslevel=GZIP_LEVEL)
+    else:
+        return response
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+def init_app(app, root: str = '.'):
+    """
+    Flask 앱에 정적 자원/페이지 캐시/JSON 압축 연결
+
+    Returns:
+        Tuple[StaticAssets, PageCache]
+    """
+    assets = StaticAssets(root)
+    pages = PageCache(app)
+    app.jinja_env.globals['asset_url'] = assets.url
+    app.add_url_rule('/assets/<path:filename>', 'assets', assets.response)
+    app.after_request(compress_response)
+    return assets, pages
@@ -3,9 +3,13 @@ Flask 기반 웹 챗봇 서버
 
 주요 기능:
 1. 웹 UI 제공 (/, /logs)
-2. 채팅 API (/api/chat)
+2. 채팅 API (/api/chat, kb 파라미터로 부서별 지식 베이스 선택)
 3. 미답변 질문 조회 API (/api/unanswered)
+   - 내보내기 (/api/unanswered/export, /api/queries/export: CSV / 엑셀 스트리밍)
 4. 서버 상태 확인 API (/api/health)
+5. 성능 지표 (/metrics, Prometheus 텍스트 형식, 워커별 값)
+6. 샘플링 프로파일러 (/metrics/profile, 로컬 또는 관리자 토큰만)
+7. 정적 자원 (/assets/<이름>.<해시>.<확장자>, 장기 캐시) + 페이지 미리 렌더링 + JSON 압축
 
 실행 방법:
     py -3.11 web_chatbot.py
@@ -14,10 +18,24 @@ Flask 기반 웹 챗봇 서버
     http://localhost:5000 (메인)
     http://localhost:5000/logs (로그)
 """
-from flask import Flask, render_template, request, jsonify, send_from_directory
-from rag_chatbot_v2 import SemanticRAGChatbot
-import logging
 import os
+import logging
+from datetime import datetime
+import inference_runtime
+
+# 추론 스레드 구성 (numpy/torch 로딩 전에 설정해야 효과가 있음)
+# gunicorn에서는 gunicorn.conf.py가 워커별로 먼저 설정하므로 건너뜀
+if inference_runtime.get_topology() is None:
+    inference_runtime.configure_process()
+
+from flask import Flask, request, jsonify, Response
+from question_logger import QuestionLogger
+from kb_registry import KnowledgeBaseRegistry, load_registry_config
+from metrics import REGISTRY, PROFILER, PROCESS_INFO
+from load_monitor import LOAD_MONITOR
+from static_assets import init_app
+from log_export import (FORMATS, MIMETYPES, UNANSWERED_COLUMNS, QUERY_COLUMNS,
+                        XLSX_MAX_ROWS, ExportTooLarge, iter_unanswered_rows, iter_query_rows, stream_export)
 
 # 로깅 설정
 logging.basicConfig(level=logging.INFO)
@@ -26,27 +44,44 @@ logger = logging.getLogger(__name__)
 # Flask 앱 생성
 app = Flask(__name__)
 
-# 전역 챗봇 인스턴스
-chatbot = None
+# 정적 자원 지문 + 페이지 캐시 + 큰 JSON 응답 압축
+# 템플릿에서 {{ asset_url('logo') }} → /assets/logo.<해시>.png
+ASSETS, PAGES = init_app(app)
+
+# 전역 지식 베이스 레지스트리 (지식 베이스 이름 → 챗봇, 임베딩 모델 공유)
+registry = None
+
+# 질의 로그 폴더 (모든 질문 기록, /api/queries/export로 내보내기)
+QUERY_LOG_DIR = 'logs/queries'
+
+# 관리자 API 토큰 (X-Admin-Token 헤더, 없으면 서버 자신(localhost)에서 온 요청만 허용)
+ADMIN_TOKEN = os.environ.get('KTRGPT_ADMIN_TOKEN')
+LOCAL_ADDRS = ('127.0.0.1', '::1')
+
+# KTRGPT_PROFILE=1 이면 시작부터 샘플링 프로파일러 실행
+if os.environ.get('KTRGPT_PROFILE') == '1':
+    PROFILER.start()
 
 def initialize_chatbot():
     """
     챗봇 초기화 함수
     
     기능:
-        1. SemanticRAGChatbot 인스턴스 생성
-        2. data/data.xlsx 파일 로딩
-        3. 각 질문에 대한 임베딩 생성 (로컬 모델 - 한국어 특화)
-        4. 메모리에 임베딩 저장
+        1. knowledge_bases.json 읽기 (없으면 data/data.xlsx 하나만 사용)
+        2. 지식 베이스 레지스트리 생성 (임베딩 모델 1개를 모든 지식 베이스가 공유)
+        3. 기본 지식 베이스 미리 로딩 (엑셀 → 임베딩 → 메모리)
+        4. 나머지 지식 베이스는 처음 질문이 들어올 때 로딩
     
     Raises:
         Exception: 초기화 실패 시
     """
-    global chatbot
+    global registry
     try:
         logger.info("챗봇 초기화 중...")
-        # RAG 챗봇 생성 (enable_logging=True: 미답변 질문 자동 로깅)
-        chatbot = SemanticRAGChatbot('./data/data.xlsx')
+        # enable_logging=True: 미답변 질문 자동 로깅 (지식 베이스별 엑셀)
+        # query_log_dir: 모든 질문을 logs/queries/*.jsonl.gz로 기록 (query_log.py로 분석)
+        registry = KnowledgeBaseRegistry(load_registry_config(), query_log_dir=QUERY_LOG_DIR)
+        registry.get()
         logger.info("챗봇 초기화 완료")
     except Exception as e:
         logger.error(f"챗봇 초기화 실패: {str(e)}")
@@ -58,9 +93,9 @@ def index():
     메인 챗봇 페이지
     
     Returns:
-        HTML: templates/index.html 렌더링
+        HTML: templates/index.html (처음 1번만 렌더링, ETag 일치 시 304)
     """
-    return render_template('index.html')
+    return PAGES.response('index.html')
 
 @app.route('/api/chat', methods=['POST'])
 def chat():
@@ -69,21 +104,24 @@ def chat():
     
     Request JSON:
         {
-            "question": "사용자 질문"
+            "question": "사용자 질문",
+            "kb": "지식 베이스 이름" (선택, 없으면 기본 지식 베이스)
         }
     
     Response JSON:
         {
             "success": true/false,
             "answer": "답변 내용" (성공 시)
+            "degraded": true/false (과부하로 간단한 검색 경로를 썼는지, 성공 시)
             "error": "오류 메시지" (실패 시)
         }
     
     Process:
         1. 사용자 질문 받기
-        2. 의미 검색으로 유사한 질문-답변 찾기
-        3. 가장 유사한 답변 반환
-        4. 못 찾으면 자동 로깅
+        2. kb로 지식 베이스 선택 (처음이면 로딩)
+        3. 의미 검색으로 유사한 질문-답변 찾기
+        4. 가장 유사한 답변 반환
+        5. 못 찾으면 자동 로깅
     """
     try:
         # JSON 데이터에서 질문 추출
@@ -97,15 +135,26 @@ def chat():
                 'error': '질문을 입력해주세요.'
             })
         
+        # 지식 베이스 선택 (없는 이름이면 오류)
+        try:
+            chatbot = registry.get(data.get('kb'))
+        except KeyError:
+            return jsonify({
+                'success': False,
+                'error': f"알 수 없는 지식 베이스입니다: {data.get('kb')}"
+            }), 404
+        
         # 챗봇으로 답변 생성
         # - 의미 검색으로 유사한 질문 찾기
         # - 엑셀 데이터의 답변 그대로 반환
-        answer = chatbot.generate_answer(question)
+        # - 과부하면 성능 저하 모드 (완전 일치/캐시/글자 검색 우선)
+        result = chatbot.answer_query(question)
         
         # 성공 응답
         return jsonify({
             'success': True,
-            'answer': answer
+            'answer': result['answer'],
+            'degraded': result.get('degraded', False)
         })
         
     except Exception as e:
@@ -124,21 +173,94 @@ def health():
     Returns:
         JSON: {
             "status": "ok",
-            "knowledge_base_size": 27
+            "knowledge_base_size": 27,
+            "knowledge_bases": {"default", "available", "loaded", "memory_budget_mb"},
+            "load": {"degraded", "in_flight", "encode_ewma_ms"},
+            "inference": {"workers", "worker_index", "threads", "cores", "pinned", ...}
         }
     
-    용도: 서버가 정상 작동하는지 확인
+    용도: 서버가 정상 작동하는지 확인 + 로딩된 지식 베이스 + 워커별 스레드/코어 구성 확인
     """
+    chatbot = registry.get_loaded() if registry else None
     return jsonify({
         'status': 'ok',
-        'knowledge_base_size': len(chatbot.knowledge_base) if chatbot else 0
+        'knowledge_base_size': len(chatbot.knowledge_base) if chatbot else 0,
+        'knowledge_bases': registry.stats() if registry else None,
+        'load': LOAD_MONITOR.status(),
+        'inference': inference_runtime.get_topology()
     })
 
+@app.route('/metrics')
+def metrics():
+    """
+    성능 지표 (Prometheus 텍스트 형식)
+    
+    Returns:
+        text/plain: 단계별 지연시간 히스토그램(p50/p95/p99 포함),
+                    캐시 적중/실패, 답변/미답변 횟수, 배치 크기 등
+    
+    용도: Prometheus 수집 또는 브라우저에서 직접 확인
+    
+    Note:
+        - 지표는 워커(프로세스)마다 따로 → 응답한 워커의 값만 포함
+        - ktrgpt_process_info의 pid/worker 라벨로 어느 워커인지 확인
+    """
+    topology = inference_runtime.get_topology() or {}
+    worker = topology.get('worker_index')
+    PROCESS_INFO.set(1, pid=os.getpid(), worker='' if worker is None else worker)
+    # 성능 저하 모드 게이지는 요청이 있을 때만 갱신되므로 수집 시점에 다시 확인
+    LOAD_MONITOR.degraded()
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+def _is_admin() -> bool:
+    """관리자 요청인지 (X-Admin-Token 일치, 토큰 설정이 없으면 localhost 요청만)"""
+    if ADMIN_TOKEN:
+        return request.headers.get('X-Admin-Token') == ADMIN_TOKEN
+    return request.remote_addr in LOCAL_ADDRS
+
+@app.route('/metrics/profile', methods=['GET', 'POST'])
+def metrics_profile():
+    """
+    샘플링 프로파일러 제어/결과 조회 (관리자만)
+    
+    GET: 현재까지 수집된 결과 반환
+    POST (form 또는 JSON):
+        action=start: 프로파일링 시작 (이전 결과 초기화)
+        action=stop: 프로파일링 중지
+    
+    권한:
+        - KTRGPT_ADMIN_TOKEN 설정 시: X-Admin-Token 헤더가 같아야 함
+        - 설정이 없으면: 서버 자신(localhost)에서 온 요청만
+    
+    Example:
+        curl -X POST -d action=start http://localhost:8000/metrics/profile
+    
+    Returns:
+        text/plain: collapsed stack 형식 (flamegraph.pl 입력으로 사용 가능)
+    """
+    if not _is_admin():
+        return jsonify({'success': False, 'error': '관리자만 사용할 수 있습니다.'}), 403
+    if request.method == 'GET':
+        return Response(PROFILER.report(), mimetype='text/plain; charset=utf-8')
+    
+    data = request.get_json(silent=True) or request.form
+    action = data.get('action')
+    if action == 'start':
+        PROFILER.start()
+        return jsonify({'success': True, 'running': True})
+    if action == 'stop':
+        PROFILER.stop()
+        return jsonify({'success': True, 'running': False})
+    return jsonify({'success': False, 'error': 'action은 start 또는 stop이어야 합니다.'}), 400
+
 @app.route('/api/unanswered')
 def get_unanswered():
     """
     미답변 질문 목록 조회 API
     
+    Query:
+        kb: 지식 베이스 이름 (선택, 없으면 기본 지식 베이스)
+    
     Returns:
         JSON: {
             "success": true,
@@ -149,17 +271,27 @@ def get_unanswered():
     
     Process:
         1. 임시 파일 병합 시도 (엑셀 열린 상태 대응)
-        2. logs/unanswered_questions.xlsx 읽기
+        2. 지식 베이스의 미답변 엑셀 읽기 (지식 베이스 설정의 경로, 로딩하지 않음)
         3. JSON으로 변환하여 반환
     """
+    kb = request.args.get('kb')
     try:
-        if chatbot and chatbot.enable_logging:
+        log_file = registry.question_log_file(kb) if registry and registry.enable_logging else None
+    except KeyError:
+        return jsonify({'success': False, 'error': f"알 수 없는 지식 베이스입니다: {kb}"}), 404
+    try:
+        if log_file:
+            # 로딩된 지식 베이스면 그 로거, 아니면 파일만 여는 로거
+            # (목록 조회 때문에 지식 베이스 전체를 로딩/임베딩하지 않음)
+            chatbot = registry.get_loaded(kb)
+            question_logger = chatbot.question_logger if chatbot else QuestionLogger(log_file)
+            
             # 임시 파일이 있으면 엑셀에 병합
             # (관리자가 엑셀 닫은 후 자동 병합)
-            chatbot.question_logger.merge_temp_file()
+            question_logger.merge_temp_file()
             
             # 모든 로그된 질문 조회
-            df = chatbot.question_logger.get_all_questions()
+            df = question_logger.get_all_questions()
             
             # DataFrame을 JSON으로 변환
             questions = df.to_dict('records')
@@ -168,7 +300,7 @@ def get_unanswered():
             return jsonify({
                 'success': True,
                 'total': len(questions),
-                'unanswered_count': chatbot.question_logger.get_unanswered_count(),
+                'unanswered_count': question_logger.get_unanswered_count(),
                 'questions': questions
             })
         else:
@@ -182,20 +314,104 @@ def get_unanswered():
             'error': str(e)
         })
 
+def _export_response(name: str, fmt: str, columns: list, make_rows):
+    """
+    내보내기 스트림 응답 (파일 이름: <name>_<날짜시간>.<형식>)
+    
+    Note:
+        - 미답변 엑셀 복사 / 엑셀 파일 생성은 응답 전에 끝냄
+          (실패하면 200 대신 오류 JSON, 전송 도중 잘린 파일을 받지 않음)
+        - 엑셀은 최대 XLSX_MAX_ROWS행 (넘으면 413, csv 사용)
+    """
+    filename = f"{name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    try:
+        body = stream_export(fmt, columns, make_rows(), name, max_xlsx_rows=XLSX_MAX_ROWS)
+    except ExportTooLarge as e:
+        return jsonify({'success': False, 'error': str(e)}), 413
+    except Exception as e:
+        logger.error(f"내보내기 실패: {str(e)}")
+        return jsonify({'success': False, 'error': f'내보내기 실패: {str(e)}'}), 500
+    return Response(
+        body,
+        mimetype=MIMETYPES[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@app.route('/api/unanswered/export')
+def export_unanswered():
+    """
+    미답변 질문 로그 내보내기 (CSV / 엑셀 다운로드)
+    
+    Query:
+        format: csv (기본) / xlsx
+        since: 시작 일시 (포함, 예: 2025-10-01)
+        until: 종료 일시 (미포함, 예: 2025-11-01)
+        status: 미답변 / 답변완료 (없으면 전체)
+        kb: 지식 베이스 이름 (선택, 없으면 기본 지식 베이스)
+    
+    Returns:
+        파일 스트림 (로그 크기와 상관없이 메모리 일정)
+    
+    Note:
+        - 운영 중인 엑셀은 복사본을 읽으므로 잠기지 않음
+        - 아직 병합 안 된 임시 파일 내용도 포함
+        - 지식 베이스를 로딩하지 않음 (설정의 미답변 엑셀 경로만 사용)
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': f'지원하지 않는 형식입니다: {fmt}'})
+    try:
+        log_file = registry.question_log_file(request.args.get('kb')) if registry and registry.enable_logging else None
+    except KeyError:
+        return jsonify({'success': False, 'error': f"알 수 없는 지식 베이스입니다: {request.args.get('kb')}"}), 404
+    if not log_file:
+        return jsonify({'success': False, 'error': '로깅이 비활성화되어 있습니다.'})
+    
+    return _export_response('unanswered', fmt, UNANSWERED_COLUMNS, lambda: iter_unanswered_rows(
+        log_file,
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        status=request.args.get('status')))
+
+@app.route('/api/queries/export')
+def export_queries():
+    """
+    전체 질의 기록 내보내기 (CSV / 엑셀 다운로드)
+    
+    Query:
+        format: csv (기본) / xlsx
+        since / until: ISO 시각 범위 (포함 / 미포함)
+        outcome: answered / passage / unanswered (없으면 전체)
+        kb: 지식 베이스 이름 (없으면 전체)
+    
+    Returns:
+        파일 스트림 (질의 로그 세그먼트를 한 줄씩 읽음)
+    """
+    fmt = request.args.get('format', 'csv')
+    if fmt not in FORMATS:
+        return jsonify({'success': False, 'error': f'지원하지 않는 형식입니다: {fmt}'})
+    
+    return _export_response('queries', fmt, QUERY_COLUMNS, lambda: iter_query_rows(
+        QUERY_LOG_DIR,
+        since=request.args.get('since'),
+        until=request.args.get('until'),
+        outcome=request.args.get('outcome'),
+        kb=request.args.get('kb')))
+
 @app.route('/logs')
 def logs_page():
     """
     로그 조회 웹 페이지
     
     Returns:
-        HTML: templates/logs.html 렌더링
+        HTML: templates/logs.html (처음 1번만 렌더링, ETag 일치 시 304)
         
     기능:
         - 미답변 질문 목록 표시
         - 실시간 통계 (전체/미답변/완료)
         - 5초마다 자동 새로고침
     """
-    return render_template('logs.html')
+    return PAGES.response('logs.html')
 
 @app.route('/logo')
 def serve_logo():
@@ -203,9 +419,13 @@ def serve_logo():
     KTR 로고 이미지 제공
     
     Returns:
-        Image: ktr로고.png 파일
+        Image: ktr로고.png 파일 (메모리에서 전송, ETag + 1시간 캐시)
+    
+    Note:
+        - 페이지는 지문 붙은 /assets/logo.<해시>.png를 사용 (1년 캐시)
+        - 이 URL은 예전 링크 호환용
     """
-    return send_from_directory('.', 'ktr로고.png')
+    return ASSETS.legacy_response('logo')
 
 if __name__ == '__main__':
     # 1. 챗봇 초기화
@@ -218,7 +438,8 @@ if __name__ == '__main__':
     print("Chat KTR 서버 시작")
     print("="*60)
     print("URL: http://localhost:8000")
-    print("지식 베이스: {}개 질문-답변".format(len(chatbot.knowledge_base)))
+    print("지식 베이스: {}개 질문-답변 (기본: {}, 전체: {})".format(
+        len(registry.get().knowledge_base), registry.default, ', '.join(registry.names())))
     print("의미 기반 검색 활성화")
     print("="*60 + "\n")
     